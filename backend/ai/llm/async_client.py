@@ -0,0 +1,167 @@
+"""
+Async LLM Transport
+- One asyncio event loop in a background thread shared by all LLM calls
+- HTTP goes through a pooled httpx.AsyncClient (falls back to requests in a
+  worker thread when httpx is not installed)
+- post_stream() reads streamed (NDJSON) responses line by line and can stop early
+- A semaphore bounds how many LLM requests are in flight at once
+- Coroutines run with the submitting thread's contextvars (call type, request trace)
+- Sync facade run() for existing callers; submit() returns a Future that can be
+  cancelled (e.g. when the HTTP client disconnects), which cancels the request
+"""
+
+import asyncio
+import contextvars
+import os
+import threading
+from contextlib import contextmanager
+
+import requests
+
+try:
+    import httpx
+except ImportError:  # Optional dependency
+    httpx = None
+
+MAX_IN_FLIGHT = int(os.environ.get('LLM_MAX_IN_FLIGHT', 32))
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+_semaphore = None
+_http = None
+
+
+def _start_loop():
+    global _loop, _loop_thread, _semaphore
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    def run():
+        asyncio.set_event_loop(loop)
+        ready.set()
+        loop.run_forever()
+
+    _loop_thread = threading.Thread(target=run, name='llm-async-loop', daemon=True)
+    _loop_thread.start()
+    ready.wait()
+    _semaphore = asyncio.run_coroutine_threadsafe(_make_semaphore(), loop).result()
+    _loop = loop
+
+
+async def _make_semaphore():
+    return asyncio.Semaphore(MAX_IN_FLIGHT)
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    with _loop_lock:
+        if _loop is None:
+            _start_loop()
+        return _loop
+
+
+def submit(coro):
+    """Schedule a coroutine on the LLM loop; returns a concurrent.futures.Future."""
+    return asyncio.run_coroutine_threadsafe(_in_context(contextvars.copy_context(), coro), get_loop())
+
+
+async def _in_context(context, coro):
+    # Tasks start from the loop thread's context; carry over the caller's values
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def run(coro, timeout: float = None):
+    """Sync facade: run a coroutine on the LLM loop and wait for its result."""
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("async_client.run() called from the LLM loop; await the coroutine instead")
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except BaseException:
+        future.cancel()  # Timeout / interrupt: stop the in-flight request too
+        raise
+
+
+def _client():
+    # Called on the loop thread only
+    global _http
+    if _http is None:
+        _http = httpx.AsyncClient(limits=httpx.Limits(max_connections=MAX_IN_FLIGHT, max_keepalive_connections=8))
+    return _http
+
+
+async def post_json(url: str, payload: dict, timeout, headers: dict = None) -> dict:
+    """
+    POST JSON and return the decoded response.
+    timeout: seconds or (connect, read) like requests.
+    Errors are raised as requests exceptions so callers handle both transports alike
+    (HTTPError.response carries the status code and headers, e.g. for 429 Retry-After).
+    """
+    async with _semaphore:
+        if httpx is None:
+            def blocking_post():
+                response = requests.post(url, json=payload, timeout=timeout, headers=headers)
+                response.raise_for_status()
+                return response.json()
+            return await asyncio.to_thread(blocking_post)
+
+        with _as_requests_errors():
+            response = await _client().post(url, json=payload, headers=headers, timeout=_httpx_timeout(timeout))
+            response.raise_for_status()
+            return response.json()
+
+
+async def post_stream(url: str, payload: dict, timeout, on_line) -> None:
+    """
+    POST JSON and feed each line of the streamed response (NDJSON) to on_line(line).
+    Reading stops when on_line returns False; the connection is closed, which
+    makes Ollama stop generating. Errors as in post_json().
+    """
+    async with _semaphore:
+        if httpx is None:
+            def blocking_stream():
+                with requests.post(url, json=payload, timeout=timeout, stream=True) as response:
+                    response.raise_for_status()
+                    for line in response.iter_lines(decode_unicode=True):
+                        if line and on_line(line) is False:
+                            break
+            return await asyncio.to_thread(blocking_stream)
+
+        with _as_requests_errors():
+            async with _client().stream('POST', url, json=payload, timeout=_httpx_timeout(timeout)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line and on_line(line) is False:
+                        break
+
+
+def _httpx_timeout(timeout):
+    connect, read = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+    return httpx.Timeout(read, connect=connect)
+
+
+@contextmanager
+def _as_requests_errors():
+    """Re-raise httpx errors as the equivalent requests exceptions."""
+    try:
+        yield
+    except httpx.TimeoutException as e:
+        raise requests.exceptions.Timeout(str(e) or "LLM request timed out")
+    except httpx.HTTPStatusError as e:
+        error_response = requests.Response()
+        error_response.status_code = e.response.status_code
+        error_response.headers.update(e.response.headers)
+        raise requests.exceptions.HTTPError(f"{e.response.status_code} error from {e.request.url.host}", response=error_response)
+    except httpx.HTTPError as e:
+        raise requests.exceptions.ConnectionError(str(e) or type(e).__name__)
+    except ValueError as e:
+        raise requests.exceptions.InvalidJSONError(str(e))
+
+
+async def bounded(coro):
+    """Run any awaitable (e.g. an SDK call) under the in-flight limit."""
+    async with _semaphore:
+        return await coro
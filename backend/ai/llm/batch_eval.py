@@ -0,0 +1,137 @@
+"""
+Batch Answer Evaluation
+- Grades a whole viva's answers in one call (end-of-viva grading)
+- Every non-empty answer goes to the configured grader (LLM / cross-encoder), with
+  bounded parallelism and an overall deadline
+- Answers not graded by the deadline (or whose grader fell back) get a pending
+  similarity grade; those answers are embedded together in a single batch.
+  The embedding model is English-only, so a similarity grade is never final
+"""
+
+import contextvars
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+BATCH_MAX_WORKERS = int(os.environ.get('LLM_BATCH_WORKERS', 4))
+BATCH_TIMEOUT = float(os.environ.get('LLM_BATCH_TIMEOUT', 60))
+
+
+def _result(item: dict, score: int, feedback: str, graded_by: str, pending: bool = False) -> dict:
+    is_correct = score >= 70
+    return {
+        "is_correct": is_correct,
+        "is_partial": 40 <= score < 70,
+        "score": score,
+        "feedback": feedback,
+        "correct_answer": item.get("expected_answer") if not is_correct else None,
+        "user_said": item.get("user_answer", ""),
+        "graded_by": graded_by,
+        "pending": pending
+    }
+
+
+def _similarity_feedback(score: int, language: str) -> str:
+    hindi = "hindi" in language.lower()
+    if score >= 70:
+        return "बिल्कुल सही!" if hindi else "Correct!"
+    if score >= 40:
+        return "आंशिक रूप से सही।" if hindi else "Partially correct."
+    return "यह जवाब सही नहीं है।" if hindi else "This answer is not correct."
+
+
+def evaluate_batch(items: list, evaluate_fn, language: str = "Hindi", timeout: float = None, max_workers: int = None) -> dict:
+    """
+    Evaluate many (question, user_answer, expected_answer) items at once.
+    evaluate_fn has the signature of evaluate_with_correct_answer().
+
+    Returns: {
+        "results": [...],      # same order as items
+        "partial": bool,       # True if some answers only have a pending similarity grade
+        "llm_graded": int,     # Answers graded by the grader
+        "elapsed": float
+    }
+    """
+    start_time = time.time()
+    timeout = BATCH_TIMEOUT if timeout is None else timeout
+    max_workers = max_workers or BATCH_MAX_WORKERS
+    results = [None] * len(items)
+
+    # Rule-based: empty / too short answers never need a model
+    to_grade = []
+    for i, item in enumerate(items):
+        answer = (item.get("user_answer") or "").strip()
+        if len(answer) < 3 or not item.get("expected_answer"):
+            results[i] = _result(item, 0, "कृपया जवाब दें।" if "hindi" in language.lower() else "Please answer.", "rule")
+        else:
+            to_grade.append(i)
+
+    print(f"[BATCH EVAL] {len(items)} answers, {len(to_grade)} need grading")
+
+    # Grade with bounded parallelism
+    llm_graded = 0
+    ungraded = []
+    if to_grade:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        futures = {}
+        for i in to_grade:
+            item = items[i]
+            futures[executor.submit(
+                contextvars.copy_context().run,  # Keep the request's LLM trace
+                evaluate_fn,
+                item.get("topic", "General"),
+                item.get("question", ""),
+                item["user_answer"],
+                item["expected_answer"],
+                language
+            )] = i
+
+        remaining = max(0.0, timeout - (time.time() - start_time))
+        done, not_done = wait(futures, timeout=remaining)
+        executor.shutdown(wait=False, cancel_futures=True)
+        ungraded = [futures[f] for f in not_done]
+
+        for future in done:
+            i = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[BATCH EVAL] Grading failed for item {i}: {e}")
+                ungraded.append(i)
+                continue
+            if result.get("graded") is False:  # Grader's own fallback score, not a grade
+                ungraded.append(i)
+                continue
+            result["graded_by"] = result.get("grader", "llm")
+            result["pending"] = False
+            results[i] = result
+            llm_graded += 1
+
+    # Deadline missed or grader failed: pending grade from similarity, embedded in ONE batch
+    if ungraded:
+        ungraded.sort()
+        similarities = {}
+        try:
+            from ai.nlp.embeddings import pairwise_similarity
+            sims = pairwise_similarity(
+                [items[i]["user_answer"] for i in ungraded],
+                [items[i]["expected_answer"] for i in ungraded]
+            )
+            similarities = dict(zip(ungraded, sims))
+        except Exception as e:
+            print(f"[BATCH EVAL] Embedding failed, no similarity grades: {e}")
+        for i in ungraded:
+            score = max(0, min(100, int(similarities.get(i, 0.0) * 100)))
+            graded_by = "embedding" if i in similarities else "none"
+            results[i] = _result(items[i], score, _similarity_feedback(score, language), graded_by, pending=True)
+
+    elapsed = time.time() - start_time
+    partial = any(r["pending"] for r in results)
+    print(f"[BATCH EVAL] Done in {elapsed:.1f}s (llm={llm_graded}, partial={partial})")
+
+    return {
+        "results": results,
+        "partial": partial,
+        "llm_graded": llm_graded,
+        "elapsed": round(elapsed, 2)
+    }
@@ -0,0 +1,282 @@
+"""
+Gemini Client
+- One long-lived client: generateContent over REST on the shared async LLM loop
+  (pooled connections, no per-call model construction)
+- GEMINI_API_ENDPOINT points it at another server (e.g. a local fake for tests)
+- Requests-per-minute and tokens-per-minute token buckets keep calls inside the
+  quota; a call waits for budget up to its deadline, then raises RateLimited
+- A 429 from the API drains the buckets for Retry-After so queued calls back off
+- Each request is recorded by ai.llm.tracing (quota wait counts as queue wait)
+- Responses served from the record / replay store (ai.llm.recorder) use no quota
+- Without GEMINI_API_KEY the backend is unavailable (calls raise BackendUnavailable)
+"""
+
+import asyncio
+import os
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+from dotenv import load_dotenv
+
+from ai.llm import async_client, metrics, tracing
+from ai.llm.health import get_breaker, BackendUnavailable
+from ai.llm.recorder import get_recorder
+from ai.llm.structured import to_gemini_schema
+
+load_dotenv()
+
+API_KEY = os.getenv('GEMINI_API_KEY', '')
+API_ENDPOINT = os.getenv('GEMINI_API_ENDPOINT', 'https://generativelanguage.googleapis.com').rstrip('/')
+MODEL_NAME = os.getenv('GEMINI_MODEL', 'gemini-2.5-flash')
+
+RPM_LIMIT = float(os.getenv('GEMINI_RPM', 10))
+TPM_LIMIT = float(os.getenv('GEMINI_TPM', 250000))
+# Longest a call may wait for rate-limit budget (seconds)
+QUEUE_DEADLINE = float(os.getenv('GEMINI_QUEUE_DEADLINE', 10))
+CONNECT_TIMEOUT = 3
+CHARS_PER_TOKEN = 4
+DEFAULT_RETRY_AFTER = 60.0
+
+
+class RateLimited(requests.exceptions.Timeout):
+    """Quota budget would not free up before the call's deadline (handled like a timeout)."""
+
+
+class TokenBucket:
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 = now)."""
+        self._refill()
+        amount = min(amount, self.capacity)  # A single oversized call waits for a full bucket
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+    def give_back(self, amount: float):
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def drain(self, seconds: float):
+        """Empty the bucket so it only refills after `seconds`."""
+        self._refill()
+        self.tokens = -seconds * self.rate
+
+
+class RateLimiter:
+    """RPM + TPM buckets; waiters are served first come, first served."""
+
+    def __init__(self, rpm: float = RPM_LIMIT, tpm: float = TPM_LIMIT):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waiting = 0
+        self._lock = None  # asyncio.Lock, created on the loop
+
+    async def acquire(self, tokens: int, deadline: float):
+        """Wait for one request + `tokens` of budget; raise RateLimited if not by `deadline` (monotonic)."""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                    if wait <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(tokens)
+                        break
+                    if time.monotonic() + wait > deadline:
+                        metrics.increment('gemini_rate_limited_total')
+                        raise RateLimited(f"Gemini quota: no budget for {wait:.1f}s (deadline exceeded)")
+                    await asyncio.sleep(wait)
+        finally:
+            self.waiting -= 1
+        metrics.observe('gemini_rate_wait_seconds', time.monotonic() - start)
+
+    def settle(self, estimated: int, actual: int):
+        """Correct the token bucket once the real usage is known."""
+        if actual:
+            self.tokens.give_back(estimated - actual)
+
+    def backoff(self, seconds: float):
+        self.requests.drain(seconds)
+        self.tokens.drain(seconds)
+
+    def status(self) -> dict:
+        self.requests._refill()
+        self.tokens._refill()
+        return {
+            "rpm_limit": self.requests.capacity,
+            "tpm_limit": self.tokens.capacity,
+            "requests_available": round(self.requests.tokens, 1),
+            "tokens_available": int(self.tokens.tokens),
+            "waiting": self.waiting
+        }
+
+
+def _rest_schema(schema: dict) -> dict:
+    """Gemini REST expects upper-case OpenAPI type names."""
+    schema = to_gemini_schema(schema)
+    if "type" in schema:
+        schema["type"] = schema["type"].upper()
+    if "properties" in schema:
+        schema["properties"] = {name: _rest_schema(prop) for name, prop in schema["properties"].items()}
+    if "items" in schema:
+        schema["items"] = _rest_schema(schema["items"])
+    return schema
+
+
+def _response_text(data: dict) -> str:
+    try:
+        parts = data["candidates"][0]["content"]["parts"]
+    except (KeyError, IndexError, TypeError):
+        reason = (data.get("promptFeedback") or {}).get("blockReason") or "no candidates"
+        raise requests.exceptions.InvalidJSONError(f"Gemini returned no text ({reason})")
+    return "".join(part.get("text", "") for part in parts)
+
+
+def retry_after_seconds(value) -> float:
+    """Retry-After header: delay-seconds or an HTTP date; DEFAULT_RETRY_AFTER if missing or unparseable."""
+    if not value:
+        return DEFAULT_RETRY_AFTER
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError, OverflowError):
+        return DEFAULT_RETRY_AFTER
+
+
+def estimate_tokens(prompt: str, max_output_tokens: int) -> int:
+    return len(prompt) // CHARS_PER_TOKEN + max_output_tokens
+
+
+class GeminiClient:
+    def __init__(self, api_key: str = API_KEY, endpoint: str = API_ENDPOINT, model: str = MODEL_NAME,
+                 limiter: RateLimiter = None):
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.model = model
+        self.limiter = limiter or RateLimiter()
+        self.breaker = get_breaker('gemini')
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.api_key)
+
+    @property
+    def url(self) -> str:
+        return f"{self.endpoint}/v1beta/models/{self.model}:generateContent"
+
+    async def agenerate(self, prompt: str, schema: dict = None, temperature: float = 0.3,
+                        max_output_tokens: int = 150, timeout: float = 30, deadline: float = None,
+                        call_type: str = None) -> str:
+        """
+        Generate text (JSON text when a schema is given). Waits for quota until
+        deadline (monotonic; default now + QUEUE_DEADLINE).
+        call_type: tracing label (default: the caller's tracing.call_type).
+        Raises requests exceptions on failure, RateLimited when out of quota.
+        """
+        config = {"temperature": temperature, "maxOutputTokens": max_output_tokens}
+        if schema:
+            config["responseMimeType"] = "application/json"
+            config["responseSchema"] = _rest_schema(schema)
+        payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}], "generationConfig": config}
+
+        recorder = get_recorder()
+        recorded = recorder.lookup('gemini', dict(payload, model=self.model))
+        if recorded is not None:
+            usage = recorded.get("usageMetadata") or {}
+            tracing.start_call('replay', self.model, call_type).finish(
+                'replayed', prompt_tokens=usage.get("promptTokenCount"), output_tokens=usage.get("candidatesTokenCount"))
+            return _response_text(recorded)
+
+        deadline = deadline or time.monotonic() + QUEUE_DEADLINE
+        estimated = estimate_tokens(prompt, max_output_tokens)
+        call = tracing.start_call('gemini', self.model, call_type)
+        if not self.configured:
+            call.finish('rejected')
+            raise BackendUnavailable("gemini unavailable (GEMINI_API_KEY is not set)")
+        try:
+            self.breaker.check()
+        except BackendUnavailable:
+            call.finish('rejected')
+            raise
+        queued_at = time.time()
+        try:
+            await self.limiter.acquire(estimated, deadline)
+        except BaseException as e:
+            self.breaker.abandon()
+            call.finish('rate_limited' if isinstance(e, RateLimited) else 'cancelled')
+            raise
+        call.queued(time.time() - queued_at)
+
+        try:
+            data = await async_client.post_json(self.url, payload, timeout=(CONNECT_TIMEOUT, timeout),
+                                                headers={"x-goog-api-key": self.api_key})
+        except requests.exceptions.HTTPError as e:
+            if e.response is not None and e.response.status_code == 429:
+                # Quota exhausted upstream: not an outage, so the circuit stays closed
+                self.breaker.abandon()
+                retry_after = retry_after_seconds(e.response.headers.get('Retry-After'))
+                self.limiter.backoff(retry_after)
+                metrics.increment('gemini_requests_total', outcome='quota')
+                call.finish('rate_limited')
+                raise RateLimited(f"Gemini returned 429, backing off {retry_after:.0f}s")
+            self.breaker.record_failure(e)
+            metrics.increment('gemini_requests_total', outcome='error')
+            call.finish('error')
+            raise
+        except requests.exceptions.RequestException as e:
+            self.breaker.record_failure(e)
+            metrics.increment('gemini_requests_total', outcome='error')
+            call.finish(tracing.error_outcome(e))
+            raise
+        except asyncio.CancelledError:
+            self.breaker.abandon()
+            call.finish('cancelled')
+            raise
+
+        self.breaker.record_success()
+        metrics.increment('gemini_requests_total', outcome='ok')
+        usage = data.get("usageMetadata") or {}
+        call.finish('ok', prompt_tokens=usage.get("promptTokenCount"), output_tokens=usage.get("candidatesTokenCount"))
+        self.limiter.settle(estimated, usage.get("totalTokenCount", 0))
+        recorder.store('gemini', dict(payload, model=self.model), data, call.duration, call.call_type)
+        return _response_text(data)
+
+    def generate(self, prompt: str, **kwargs) -> str:
+        """Sync facade of agenerate()."""
+        return async_client.run(self.agenerate(prompt, **kwargs))
+
+    def status(self) -> dict:
+        return {"model": self.model, "endpoint": self.endpoint, "configured": self.configured,
+                "quota": self.limiter.status()}
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_gemini_client() -> GeminiClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GeminiClient()
+        return _client
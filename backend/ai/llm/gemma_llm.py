@@ -149,9 +149,10 @@ def get_local_llm():
         _llm_instance = LocalLLM()
     return _llm_instance
 
-def generate_next_question(topic: str, previous_question: str, user_answer: str, language: str = "Hindi") -> str:
+def generate_next_question(topic: str, previous_question: str, user_answer: str, language: str = "Hindi", machine_id: int = None) -> str:
     """
     API-friendly function to generate the next interview question.
+    machine_id is accepted for signature compatibility with ollama_llm (no study material here).
     """
     llm = get_local_llm()
     return llm.generate_followup_question(topic, previous_question, user_answer, language)
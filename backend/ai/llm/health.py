@@ -0,0 +1,168 @@
+"""
+LLM Backend Health Tracking (Circuit Breaker)
+- Consecutive failures open the circuit for a backend
+- While open, callers fail immediately and use their fallback path
+- A background probe closes the circuit again once the backend answers
+- Backends without a probe get one trial request after the cooldown (half-open)
+"""
+
+import os
+import threading
+import time
+
+import requests
+
+FAILURE_THRESHOLD = int(os.environ.get('LLM_BREAKER_FAILURES', 3))
+COOLDOWN_SECONDS = float(os.environ.get('LLM_BREAKER_COOLDOWN', 30))
+PROBE_INTERVAL = float(os.environ.get('LLM_BREAKER_PROBE_INTERVAL', 10))
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class BackendUnavailable(requests.exceptions.ConnectionError):
+    """Raised instead of calling a backend whose circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, probe=None, failure_threshold: int = FAILURE_THRESHOLD,
+                 cooldown: float = COOLDOWN_SECONDS, probe_interval: float = PROBE_INTERVAL):
+        """
+        probe: optional callable returning True when the backend is healthy again.
+        """
+        self.name = name
+        self.probe = probe
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.probe_interval = probe_interval
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.total_failures = 0
+        self.total_rejected = 0
+        self._trial_in_flight = False
+        self._probe_thread = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """True if a request may be sent to the backend right now."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.probe is None and time.time() - self.opened_at >= self.cooldown:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True  # Exactly one trial request
+                return True
+            self.total_rejected += 1
+            return False
+
+    def available(self) -> bool:
+        """Like allow(), but only peeks: does not use up the half-open trial request."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN:
+                return self.probe is None and time.time() - self.opened_at >= self.cooldown
+            return not self._trial_in_flight
+
+    def check(self):
+        """Raise BackendUnavailable if the circuit is open."""
+        if not self.allow():
+            raise BackendUnavailable(f"{self.name} unavailable (circuit open: {self.last_error})")
+
+    def abandon(self):
+        """A permitted request was dropped before reaching the backend (no outcome)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != CLOSED:
+                print(f"[LLM HEALTH] {self.name} circuit closed")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.total_failures += 1
+            self.last_error = str(error)[:200]
+            self._trial_in_flight = False
+            if self.state == HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    print(f"[LLM HEALTH] {self.name} circuit OPEN after {self.consecutive_failures} failures: {self.last_error}")
+                self.state = OPEN
+                self.opened_at = time.time()
+                self._start_probe()
+
+    def _start_probe(self):
+        # Called with the lock held
+        if self.probe is None or (self._probe_thread and self._probe_thread.is_alive()):
+            return
+        self._probe_thread = threading.Thread(target=self._probe_loop, name=f"{self.name}-probe", daemon=True)
+        self._probe_thread.start()
+
+    def _probe_loop(self):
+        while True:
+            time.sleep(self.probe_interval)
+            with self._lock:
+                if self.state == CLOSED:
+                    return
+            try:
+                healthy = self.probe()
+            except Exception as e:
+                healthy = False
+                self.last_error = str(e)[:200]
+            if healthy:
+                self.record_success()
+                return
+
+    def status(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.name,
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "total_failures": self.total_failures,
+                "total_rejected": self.total_rejected,
+                "open_for_seconds": round(time.time() - self.opened_at, 1) if self.state != CLOSED and self.opened_at else 0,
+                "last_error": self.last_error
+            }
+
+
+def _probe_ollama() -> bool:
+    """Healthy = the model answers a 1-token generation (server up AND model loaded)."""
+    from ai.llm.ollama_client import OLLAMA_API_URL, MODEL_NAME
+    response = requests.post(
+        OLLAMA_API_URL,
+        json={"model": MODEL_NAME, "prompt": "OK", "stream": False, "options": {"num_predict": 1}},
+        timeout=(3, 20)
+    )
+    return response.status_code == 200
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+# Backends with a background probe; others use half-open trial requests
+_PROBES = {
+    'ollama': _probe_ollama,
+}
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, probe=_PROBES.get(name))
+        return _breakers[name]
+
+
+def health_status() -> list:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.status() for b in breakers]
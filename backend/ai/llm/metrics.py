@@ -0,0 +1,86 @@
+"""
+In-process LLM Metrics
+- Labelled counters and histograms, safe to update from worker threads
+- snapshot() is served by GET /llm/metrics
+"""
+
+import threading
+
+# Histogram bucket upper bounds (seconds unless a histogram passes its own)
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120)
+
+
+def _key(name: str, labels: dict) -> tuple:
+    return (name, tuple(sorted(labels.items())))
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                return
+        self.counts[-1] += 1
+
+    def snapshot(self) -> dict:
+        labels = [str(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "count": self.count,
+            "sum": round(self.total, 4),
+            "avg": round(self.total / self.count, 4) if self.count else None,
+            "buckets": dict(zip(labels, self.counts))
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, buckets=None, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram(buckets or DEFAULT_BUCKETS)
+            self._histograms[key].observe(value)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), **hist.snapshot()}
+                for (name, labels), hist in sorted(self._histograms.items(), key=lambda item: item[0])
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+
+_registry = MetricsRegistry()
+
+
+def increment(name: str, value: float = 1, **labels):
+    _registry.increment(name, value, **labels)
+
+
+def observe(name: str, value: float, buckets=None, **labels):
+    _registry.observe(name, value, buckets, **labels)
+
+
+def snapshot() -> dict:
+    return _registry.snapshot()
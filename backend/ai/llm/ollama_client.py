@@ -0,0 +1,178 @@
+"""
+Ollama HTTP Client
+- Single place that talks to the Ollama server (/api/generate, /api/chat)
+- Server URL and default model come from the environment
+- Calls go through the 'ollama' circuit breaker: a dead server fails in milliseconds
+- keep_alive defaults to the residency manager's choice (pinned during shift hours)
+- Each request waits for a scheduler slot of its priority class (interactive / background / bulk)
+- Requests run on the shared async LLM loop (ai.llm.async_client); generate() / chat()
+  are sync facades over agenerate() / achat()
+- cutoff (from a generation profile) streams the response and stops reading as soon
+  as the useful part is complete; Ollama stops generating when the stream closes
+- Each request is recorded by ai.llm.tracing (tokens, queue wait, prefill, tokens/sec)
+- LLM_RECORD_MODE (ai.llm.recorder) can store responses, or serve them from the store
+  without touching the server
+"""
+
+import asyncio
+import json
+import os
+import time
+
+import requests
+
+from ai.llm import async_client, tracing
+from ai.llm.health import get_breaker, BackendUnavailable
+from ai.llm.recorder import get_recorder
+from ai.llm.scheduler import get_scheduler, INTERACTIVE, QueueTimeout
+
+OLLAMA_HOST = os.environ.get('OLLAMA_HOST', 'http://localhost:11434').rstrip('/')
+OLLAMA_API_URL = f"{OLLAMA_HOST}/api/generate"
+OLLAMA_CHAT_URL = f"{OLLAMA_HOST}/api/chat"
+MODEL_NAME = os.environ.get('OLLAMA_MODEL', 'gemma3:1b')
+
+# Connection attempts fail fast; the read timeout is per call
+CONNECT_TIMEOUT = 3
+
+
+def generate(prompt: str, options: dict = None, model: str = None, format=None,
+             keep_alive: str = None, timeout: float = 60, priority: str = INTERACTIVE, cutoff=None) -> dict:
+    """
+    Non-streaming /api/generate call.
+    format: None, "json", or a JSON schema dict (structured output).
+    keep_alive: None = residency manager default.
+    priority: scheduler class - interactive (live viva), background or bulk.
+    cutoff: fn(text so far) -> final text once complete, else None (GenerationProfile.cutoff());
+    the response is then streamed and the stream closed early (done_reason "cutoff").
+    Returns the full Ollama response JSON ("response", "eval_count", ...).
+    Raises requests exceptions on connection errors, timeouts and HTTP errors,
+    and BackendUnavailable (a ConnectionError) while the circuit is open.
+    """
+    return async_client.run(agenerate(prompt, options, model, format, keep_alive, timeout, priority, cutoff))
+
+
+def chat(messages: list, options: dict = None, model: str = None, format=None,
+         keep_alive: str = None, timeout: float = 60, priority: str = INTERACTIVE, cutoff=None) -> dict:
+    """
+    Non-streaming /api/chat call.
+    messages: [{"role": "system"|"user"|"assistant", "content": "..."}]
+    Keep earlier messages byte-identical between turns: Ollama then reuses the
+    KV cache for the shared prefix and only evaluates the new messages.
+    Returns the full response JSON; the reply is result["message"]["content"].
+    """
+    return async_client.run(achat(messages, options, model, format, keep_alive, timeout, priority, cutoff))
+
+
+async def agenerate(prompt: str, options: dict = None, model: str = None, format=None,
+                    keep_alive: str = None, timeout: float = 60, priority: str = INTERACTIVE, cutoff=None) -> dict:
+    """Coroutine version of generate() (run it on the async_client loop)."""
+    payload = {
+        "prompt": prompt,
+        "options": options or {}
+    }
+    if format is not None:
+        payload["format"] = format
+    return await _apost(OLLAMA_API_URL, payload, model, keep_alive, timeout, priority, cutoff)
+
+
+async def achat(messages: list, options: dict = None, model: str = None, format=None,
+                keep_alive: str = None, timeout: float = 60, priority: str = INTERACTIVE, cutoff=None) -> dict:
+    """Coroutine version of chat() (run it on the async_client loop)."""
+    payload = {
+        "messages": messages,
+        "options": options or {}
+    }
+    if format is not None:
+        payload["format"] = format
+    return await _apost(OLLAMA_CHAT_URL, payload, model, keep_alive, timeout, priority, cutoff)
+
+
+async def _apost(url: str, payload: dict, model: str, keep_alive: str, timeout: float, priority: str,
+                 cutoff=None) -> dict:
+    from ai.llm.residency import get_residency_manager
+    residency = get_residency_manager()
+
+    model = model or MODEL_NAME
+    payload.update({
+        "model": model,
+        "stream": cutoff is not None,
+        "keep_alive": keep_alive if keep_alive is not None else residency.keep_alive()
+    })
+
+    recorder = get_recorder()
+    recorded = recorder.lookup('ollama', payload)
+    if recorded is not None:
+        tracing.start_call('replay', model).finish('replayed', **tracing.ollama_usage(recorded))
+        return recorded
+
+    call = tracing.start_call('ollama', model)
+    breaker = get_breaker('ollama')
+    try:
+        breaker.check()
+    except BackendUnavailable:
+        call.finish('rejected')
+        raise
+    queued_at = time.time()
+    try:
+        async with get_scheduler().aslot(priority):
+            call.queued(time.time() - queued_at)
+            try:
+                if cutoff is None:
+                    result = await async_client.post_json(url, payload, timeout=(CONNECT_TIMEOUT, timeout))
+                else:
+                    result = await _astream(url, payload, (CONNECT_TIMEOUT, timeout), call, cutoff)
+            except requests.exceptions.RequestException as e:
+                breaker.record_failure(e)
+                call.finish(tracing.error_outcome(e))
+                raise
+    except (QueueTimeout, asyncio.CancelledError) as e:
+        breaker.abandon()  # Never reached the backend: says nothing about its health
+        call.finish('queue_timeout' if isinstance(e, QueueTimeout) else 'cancelled')
+        raise
+    breaker.record_success()
+    call.finish('ok', **tracing.ollama_usage(result))
+    recorder.store('ollama', payload, result, call.duration, call.call_type)
+    residency.note_response(model, result)
+    return result
+
+
+async def _astream(url: str, payload: dict, timeout, call, cutoff) -> dict:
+    """
+    Streamed request, read until cutoff() says the reply is complete or the model is done.
+    Returns a non-streaming style response; after an early cutoff the token counters
+    are estimated from the chunks received (one token per chunk).
+    """
+    chat = url == OLLAMA_CHAT_URL
+    pieces = []
+    final = {}
+    first_token_at = None
+
+    def on_line(line: str):
+        nonlocal first_token_at
+        data = json.loads(line)
+        piece = (data.get("message") or {}).get("content", "") if chat else data.get("response", "")
+        if piece:
+            if first_token_at is None:
+                first_token_at = time.time()
+                call.first_token()
+            pieces.append(piece)
+        if data.get("done"):
+            final.update(data)
+            return False
+        text = cutoff("".join(pieces))
+        if text is not None:
+            final.update(done=True, done_reason="cutoff", text=text, eval_count=len(pieces),
+                         eval_duration=int((time.time() - first_token_at) * 1e9))
+            return False
+
+    await async_client.post_stream(url, payload, timeout, on_line)
+    text = final.pop("text", None)
+    if text is None:
+        text = "".join(pieces)
+    final.setdefault("model", payload["model"])
+    final.setdefault("done", True)
+    if chat:
+        final["message"] = {"role": "assistant", "content": text}
+    else:
+        final["response"] = text
+    return final
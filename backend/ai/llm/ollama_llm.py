@@ -7,12 +7,25 @@ Ollama LLM Integration
 """
 
 import requests
-import json
 import re
 import time
+from concurrent.futures import as_completed
+
+from ai.llm import ollama_client, async_client, tracing
+from ai.llm.ollama_client import MODEL_NAME
+from ai.llm.profiles import get_profile
+from ai.llm.residency import get_residency_manager
+from ai.llm.scheduler import BULK
+from ai.llm.structured import (
+    ollama_structured, aollama_structured, AnswerEvaluation, AnswerMatch, QABank, StructuredOutputError
+)
+from ai.nlp.context_index import get_context_index
+from ai.nlp.template_questions import get_template_index, questions_from_text
+
+# Study material budget of each prompt (characters)
+EVALUATION_CONTEXT_CHARS = 1500
+FOLLOWUP_CONTEXT_CHARS = 2000
 
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
-MODEL_NAME = "gemma3:1b"
 
 class OllamaLLM:
     def __init__(self, model_name=MODEL_NAME):
@@ -22,9 +35,10 @@ class OllamaLLM:
         """
         self.model_name = model_name
     
-    def evaluate_answer(self, topic: str, question: str, user_answer: str, language: str = "Hindi", study_context: str = None) -> dict:
+    def evaluate_answer(self, topic: str, question: str, user_answer: str, language: str = "Hindi", study_context: str = None, context_selected: bool = False) -> dict:
         """
         Evaluate if the user's answer is relevant to the question.
+        context_selected: study_context already holds the relevant chunks (from the index).
         If study_context is provided, evaluates answer against that content.
         Returns: {
             "is_relevant": bool,
@@ -54,8 +68,9 @@ class OllamaLLM:
         
         # Build evaluation prompt - with or without study material
         if study_context and len(study_context.strip()) > 50:
-            # Evaluate against study material content
-            context_snippet = study_context[:2500]  # Limit context
+            # Evaluate against the parts of the study material relevant to this Q&A
+            context_snippet = study_context if context_selected else get_context_index().select_relevant(
+                study_context, f"{question} {user_answer}", max_chars=EVALUATION_CONTEXT_CHARS)
             eval_prompt = f"""You are evaluating a candidate's answer based ONLY on the provided study material.
 
 === STUDY MATERIAL (Correct Information Source) ===
@@ -73,10 +88,8 @@ Evaluate STRICTLY based on the study material above:
 IMPORTANT: Only give high scores if the answer matches content from the study material.
 If the answer has wrong information not in study material, give low score.
 
-Respond in this EXACT format (no extra text):
-RELEVANT: YES or NO
-SCORE: 0-100
-REASON: one line explanation comparing to study material"""
+Respond as JSON only:
+{{"relevant": true or false, "score": 0-100, "reason": "one line explanation comparing to study material"}}"""
         else:
             # General evaluation without study material
             eval_prompt = f"""You are evaluating a candidate's answer in a technical interview.
@@ -90,42 +103,15 @@ Evaluate strictly:
 2. Does it show ANY understanding of the topic?
 3. Is it a genuine attempt to answer?
 
-Respond in this EXACT format (no extra text):
-RELEVANT: YES or NO
-SCORE: 0-100
-REASON: one line explanation"""
+Respond as JSON only:
+{{"relevant": true or false, "score": 0-100, "reason": "one line explanation"}}"""
 
         try:
-            response = requests.post(
-                OLLAMA_API_URL,
-                json={
-                    "model": self.model_name,
-                    "prompt": eval_prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.3,  # Low temperature for consistent evaluation
-                        "num_predict": 80
-                    }
-                },
-                timeout=30
-            )
-            response.raise_for_status()
-            result = response.json().get("response", "").strip()
-            
-            # Parse the response
-            is_relevant = "YES" in result.upper().split("RELEVANT:")[-1].split("\n")[0] if "RELEVANT:" in result.upper() else False
-            
-            # Extract score
-            score = 50  # default
-            score_match = re.search(r'SCORE:\s*(\d+)', result, re.IGNORECASE)
-            if score_match:
-                score = min(100, max(0, int(score_match.group(1))))
-            
-            # Extract reason
-            reason = "Evaluation complete"
-            reason_match = re.search(r'REASON:\s*(.+)', result, re.IGNORECASE)
-            if reason_match:
-                reason = reason_match.group(1).strip()
+            # Low temperature for consistent evaluation; output constrained to the schema
+            evaluation = ollama_structured(eval_prompt, AnswerEvaluation, profile='evaluation', model=self.model_name, timeout=30)
+            is_relevant = evaluation.relevant
+            score = evaluation.score
+            reason = evaluation.reason or "Evaluation complete"
             
             # Generate appropriate feedback based on score
             if study_context:
@@ -152,22 +138,27 @@ REASON: one line explanation"""
                 "is_relevant": is_relevant,
                 "score": score,
                 "feedback": feedback,
-                "reason": reason
+                "reason": reason,
+                "graded": True
             }
             
         except Exception as e:
-            # Fallback - be lenient if LLM fails
+            # Fallback - be lenient if LLM fails, but flag that no grading happened
+            print(f"[LLM] Evaluation failed: {e}")
+            tracing.mark('fallback')
             return {
                 "is_relevant": True,
                 "score": 50,
                 "feedback": "चलो आगे बढ़ते हैं।" if "hindi" in language.lower() else "Let's continue.",
-                "reason": f"Evaluation fallback: {str(e)}"
+                "reason": f"Evaluation fallback: {str(e)}",
+                "graded": False
             }
     
-    def generate_followup_question(self, topic: str, previous_question: str, user_answer: str, language: str = "Hindi", study_context: str = None, training_prompt: str = None) -> str:
+    def generate_followup_question(self, topic: str, previous_question: str, user_answer: str, language: str = "Hindi", study_context: str = None, training_prompt: str = None, context_selected: bool = False) -> str:
         """
         Generate a follow-up question based on user's answer and topic.
-        If study_context is provided, questions will be strictly based on that material.
+        If study_context is provided, questions will be strictly based on that material
+        (context_selected: it already holds the relevant chunks, from the index).
         If training_prompt is provided, includes few-shot examples for better quality.
         Works like Jarvis: contextual, intelligent, interview-style.
         """
@@ -175,7 +166,9 @@ REASON: one line explanation"""
         # Build context-aware prompt
         if study_context and len(study_context.strip()) > 50:
             # Use study material as context - questions must be from this material only
-            context_snippet = study_context[:3000]  # Limit context to avoid token overflow
+            # Only the chunks relevant to the last exchange are sent, not the whole manual
+            context_snippet = study_context if context_selected else get_context_index().select_relevant(
+                study_context, f"{previous_question} {user_answer}", max_chars=FOLLOWUP_CONTEXT_CHARS)
             
             # Include training prompt if available
             training_section = ""
@@ -222,22 +215,14 @@ Generate ONE relevant follow-up question in {language} that:
 Only output the question, nothing else. No explanations, no numbering."""
 
         try:
-            response = requests.post(
-                OLLAMA_API_URL,
-                json={
-                    "model": self.model_name,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.7,
-                        "top_p": 0.9,
-                        "num_predict": 100
-                    }
-                },
-                timeout=60
+            profile = get_profile('followup')
+            result = ollama_client.generate(
+                prompt,
+                options=profile.options(language),
+                model=self.model_name,
+                timeout=60,
+                cutoff=profile.cutoff()
             )
-            response.raise_for_status()
-            result = response.json()
             question = result.get("response", "").strip()
             
             # Clean up the response
@@ -246,6 +231,7 @@ Only output the question, nothing else. No explanations, no numbering."""
             # Fallback if empty
             if len(question) < 5:
                 question = self._get_fallback_question(topic, language)
+                tracing.mark('fallback')
             
             return question
             
@@ -310,6 +296,18 @@ def get_study_material_for_machine(machine_id: int) -> str:
         return ""
 
 
+def get_relevant_study_material(machine_id: int, query: str, max_chars: int = 2000) -> str:
+    """
+    Get only the chunks of a machine's study material relevant to the query.
+    Uses the chunk index (built incrementally), so long manuals are fully covered.
+    """
+    try:
+        return get_context_index().retrieve(machine_id, query, max_chars=max_chars)
+    except Exception as e:
+        print(f"Error retrieving study material: {e}")
+        return get_study_material_for_machine(machine_id)[:max_chars]
+
+
 def get_machine_training_data(machine_id: int) -> dict:
     """
     Get training data (good/bad examples, instructions) for a specific machine.
@@ -412,14 +410,15 @@ def generate_next_question(topic: str, previous_question: str, user_answer: str,
     study_context = ""
     training_prompt = ""
     if machine_id:
-        study_context = get_study_material_for_machine(machine_id)
+        study_context = get_relevant_study_material(machine_id, f"{previous_question} {user_answer}", FOLLOWUP_CONTEXT_CHARS)
         # Get training data for few-shot learning
         training_data = get_machine_training_data(machine_id)
         if training_data:
             training_prompt = build_training_prompt(training_data)
             print(f"[LLM] Using training data for machine {machine_id}")
     
-    return llm.generate_followup_question(topic, previous_question, user_answer, language, study_context, training_prompt)
+    return llm.generate_followup_question(topic, previous_question, user_answer, language, study_context, training_prompt,
+                                          context_selected=bool(machine_id))
 
 
 def evaluate_user_answer(topic: str, question: str, user_answer: str, language: str = "Hindi", machine_id: int = None) -> dict:
@@ -432,208 +431,268 @@ def evaluate_user_answer(topic: str, question: str, user_answer: str, language:
     # Get study material if machine_id provided
     study_context = None
     if machine_id:
-        study_context = get_study_material_for_machine(machine_id)
+        study_context = get_relevant_study_material(machine_id, f"{question} {user_answer}", EVALUATION_CONTEXT_CHARS)
     
-    return llm.evaluate_answer(topic, question, user_answer, language, study_context)
+    return llm.evaluate_answer(topic, question, user_answer, language, study_context, context_selected=bool(machine_id))
 
 
-def generate_questions_from_material(machine_id: int, num_questions: int = 15, language: str = "Hindi") -> list:
-    """
-    Generate questions from study material using RELIABLE approach.
-    Includes model warm-up to prevent cold start timeouts.
-    Uses training data (good/bad examples) for few-shot learning.
-    
-    Returns list of {question, expected_answer, level}
-    Level: 1=Easy, 2=Medium, 3=Hard
-    """
-    study_content = get_study_material_for_machine(machine_id)
-    
-    if not study_content or len(study_content.strip()) < 50:
-        return []
-    
-    # Get training data for this machine
-    training_data = get_machine_training_data(machine_id)
-    training_section = ""
-    if training_data:
-        training_section = build_training_prompt(training_data)
-        print(f"[LLM] Using training data for machine {machine_id}")
-    
-    llm = get_ollama_llm()
-    all_questions = []
-    
-    # CRITICAL: Warm up the model first - this loads it into memory
-    print("[LLM] Warming up Ollama model (loading into memory)...")
+SECTION_CHARS = 1500
+QUESTIONS_PER_SECTION = 4
+DUPLICATE_SIMILARITY = 0.9
+
+# Share of each level in a generated bank - same split as viva question selection
+LEVEL_SHARE = {1: 0.4, 2: 0.35, 3: 0.25}
+
+
+def _question_level(question: str) -> int:
+    """Assign difficulty based on question type. 1=Easy, 2=Medium, 3=Hard"""
+    q_lower = question.lower()
+    if any(w in q_lower for w in ['क्यों', 'कैसे', 'why', 'how', 'explain', 'समझाइए']):
+        return 3
+    if any(w in q_lower for w in ['difference', 'compare', 'अंतर', 'फर्क']):
+        return 2
+    return 1
+
+
+def _qa_bank_to_questions(bank: QABank) -> list:
+    """Convert structured QABank output to [{level, question, expected_answer}]."""
+    return [
+        {"level": _question_level(p["question"]), "question": p["question"], "expected_answer": p["answer"]}
+        for p in bank.questions
+    ]
+
+
+def _split_sections(machine_id: int, study_content: str, section_chars: int = SECTION_CHARS) -> list:
+    """Group the material's index chunks into sections of about section_chars."""
     try:
-        warmup_start = time.time() if 'time' in dir() else 0
-        warmup = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": llm.model_name,
-                "prompt": "Say OK",
-                "stream": False,
-                "options": {"num_predict": 3}
-            },
-            timeout=60  # Allow up to 60s for cold start
-        )
-        if warmup.status_code == 200:
-            print(f"[LLM] Model warm-up complete, model is now in memory")
-        else:
-            print(f"[LLM] Warm-up returned status {warmup.status_code}")
-    except requests.exceptions.Timeout:
-        print("[LLM] WARNING: Warm-up timed out - model may be slow")
+        chunks = get_context_index().sections(machine_id)
     except Exception as e:
-        print(f"[LLM] Warm-up error: {e}")
-    
-    # Use limited context - 1500 chars is enough for good questions
-    study_text = study_content[:1500].strip()
-    
-    print(f"[LLM] Generating {num_questions} questions from {len(study_text)} chars")
+        print(f"[LLM] Could not read chunk index: {e}")
+        chunks = []
+    if not chunks:
+        chunks = [study_content[i:i + section_chars] for i in range(0, len(study_content), section_chars)]
     
+    sections = []
+    current = ""
+    for chunk in chunks:
+        if current and len(current) + len(chunk) > section_chars:
+            sections.append(current)
+            current = ""
+        current = (current + "\n" + chunk).strip()
+    if current:
+        sections.append(current)
+    return sections
+
+
+def _pick_sections(sections: list, count: int) -> list:
+    """Pick `count` sections spread evenly across the whole material."""
+    if len(sections) <= count:
+        return list(enumerate(sections))
+    step = len(sections) / count
+    return [(int(i * step), sections[int(i * step)]) for i in range(count)]
+
+
+async def _generate_section_questions(model_name: str, section_text: str, count: int, language: str, training_section: str = "") -> list:
+    """One LLM call: generate `count` Q&A pairs from one section of study material."""
     # Build prompt with training examples if available
     if training_section:
-        question_prompt = f"""Create {num_questions} Q&A pairs from this text in {language}.
+        question_prompt = f"""Create {count} Q&A pairs from this text in {language}.
 
 {training_section}
 
 === STUDY MATERIAL ===
-{study_text}
+{section_text}
 === END MATERIAL ===
 
-Format:
-Q1: question
-A1: answer
-
-Q2: question
-A2: answer
-
-Generate now:"""
+Respond as JSON only: {{"questions": [{{"question": "...", "answer": "..."}}]}}"""
     else:
         # Very simple, short prompt for reliable response
-        question_prompt = f"""Create {num_questions} Q&A pairs from this text in {language}:
+        question_prompt = f"""Create {count} Q&A pairs from this text in {language}:
 
-{study_text}
+{section_text}
 
-Format:
-Q1: question
-A1: answer
+Respond as JSON only: {{"questions": [{{"question": "...", "answer": "..."}}]}}"""
 
-Q2: question
-A2: answer
+    bank = await aollama_structured(
+        question_prompt, QABank,
+        profile='bank_generation',
+        count=count,
+        timeout=120,
+        model=model_name,
+        priority=BULK
+    )
+    return _qa_bank_to_questions(bank)
 
-Generate now:"""
 
-    try:
-        print(f"[LLM] Sending request (prompt: {len(question_prompt)} chars)...")
-        start_time = time.time()
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": llm.model_name,
-                "prompt": question_prompt,
-                "stream": False,
-                "keep_alive": "30m",  # Keep model in memory for 30 minutes
-                "options": {
-                    "temperature": 0.7,
-                    "num_predict": 1200  # Enough for 15 questions
-                }
-            },
-            timeout=120  # 2 minutes timeout
-        )
-        elapsed = time.time() - start_time
-        response.raise_for_status()
-        result = response.json().get("response", "")
-        
-        print(f"[LLM] Response received in {elapsed:.1f}s, length: {len(result)}")
-        print(f"[LLM] First 300 chars: {result[:300]}")
+class _QuestionDeduper:
+    """Drops questions that are near-duplicates (by embedding) of ones already kept."""
+    
+    def __init__(self, threshold: float = DUPLICATE_SIMILARITY):
+        self.threshold = threshold
+        self.kept_embeddings = None
+        self.kept_texts = set()
+    
+    def filter(self, questions: list) -> list:
+        fresh = []
+        for q in questions:
+            key = re.sub(r'\W+', ' ', q["question"].lower()).strip()
+            if key and key not in self.kept_texts:
+                self.kept_texts.add(key)
+                fresh.append(q)
+        if not fresh:
+            return []
         
-        # Parse Q&A pairs
-        lines = result.split('\n')
-        current_q = None
-        current_a = None
+        try:
+            from ai.nlp.embeddings import encode_batch
+            import torch
+            embeddings = encode_batch([q["question"] for q in fresh])
+        except Exception:
+            return fresh  # Exact-text de-duplication only
         
-        for line in lines:
-            line = line.strip()
-            # Remove markdown formatting like ** or *
-            line = re.sub(r'\*+', '', line).strip()
-            if not line:
-                continue
-            
-            # Check for question line (Q1:, Q2:, Question 1:, **Q1:**, etc.)
-            q_match = re.match(r'^(?:Q|Question|प्रश्न)\s*\d*[:\.\)\-]\s*(.+)', line, re.IGNORECASE)
-            if q_match:
-                # Save previous Q&A if exists
-                if current_q and current_a:
-                    # Assign difficulty based on question type
-                    level = 1  # Default easy
-                    q_lower = current_q.lower()
-                    if any(w in q_lower for w in ['क्यों', 'कैसे', 'why', 'how', 'explain', 'समझाइए']):
-                        level = 3  # Hard
-                    elif any(w in q_lower for w in ['difference', 'compare', 'अंतर', 'फर्क']):
-                        level = 2  # Medium
-                    
-                    all_questions.append({
-                        "level": level,
-                        "question": current_q,
-                        "expected_answer": current_a
-                    })
-                current_q = q_match.group(1).strip()
-                current_a = None
+        unique = []
+        for q, emb in zip(fresh, embeddings):
+            if self.kept_embeddings is not None and float((self.kept_embeddings @ emb).max()) >= self.threshold:
                 continue
-            
-            # Check for answer line (A1:, A2:, Answer 1:, etc.)
-            a_match = re.match(r'^(?:A|Answer|उत्तर)\s*\d*[:\.\)\-]\s*(.+)', line, re.IGNORECASE)
-            if a_match:
-                current_a = a_match.group(1).strip()
+            unique.append(q)
+            row = emb.unsqueeze(0)
+            self.kept_embeddings = row if self.kept_embeddings is None else torch.cat([self.kept_embeddings, row])
+        return unique
+
+
+def balance_levels(questions: list, num_questions: int) -> list:
+    """Pick num_questions with a 40/35/25 Easy/Medium/Hard split where possible."""
+    by_level = {1: [], 2: [], 3: []}
+    for q in questions:
+        by_level.setdefault(q.get("level", 1), []).append(q)
+    
+    selected = []
+    for level, share in LEVEL_SHARE.items():
+        selected.extend(by_level[level][:int(round(num_questions * share))])
+    
+    # Fill any gap from whatever is left, in generation order
+    for q in questions:
+        if len(selected) >= num_questions:
+            break
+        if q not in selected:
+            selected.append(q)
+    return selected[:num_questions]
+
+
+def iter_questions_from_material(machine_id: int, num_questions: int = 15, language: str = "Hindi"):
+    """
+    Generate questions section by section, in parallel, across the whole study material.
+    Yields (section_index, new_unique_questions) as each section completes.
+    """
+    study_content = get_study_material_for_machine(machine_id)
+    
+    if not study_content or len(study_content.strip()) < 50:
+        return
+    
+    # Get training data for this machine
+    training_data = get_machine_training_data(machine_id)
+    training_section = ""
+    if training_data:
+        training_section = build_training_prompt(training_data)
+        print(f"[LLM] Using training data for machine {machine_id}")
+    
+    llm = get_ollama_llm()
+    
+    # Load the model once if it is cold (no-op when already resident)
+    get_residency_manager().ensure_loaded(llm.model_name)
+    
+    # Over-generate by 50% so de-duplication and level balancing have room
+    wanted = int(num_questions * 1.5) + 1
+    sections = _split_sections(machine_id, study_content)
+    picked = _pick_sections(sections, max(1, -(-wanted // QUESTIONS_PER_SECTION)))
+    per_section = max(1, -(-wanted // len(picked)))
+    
+    print(f"[LLM] Generating {num_questions} questions from {len(picked)}/{len(sections)} sections ({per_section} each)")
+    
+    deduper = _QuestionDeduper()
+    start_time = time.time()
+    # All sections are in flight on the async LLM loop; the scheduler decides how many run at once
+    with tracing.call_type('bank_generation'):
+        futures = {
+            async_client.submit(_generate_section_questions(llm.model_name, text, per_section, language, training_section)): index
+            for index, text in picked
+        }
+    try:
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                questions = future.result()
+            except Exception as e:
+                print(f"[LLM] Section {index} failed: {e}")
                 continue
-            
-            # If we have a question but no answer, this line might be the answer
-            if current_q and not current_a and len(line) > 5:
-                current_a = line
-        
-        # Don't forget the last Q&A pair
-        if current_q and current_a:
-            level = 1
-            q_lower = current_q.lower()
-            if any(w in q_lower for w in ['क्यों', 'कैसे', 'why', 'how', 'explain']):
-                level = 3
-            elif any(w in q_lower for w in ['difference', 'compare', 'अंतर']):
-                level = 2
-            all_questions.append({
-                "level": level,
-                "question": current_q,
-                "expected_answer": current_a
-            })
-        
-        print(f"[LLM] Successfully parsed {len(all_questions)} questions")
-        
-    except requests.exceptions.Timeout:
-        print("[LLM] Ollama request timed out")
-    except Exception as e:
-        print(f"[LLM] Error generating questions: {e}")
+            unique = deduper.filter(questions)
+            print(f"[LLM] Section {index}: {len(questions)} parsed, {len(unique)} new ({time.time() - start_time:.1f}s)")
+            if unique:
+                yield index, unique
+    finally:
+        # Consumer went away (e.g. stream closed): cancel outstanding requests
+        for future in futures:
+            future.cancel()
+
+
+def generate_questions_from_material(machine_id: int, num_questions: int = 15, language: str = "Hindi") -> list:
+    """
+    Generate questions from study material using RELIABLE approach.
+    Sections of the material are generated in parallel, de-duplicated and balanced by level.
+    Loads the model first if it is cold to prevent cold start timeouts.
+    Uses training data (good/bad examples) for few-shot learning.
     
-    # If still not enough, create fallback questions from key sentences
-    if len(all_questions) < num_questions:
-        print(f"[LLM] Only got {len(all_questions)}, generating fallback questions...")
-        
-        # Create simple questions from the content sentences
-        sentences = study_content.replace('\n', ' ').split('.')
-        sentences = [s.strip() for s in sentences if len(s.strip()) > 30]
-        
-        for i, sentence in enumerate(sentences):
-            if len(all_questions) >= num_questions:
-                break
-            # Skip if already used as answer
-            if sentence not in [q['expected_answer'] for q in all_questions]:
-                all_questions.append({
-                    "level": (i % 3) + 1,
-                    "question": f"इस बारे में बताएं: {sentence[:60]}...?",
-                    "expected_answer": sentence
-                })
+    Returns list of {question, expected_answer, level}
+    Level: 1=Easy, 2=Medium, 3=Hard
+    """
+    study_content = get_study_material_for_machine(machine_id)
+    
+    if not study_content or len(study_content.strip()) < 50:
+        return []
+    
+    all_questions = []
+    for _, questions in iter_questions_from_material(machine_id, num_questions, language):
+        all_questions.extend(questions)
+    
+    print(f"[LLM] Successfully parsed {len(all_questions)} unique questions")
+    all_questions = balance_levels(all_questions, num_questions)
+    
+    # If still not enough, add template questions built from the material
+    all_questions = fill_with_fallback_questions(all_questions, study_content, num_questions, language)
     
     print(f"[LLM] Returning {len(all_questions[:num_questions])} questions")
     return all_questions[:num_questions]
 
 
+def fill_with_fallback_questions(all_questions: list, study_content: str, num_questions: int, language: str = "Hindi") -> list:
+    """Top up a short question list with template questions (parameter / definition / cloze) from the material."""
+    if len(all_questions) >= num_questions:
+        return all_questions
+    
+    print(f"[LLM] Only got {len(all_questions)}, adding template questions...")
+    
+    used_answers = {q['expected_answer'] for q in all_questions}
+    for question in questions_from_text(study_content, num_questions, language):
+        if len(all_questions) >= num_questions:
+            break
+        if question['expected_answer'] not in used_answers:
+            all_questions.append(question)
+    return all_questions
+
+
+def instant_questions_for_department(machine_id: int, machine_name: str, num_questions: int = 10, language: str = "Hindi") -> list:
+    """
+    Question bank without any LLM call (milliseconds): template questions from the
+    machine's study material, topped up with the department's fixed questions.
+    """
+    questions = get_template_index().questions(machine_id, num_questions, language)
+    if len(questions) < num_questions:
+        for fq in get_department_fallback_questions(machine_name, language):
+            if len(questions) >= num_questions:
+                break
+            questions.append(fq)
+    return questions[:num_questions]
+
+
 def generate_questions_for_department(machine_id: int, machine_name: str, num_questions: int = 10, language: str = "Hindi") -> list:
     """
     Generate questions for a department/machine using LLM's knowledge.
@@ -663,18 +722,8 @@ def generate_questions_for_department(machine_id: int, machine_name: str, num_qu
     llm = get_ollama_llm()
     all_questions = []
     
-    # Warm up model
-    print("[LLM] Warming up Ollama model...")
-    try:
-        warmup = requests.post(
-            OLLAMA_API_URL,
-            json={"model": llm.model_name, "prompt": "OK", "stream": False, "options": {"num_predict": 3}},
-            timeout=60
-        )
-        if warmup.status_code == 200:
-            print("[LLM] Model warm-up complete")
-    except Exception as e:
-        print(f"[LLM] Warm-up error: {e}")
+    # Load the model once if it is cold (no-op when already resident)
+    get_residency_manager().ensure_loaded(llm.model_name)
     
     # Build a department-specific prompt for Solar Panel Manufacturing
     department_context = f"""You are an expert in Solar Panel Manufacturing Industry.
@@ -697,102 +746,52 @@ Focus on:
     if training_section:
         department_context += f"\n{training_section}\n"
     
-    # Simple prompt for reliable parsing
-    question_prompt = f"""{department_context}
-
-Create {num_questions} practical Q&A pairs in {language} for workers.
-Questions should be things a worker MUST know for their job.
-
-Format exactly like this:
-Q1: question here
-A1: short answer here
-
-Q2: question here  
-A2: short answer here
-
-Generate {num_questions} Q&A pairs now:"""
-
-    try:
-        print(f"[LLM] Generating department-based questions for: {machine_name}")
-        start_time = time.time()
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": llm.model_name,
-                "prompt": question_prompt,
-                "stream": False,
-                "keep_alive": "30m",
-                "options": {
-                    "temperature": 0.7,
-                    "num_predict": 1500
-                }
-            },
-            timeout=180
-        )
-        elapsed = time.time() - start_time
-        response.raise_for_status()
-        result = response.json().get("response", "")
-        
-        print(f"[LLM] Response received in {elapsed:.1f}s, length: {len(result)}")
-        print(f"[LLM] First 300 chars: {result[:300]}")
-        
-        # Parse Q&A pairs (same parsing logic)
-        lines = result.split('\n')
-        current_q = None
-        current_a = None
-        
-        for line in lines:
-            line = line.strip()
-            line = re.sub(r'\*+', '', line).strip()  # Remove markdown
-            if not line:
-                continue
-            
-            q_match = re.match(r'^(?:Q|Question|प्रश्न)\s*\d*[:\.\)\-]\s*(.+)', line, re.IGNORECASE)
-            if q_match:
-                if current_q and current_a:
-                    level = 1
-                    q_lower = current_q.lower()
-                    if any(w in q_lower for w in ['क्यों', 'कैसे', 'why', 'how', 'explain']):
-                        level = 3
-                    elif any(w in q_lower for w in ['difference', 'compare', 'अंतर']):
-                        level = 2
-                    all_questions.append({
-                        "level": level,
-                        "question": current_q,
-                        "expected_answer": current_a
-                    })
-                current_q = q_match.group(1).strip()
-                current_a = None
-                continue
-            
-            a_match = re.match(r'^(?:A|Answer|उत्तर)\s*\d*[:\.\)\-]\s*(.+)', line, re.IGNORECASE)
-            if a_match:
-                current_a = a_match.group(1).strip()
-                continue
-            
-            if current_q and not current_a and len(line) > 5:
-                current_a = line
-        
-        # Don't forget last Q&A
-        if current_q and current_a:
-            level = 1
-            q_lower = current_q.lower()
-            if any(w in q_lower for w in ['क्यों', 'कैसे', 'why', 'how', 'explain']):
-                level = 3
-            elif any(w in q_lower for w in ['difference', 'compare', 'अंतर']):
-                level = 2
-            all_questions.append({
-                "level": level,
-                "question": current_q,
-                "expected_answer": current_a
-            })
+    # Generate in small bulk-priority chunks: each chunk is one short request,
+    # so live viva requests are scheduled in between instead of waiting minutes
+    deduper = _QuestionDeduper()
+    max_chunks = -(-num_questions // QUESTIONS_PER_SECTION) + 1
+    start_time = time.time()
+    print(f"[LLM] Generating department-based questions for: {machine_name}")
+    
+    for chunk in range(max_chunks):
+        remaining = num_questions - len(all_questions)
+        if remaining <= 0:
+            break
+        count = min(QUESTIONS_PER_SECTION, remaining)
         
-        print(f"[LLM] Parsed {len(all_questions)} questions")
+        avoid = ""
+        if all_questions:
+            avoid = "\nDo not repeat these questions:\n" + "\n".join(f"- {q['question']}" for q in all_questions[-10:]) + "\n"
         
-    except requests.exceptions.Timeout:
-        print("[LLM] Request timed out")
-    except Exception as e:
-        print(f"[LLM] Error: {e}")
+        question_prompt = f"""{department_context}
+{avoid}
+Create {count} practical Q&A pairs in {language} for workers.
+Questions should be things a worker MUST know for their job. Keep answers short.
+
+Respond as JSON only: {{"questions": [{{"question": "...", "answer": "..."}}]}}"""
+
+        try:
+            with tracing.call_type('bank_generation'):
+                bank = ollama_structured(
+                    question_prompt, QABank,
+                    profile='bank_generation',
+                    count=count,
+                    timeout=120,
+                    model=llm.model_name,
+                    priority=BULK
+                )
+            all_questions.extend(deduper.filter(_qa_bank_to_questions(bank)))
+            print(f"[LLM] Chunk {chunk + 1}: {len(all_questions)}/{num_questions} questions")
+        except requests.exceptions.Timeout:
+            print("[LLM] Request timed out")
+            break
+        except StructuredOutputError as e:
+            print(f"[LLM] Invalid structured output: {e}")
+        except Exception as e:
+            print(f"[LLM] Error: {e}")
+            break
+    
+    print(f"[LLM] Parsed {len(all_questions)} questions in {time.time() - start_time:.1f}s")
     
     # Fallback questions if LLM failed - department specific
     if len(all_questions) < num_questions:
@@ -806,6 +805,27 @@ Generate {num_questions} Q&A pairs now:"""
     return all_questions[:num_questions]
 
 
+def iter_questions_for_department(machine_id: int, machine_name: str, num_questions: int = 10, language: str = "Hindi"):
+    """
+    Same result as generate_questions_for_department(), reported incrementally.
+    Yields {"section", "questions"} for each finished section of study material,
+    then a final {"done": True, "questions", "total"} event.
+    """
+    study_content = get_study_material_for_machine(machine_id)
+    
+    if study_content and len(study_content.strip()) > 50:
+        all_questions = []
+        for section, questions in iter_questions_from_material(machine_id, num_questions, language):
+            all_questions.extend(questions)
+            yield {"section": section, "questions": questions}
+        questions = balance_levels(all_questions, num_questions)
+        questions = fill_with_fallback_questions(questions, study_content, num_questions, language)[:num_questions]
+    else:
+        questions = generate_questions_for_department(machine_id, machine_name, num_questions, language)
+    
+    yield {"done": True, "questions": questions, "total": len(questions)}
+
+
 def get_department_fallback_questions(department_name: str, language: str = "Hindi") -> list:
     """
     Generate fallback questions specific to solar panel manufacturing departments.
@@ -915,10 +935,8 @@ def evaluate_with_correct_answer(topic: str, question: str, user_answer: str, ex
 **YOUR TASK:**
 Compare the MEANING and CONCEPT of both answers. Are they talking about the SAME thing?
 
-**OUTPUT FORMAT (strictly follow):**
-MATCH: [YES/PARTIAL/NO]
-SCORE: [0-100 number only]
-FEEDBACK: [One short line in {language}]
+**OUTPUT FORMAT (JSON only):**
+{{"match": "YES" or "PARTIAL" or "NO", "score": 0-100, "feedback": "One short line in {language}"}}
 
 **SCORING GUIDE:**
 - 90-100: Same meaning, all key points covered (even if different words/language)
@@ -929,55 +947,11 @@ FEEDBACK: [One short line in {language}]
 Now evaluate:"""
 
     try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": llm.model_name,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.2,
-                    "num_predict": 100
-                }
-            },
-            timeout=30
-        )
-        response.raise_for_status()
-        result = response.json().get("response", "")
-        
-        # Parse response
-        result_upper = result.upper()
-        
-        # Check for MATCH status
-        is_match = False
-        is_partial = False
-        
-        if "MATCH:" in result_upper:
-            match_line = result_upper.split("MATCH:")[-1].split("\n")[0].strip()
-            is_match = "YES" in match_line
-            is_partial = "PARTIAL" in match_line
-        
-        # Extract score
-        score = 50  # default
-        score_match = re.search(r'SCORE:\s*(\d+)', result, re.IGNORECASE)
-        if score_match:
-            score = min(100, max(0, int(score_match.group(1))))
-        else:
-            # If no score found, guess from MATCH status
-            if is_match:
-                score = 85
-            elif is_partial:
-                score = 55
-            else:
-                score = 25
-        
-        # Extract feedback
-        feedback = "जवाब का मूल्यांकन हो गया।"
-        feedback_match = re.search(r'FEEDBACK:\s*(.+)', result, re.IGNORECASE | re.DOTALL)
-        if feedback_match:
-            feedback_text = feedback_match.group(1).strip()
-            # Take only first line
-            feedback = feedback_text.split('\n')[0].strip()
+        match = ollama_structured(prompt, AnswerMatch, profile='evaluation', model=llm.model_name, timeout=30)
+        is_match = match.match == "YES"
+        is_partial = match.match == "PARTIAL"
+        score = match.score
+        feedback = match.feedback or "जवाब का मूल्यांकन हो गया।"
         
         # Determine correctness based on score
         is_correct = score >= 70
@@ -991,16 +965,22 @@ Now evaluate:"""
             "score": score,
             "feedback": feedback,
             "correct_answer": expected_answer if not is_correct else None,
-            "user_said": user_answer
+            "user_said": user_answer,
+            "graded": True
         }
         
     except Exception as e:
+        # No grade from the LLM - say so instead of passing off a default as a real score
+        print(f"[EVALUATION] LLM grading failed: {e}")
+        tracing.mark('fallback')
         return {
             "is_correct": False,
             "score": 30,
             "feedback": "मूल्यांकन में समस्या, आगे बढ़ते हैं।",
             "correct_answer": expected_answer,
-            "user_said": user_answer
+            "user_said": user_answer,
+            "graded": False,
+            "error": str(e)
         }
 
 
@@ -0,0 +1,120 @@
+"""
+Generation Profiles
+- One named profile per kind of LLM output: sampling temperature, stop
+  sequences and a num_predict budget sized to the output we actually keep
+- Text profiles: budget = max_words x tokens per word (Devanagari text costs
+  more tokens per word) + a little slack; structured profiles: the budget of
+  the output model's JSON schema (NUM_PREDICT / num_predict(count))
+- Text profiles with cut_at are streamed and cut off on the client as soon as
+  the useful part is complete; closing the stream stops generation in Ollama
+- LLM_PROFILE_OVERRIDES (JSON) tunes profiles without code changes, e.g.
+  {"followup": {"max_words": 25}, "opening": {"temperature": 0.5}}
+- benchmark_profiles.py measures latency and output tokens per profile
+"""
+
+import json
+import math
+import os
+from dataclasses import dataclass, replace, fields, asdict
+
+# Average tokens per word for the Gemma tokenizer (Hindi answers mix Devanagari and English terms)
+TOKENS_PER_WORD = {'Hindi': 2.5, 'English': 1.4}
+
+
+@dataclass(frozen=True)
+class GenerationProfile:
+    name: str
+    temperature: float
+    max_words: int = None   # Text output: longest reply we keep, in words (None = structured output)
+    stop: tuple = ()        # Server-side stop sequences
+    cut_at: str = ""        # Streamed text: stop reading after the first of these characters
+    top_p: float = None
+    slack_tokens: int = 8
+
+    def num_predict(self, language: str = "English", model_cls=None, count: int = None) -> int:
+        if model_cls is not None:
+            return model_cls.num_predict(count) if count else model_cls.NUM_PREDICT
+        per_word = TOKENS_PER_WORD['Hindi' if 'hindi' in (language or '').lower() else 'English']
+        return math.ceil(self.max_words * per_word) + self.slack_tokens
+
+    def options(self, language: str = "English", model_cls=None, count: int = None, **extra) -> dict:
+        """Ollama options for this profile; extra keys (e.g. num_ctx) are passed through."""
+        options = {
+            "temperature": self.temperature,
+            "num_predict": self.num_predict(language, model_cls, count)
+        }
+        if self.top_p is not None:
+            options["top_p"] = self.top_p
+        if self.stop:
+            options["stop"] = list(self.stop)
+        options.update(extra)
+        return options
+
+    def cutoff(self):
+        """Client-side cutoff for ollama_client streaming (None: read the whole response)."""
+        if not self.cut_at:
+            return None
+        return lambda text: cut_text(text, self.cut_at)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["stop"] = list(self.stop)
+        data["num_predict"] = {lang: self.num_predict(lang) for lang in TOKENS_PER_WORD} if self.max_words else "schema"
+        return data
+
+
+def cut_text(text: str, terminators: str):
+    """
+    The reply up to the first terminator (a newline ends the line without being kept,
+    "?" is kept), or None while it is not complete yet. Leading blank lines are skipped.
+    """
+    start = len(text) - len(text.lstrip())
+    for i in range(start, len(text)):
+        if text[i] in terminators:
+            kept = text[start:i] if text[i] == "\n" else text[start:i + 1]
+            return kept.strip()
+    return None
+
+
+_DEFAULTS = [
+    # One follow-up question (quick viva and conversational viva), kept to its first line.
+    # No server-side "\n" stop: a reply that starts with a blank line would come back empty
+    GenerationProfile('followup', temperature=0.7, top_p=0.9, max_words=30, cut_at="?\n"),
+    # Greeting + one open question (chat viva opening, 2-3 sentences)
+    GenerationProfile('opening', temperature=0.7, max_words=50, stop=("\n\n",), cut_at="?"),
+    # Structured grading (AnswerEvaluation / AnswerMatch)
+    GenerationProfile('evaluation', temperature=0.2),
+    # End-of-conversation evaluation (ConversationEvaluation)
+    GenerationProfile('closing', temperature=0.3),
+    # Q&A bank generation (QABank, budget per requested question)
+    GenerationProfile('bank_generation', temperature=0.7),
+    # Running chat summary (ConversationSummary)
+    GenerationProfile('summary', temperature=0.2),
+]
+
+
+def _load_profiles() -> dict:
+    profiles = {p.name: p for p in _DEFAULTS}
+    raw = os.environ.get('LLM_PROFILE_OVERRIDES', '').strip()
+    if not raw:
+        return profiles
+    try:
+        overrides = json.loads(raw)
+    except ValueError as e:
+        print(f"[LLM PROFILES] Ignoring invalid LLM_PROFILE_OVERRIDES: {e}")
+        return profiles
+    known = {f.name for f in fields(GenerationProfile)} - {'name'}
+    for name, values in overrides.items():
+        if name not in profiles or not isinstance(values, dict):
+            print(f"[LLM PROFILES] Ignoring override for unknown profile {name!r}")
+            continue
+        values = {k: tuple(v) if k == 'stop' else v for k, v in values.items() if k in known}
+        profiles[name] = replace(profiles[name], **values)
+    return profiles
+
+
+PROFILES = _load_profiles()
+
+
+def get_profile(name: str) -> GenerationProfile:
+    return PROFILES[name]
@@ -0,0 +1,147 @@
+"""
+LLM Record / Replay
+- Content-addressed store of LLM requests and responses: objects/<sha256>.json,
+  keyed by the request body (minus stream / keep_alive)
+- A daily traffic log (traffic-YYYY-MM-DD.jsonl) lists every recorded call in
+  order with its latency, so a day of traffic can be replayed offline
+  (replay_llm_traffic.py)
+- LLM_RECORD_MODE:
+    off          no recording (default)
+    record       call the backend and store every request / response
+    replay       answer only from the store; a miss raises ReplayMiss (tests, benchmarks)
+    readthrough  serve deterministic requests (temperature <= LLM_READTHROUGH_MAX_TEMPERATURE)
+                 from the store, calling the backend and storing on a miss
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+from ai.llm import metrics
+
+OFF = 'off'
+RECORD = 'record'
+REPLAY = 'replay'
+READTHROUGH = 'readthrough'
+MODES = (OFF, RECORD, REPLAY, READTHROUGH)
+
+RECORD_MODE = os.environ.get('LLM_RECORD_MODE', OFF).lower()
+RECORD_DIR = os.environ.get(
+    'LLM_RECORD_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'llm_records')
+)
+READTHROUGH_MAX_TEMPERATURE = float(os.environ.get('LLM_READTHROUGH_MAX_TEMPERATURE', 0.3))
+
+# Fields that do not change what the model answers
+VOLATILE_FIELDS = {"stream", "keep_alive"}
+# Backend defaults when a request sets no temperature
+DEFAULT_TEMPERATURE = {'ollama': 0.8, 'gemini': 1.0}
+
+
+class ReplayMiss(requests.exceptions.ConnectionError):
+    """Replay mode: no recorded response for this request (handled like an unreachable backend)."""
+
+
+def request_key(payload: dict) -> str:
+    canonical = {k: v for k, v in payload.items() if k not in VOLATILE_FIELDS}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def temperature(backend: str, payload: dict):
+    if backend == 'gemini':
+        value = (payload.get("generationConfig") or {}).get("temperature")
+    else:
+        value = (payload.get("options") or {}).get("temperature")
+    return DEFAULT_TEMPERATURE.get(backend, 1.0) if value is None else value
+
+
+class LLMRecorder:
+    def __init__(self, mode: str = RECORD_MODE, directory: str = RECORD_DIR,
+                 max_temperature: float = READTHROUGH_MAX_TEMPERATURE):
+        if mode not in MODES:
+            print(f"[LLM RECORDER] Unknown LLM_RECORD_MODE {mode!r}, recording off")
+            mode = OFF
+        self.mode = mode
+        self.directory = directory
+        self.max_temperature = max_temperature
+        self._log_lock = threading.Lock()
+
+    def _object_path(self, key: str) -> str:
+        return os.path.join(self.directory, 'objects', key[:2], f"{key}.json")
+
+    def _cacheable(self, backend: str, payload: dict) -> bool:
+        return temperature(backend, payload) <= self.max_temperature
+
+    def load(self, key: str):
+        """Stored {"backend", "request", "response", ...} record or None."""
+        try:
+            with open(self._object_path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def lookup(self, backend: str, payload: dict):
+        """
+        Recorded response to serve instead of calling the backend, or None.
+        Raises ReplayMiss in replay mode when nothing was recorded.
+        """
+        if self.mode in (OFF, RECORD):
+            return None
+        if self.mode == READTHROUGH and not self._cacheable(backend, payload):
+            return None
+        record = self.load(request_key(payload))
+        if record is not None:
+            metrics.increment('llm_record_total', mode=self.mode, result='hit')
+            return record["response"]
+        metrics.increment('llm_record_total', mode=self.mode, result='miss')
+        if self.mode == REPLAY:
+            raise ReplayMiss(f"No recorded {backend} response for request {request_key(payload)[:12]}")
+        return None
+
+    def store(self, backend: str, payload: dict, response: dict, latency: float, call_type: str = None):
+        """Save a backend response (record mode; readthrough for cacheable requests)."""
+        if self.mode == RECORD or (self.mode == READTHROUGH and self._cacheable(backend, payload)):
+            try:
+                self._write(backend, payload, response, latency, call_type)
+                metrics.increment('llm_record_total', mode=self.mode, result='stored')
+            except OSError as e:
+                print(f"[LLM RECORDER] Could not store response: {e}")
+
+    def _write(self, backend: str, payload: dict, response: dict, latency: float, call_type: str):
+        key = request_key(payload)
+        path = self._object_path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            record = {
+                "key": key,
+                "backend": backend,
+                "request": {k: v for k, v in payload.items() if k not in VOLATILE_FIELDS},
+                "response": response,
+                "latency": round(latency, 4),
+                "recorded_at": time.time()
+            }
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp, path)  # Atomic: readers never see a partial object
+
+        entry = {"ts": time.time(), "key": key, "backend": backend, "call_type": call_type,
+                 "latency": round(latency, 4)}
+        log_path = os.path.join(self.directory, f"traffic-{time.strftime('%Y-%m-%d')}.jsonl")
+        with self._log_lock:
+            with open(log_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
+
+    def status(self) -> dict:
+        return {"mode": self.mode, "directory": self.directory, "readthrough_max_temperature": self.max_temperature}
+
+
+_recorder = LLMRecorder()
+
+
+def get_recorder() -> LLMRecorder:
+    return _recorder
@@ -0,0 +1,199 @@
+"""
+Ollama Model Residency Manager
+- Knows whether the model is loaded (Ollama /api/ps, cached for a few seconds)
+- Warms a cold model exactly once, even with many concurrent callers
+- Chooses keep_alive for every request: pinned during shift hours, Ollama default otherwise
+- A background thread re-warms the model if it gets evicted during a shift
+- Load events are recorded in ai.llm.metrics
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from ai.llm import metrics
+from ai.llm.health import get_breaker
+from ai.llm.ollama_client import OLLAMA_HOST, MODEL_NAME, CONNECT_TIMEOUT
+
+# "HH-HH" local time, e.g. "06-22" or "22-06" for a night shift; empty (default) disables pinning
+SHIFT_HOURS = os.environ.get('LLM_SHIFT_HOURS', '')
+SHIFT_KEEP_ALIVE = os.environ.get('LLM_KEEP_ALIVE_SHIFT', '60m')
+IDLE_KEEP_ALIVE = os.environ.get('LLM_KEEP_ALIVE_IDLE', '5m')
+PS_CACHE_SECONDS = 10
+PIN_CHECK_SECONDS = 300
+WARMUP_TIMEOUT = 120
+
+# A response whose load_duration exceeds this means the request itself loaded the model
+COLD_LOAD_SECONDS = 1.0
+
+
+def _parse_shift(value: str):
+    try:
+        start, end = (int(part) for part in value.split('-'))
+        return start % 24, end % 24
+    except ValueError:
+        return None
+
+
+def _normalize(model: str) -> str:
+    # /api/ps reports "name:tag"; "gemma3" means "gemma3:latest"
+    return model if ':' in model else f"{model}:latest"
+
+
+def in_shift(now: datetime = None) -> bool:
+    shift = _parse_shift(SHIFT_HOURS) if SHIFT_HOURS else None
+    if shift is None:
+        return False
+    hour = (now or datetime.now()).hour
+    start, end = shift
+    if start <= end:
+        return start <= hour < end
+    return hour >= start or hour < end  # Shift crosses midnight
+
+
+def pinning_enabled() -> bool:
+    """Shift hours are set and Ollama is one of the router's backends (no warm-ups in Gemini-only setups)."""
+    from ai.llm.router import enabled_backends
+    return bool(SHIFT_HOURS) and _parse_shift(SHIFT_HOURS) is not None and 'ollama' in enabled_backends()
+
+
+class ResidencyManager:
+    def __init__(self):
+        self._loaded = {}        # model -> (loaded: bool, checked_at)
+        self._locks = {}
+        self._lock = threading.Lock()
+        self._pin_thread = None
+
+    def keep_alive(self) -> str:
+        """keep_alive to send with every request right now."""
+        return SHIFT_KEEP_ALIVE if in_shift() else IDLE_KEEP_ALIVE
+
+    def _model_lock(self, model: str) -> threading.Lock:
+        with self._lock:
+            if model not in self._locks:
+                self._locks[model] = threading.Lock()
+            return self._locks[model]
+
+    def loaded_models(self) -> list:
+        """Names of models currently in Ollama memory (/api/ps)."""
+        response = requests.get(f"{OLLAMA_HOST}/api/ps", timeout=(CONNECT_TIMEOUT, 5))
+        response.raise_for_status()
+        return [_normalize(m.get('name') or m.get('model') or '') for m in response.json().get('models', [])]
+
+    def _set_loaded(self, model: str, loaded: bool):
+        with self._lock:
+            self._loaded[model] = (loaded, time.time())
+
+    def is_loaded(self, model: str = None, refresh: bool = False) -> bool:
+        model = model or MODEL_NAME
+        with self._lock:
+            cached = self._loaded.get(model)
+        if cached and not refresh and time.time() - cached[1] < PS_CACHE_SECONDS:
+            return cached[0]
+        try:
+            loaded = _normalize(model) in self.loaded_models()
+        except requests.exceptions.RequestException as e:
+            print(f"[LLM RESIDENCY] /api/ps failed: {e}")
+            return False
+        self._set_loaded(model, loaded)
+        return loaded
+
+    def ensure_loaded(self, model: str = None) -> bool:
+        """
+        Load the model if it is cold. Concurrent callers wait for the single warm-up.
+        Returns True if the model is (now) resident.
+        """
+        model = model or MODEL_NAME
+        if self.is_loaded(model):
+            metrics.increment('llm_residency_checks_total', model=model, state='warm')
+            return True
+
+        with self._model_lock(model):
+            if self.is_loaded(model, refresh=True):  # Another thread warmed it meanwhile
+                metrics.increment('llm_residency_checks_total', model=model, state='warm')
+                return True
+            metrics.increment('llm_residency_checks_total', model=model, state='cold')
+
+            breaker = get_breaker('ollama')
+            if not breaker.allow():
+                print(f"[LLM RESIDENCY] Skipping warm-up of {model}: circuit open")
+                return False
+
+            print(f"[LLM RESIDENCY] Loading {model} into memory (keep_alive={self.keep_alive()})...")
+            start = time.time()
+            try:
+                # A generate request without a prompt only loads the model
+                response = requests.post(
+                    f"{OLLAMA_HOST}/api/generate",
+                    json={"model": model, "keep_alive": self.keep_alive()},
+                    timeout=(CONNECT_TIMEOUT, WARMUP_TIMEOUT)
+                )
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                breaker.record_failure(e)
+                metrics.increment('llm_model_loads_total', model=model, reason='warmup', outcome='error')
+                print(f"[LLM RESIDENCY] Warm-up of {model} failed: {e}")
+                return False
+            breaker.record_success()
+
+            elapsed = time.time() - start
+            self._set_loaded(model, True)
+            metrics.increment('llm_model_loads_total', model=model, reason='warmup', outcome='ok')
+            metrics.observe('llm_model_load_seconds', elapsed, model=model)
+            print(f"[LLM RESIDENCY] {model} loaded in {elapsed:.1f}s")
+            return True
+
+    def note_response(self, model: str, result: dict):
+        """Called after each successful request: the model is resident; record implicit loads."""
+        self._set_loaded(model, True)
+        load_seconds = (result.get('load_duration') or 0) / 1e9
+        if load_seconds >= COLD_LOAD_SECONDS:
+            metrics.increment('llm_model_loads_total', model=model, reason='request', outcome='ok')
+            metrics.observe('llm_model_load_seconds', load_seconds, model=model)
+            print(f"[LLM RESIDENCY] {model} was cold: request spent {load_seconds:.1f}s loading it")
+
+    def start_pinning(self):
+        """Background thread that keeps the default model resident during shift hours."""
+        with self._lock:
+            if self._pin_thread and self._pin_thread.is_alive():
+                return
+            self._pin_thread = threading.Thread(target=self._pin_loop, name='llm-residency', daemon=True)
+            self._pin_thread.start()
+
+    def _pin_loop(self):
+        while True:
+            if in_shift():
+                try:
+                    self.ensure_loaded(MODEL_NAME)
+                except Exception as e:
+                    print(f"[LLM RESIDENCY] Pin check failed: {e}")
+            time.sleep(PIN_CHECK_SECONDS)
+
+    def status(self) -> dict:
+        with self._lock:
+            loaded = {model: state for model, (state, _) in self._loaded.items()}
+        return {
+            "shift_hours": SHIFT_HOURS or None,
+            "pinning": bool(self._pin_thread and self._pin_thread.is_alive()),
+            "in_shift": in_shift(),
+            "keep_alive": self.keep_alive(),
+            "loaded": loaded
+        }
+
+
+# Singleton instance
+_residency_instance = None
+_residency_lock = threading.Lock()
+
+
+def get_residency_manager():
+    global _residency_instance
+    with _residency_lock:
+        if _residency_instance is None:
+            _residency_instance = ResidencyManager()
+            if pinning_enabled():
+                _residency_instance.start_pinning()
+        return _residency_instance
@@ -0,0 +1,248 @@
+"""
+LLM Router
+- Tracks rolling latency and error rate per backend (Ollama, Gemini, local Gemma)
+- Routes each call type to the best available backend
+- Skips backends whose circuit breaker is open
+- Optionally hedges a slow call to a second backend after the primary's p90 latency,
+  but never onto a metered (quota-billed) backend: a slow Ollama must not double Gemini spend
+"""
+
+import contextvars
+import importlib
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from ai.llm import tracing
+from ai.llm.health import get_breaker
+
+WINDOW_SIZE = 50      # Calls kept per backend for latency / error stats
+MIN_SAMPLES = 5       # Below this, the backend's prior latency is used
+MIN_HEDGE_DELAY = 1.0  # Never hedge earlier than this (seconds)
+
+# Expected latency (s) before we have measurements
+PRIOR_LATENCY = {'ollama': 3.0, 'gemini': 2.0, 'local': 10.0}
+# Backends billed per request / quota: used as primary or failover, never as a hedge
+METERED_BACKENDS = {'gemini'}
+
+# call type -> backend -> (module, function); all functions share the call type's signature
+CALL_TYPES = {
+    'grade': {      # evaluate_with_correct_answer(topic, question, user_answer, expected_answer, language)
+        'backends': {
+            'ollama': ('ai.llm.ollama_llm', 'evaluate_with_correct_answer'),
+            'gemini': ('ai.llm.gemini_llm', 'evaluate_with_correct_answer'),
+        },
+        'hedge': True,
+    },
+    'followup': {   # generate_next_question(topic, previous_question, user_answer, language, machine_id)
+        'backends': {
+            'ollama': ('ai.llm.ollama_llm', 'generate_next_question'),
+            'local': ('ai.llm.gemma_llm', 'generate_next_question'),
+        },
+        'hedge': True,
+    },
+    'evaluate': {   # evaluate_user_answer(topic, question, user_answer, language, machine_id)
+        'backends': {
+            'ollama': ('ai.llm.ollama_llm', 'evaluate_user_answer'),
+        },
+        'hedge': False,
+    },
+}
+
+
+def enabled_backends() -> set:
+    return set(b.strip() for b in os.environ.get('LLM_BACKENDS', 'ollama,gemini').split(',') if b.strip())
+
+
+def _configured(backend: str) -> bool:
+    """A backend that cannot work in this deployment (Gemini without an API key) is never ranked."""
+    if backend == 'gemini':
+        from ai.llm.gemini_client import get_gemini_client
+        return get_gemini_client().configured
+    return True
+
+
+def _preferred_backend() -> str:
+    # USE_GEMINI used to hard-select the backend; now it is only a preference
+    return 'gemini' if os.getenv('USE_GEMINI', 'true').lower() == 'true' else 'ollama'
+
+
+class BackendStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = deque(maxlen=WINDOW_SIZE)  # (latency, ok)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool):
+        with self._lock:
+            self.calls.append((latency, ok))
+
+    def _latencies(self) -> list:
+        return sorted(latency for latency, _ in self.calls)
+
+    def percentile(self, p: float):
+        with self._lock:
+            latencies = self._latencies()
+        if len(latencies) < MIN_SAMPLES:
+            return None
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    def error_rate(self) -> float:
+        with self._lock:
+            if not self.calls:
+                return 0.0
+            return sum(1 for _, ok in self.calls if not ok) / len(self.calls)
+
+    def expected_cost(self) -> float:
+        """Lower is better: median latency inflated by the error rate."""
+        p50 = self.percentile(0.5)
+        if p50 is None:
+            p50 = PRIOR_LATENCY.get(self.name, 5.0)
+        return p50 * (1 + 4 * self.error_rate())
+
+    def snapshot(self) -> dict:
+        p50, p90 = self.percentile(0.5), self.percentile(0.9)
+        return {
+            "backend": self.name,
+            "samples": len(self.calls),
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p90_seconds": round(p90, 3) if p90 is not None else None,
+            "error_rate": round(self.error_rate(), 3)
+        }
+
+
+def _is_failure(result) -> bool:
+    """Graders return a fallback dict with graded=False instead of raising."""
+    return isinstance(result, dict) and result.get('graded') is False
+
+
+class LLMRouter:
+    def __init__(self):
+        self.stats = {}
+        self._functions = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='llm-hedge')
+
+    def _stats(self, backend: str) -> BackendStats:
+        with self._lock:
+            if backend not in self.stats:
+                self.stats[backend] = BackendStats(backend)
+            return self.stats[backend]
+
+    def _function(self, call_type: str, backend: str):
+        key = (call_type, backend)
+        if key not in self._functions:
+            module_name, function_name = CALL_TYPES[call_type]['backends'][backend]
+            self._functions[key] = getattr(importlib.import_module(module_name), function_name)
+        return self._functions[key]
+
+    def rank(self, call_type: str) -> list:
+        """Available backends for a call type, best first."""
+        enabled = enabled_backends()
+        preferred = _preferred_backend()
+        candidates = []
+        for backend in CALL_TYPES[call_type]['backends']:
+            if backend not in enabled or not _configured(backend) or not get_breaker(backend).available():
+                continue
+            cost = self._stats(backend).expected_cost()
+            if backend == preferred:
+                cost *= 0.8
+            candidates.append((cost, backend))
+        if not candidates:
+            # Everything is down or disabled: the first backend's own fallback handles it
+            return [next(iter(CALL_TYPES[call_type]['backends']))]
+        return [backend for _, backend in sorted(candidates)]
+
+    def _timed_call(self, call_type: str, backend: str, args, kwargs):
+        start = time.time()
+        try:
+            with tracing.call_type(call_type):
+                result = self._function(call_type, backend)(*args, **kwargs)
+        except Exception:
+            self._stats(backend).record(time.time() - start, False)
+            raise
+        self._stats(backend).record(time.time() - start, not _is_failure(result))
+        return result
+
+    def call(self, call_type: str, *args, hedge: bool = None, **kwargs):
+        """
+        Run a call on the best backend.
+        hedge: None = call type default. The hedge goes to the next unmetered backend only.
+        """
+        backends = self.rank(call_type)
+        primary = backends[0]
+        hedge = CALL_TYPES[call_type]['hedge'] if hedge is None else hedge
+        hedge_delay = self._stats(primary).percentile(0.9)
+        hedges = [b for b in backends[1:] if b not in METERED_BACKENDS]
+
+        if not hedge or not hedges or hedge_delay is None:
+            return self._call_with_failover(call_type, backends, args, kwargs)
+
+        # Hedged call: start the secondary only if the primary is slower than its p90
+        secondary = hedges[0]
+        first = self._submit(call_type, primary, args, kwargs)
+        done, _ = wait([first], timeout=max(MIN_HEDGE_DELAY, hedge_delay))
+        if done and not self._failed(first):
+            return first.result()
+
+        print(f"[LLM ROUTER] {call_type}: {primary} slower than p90 ({hedge_delay:.1f}s), hedging to {secondary}")
+        second = self._submit(call_type, secondary, args, kwargs)
+        pending = {first, second}
+        last = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                last = future
+                if not self._failed(future):
+                    return future.result()
+        return last.result()  # Both failed: return / raise the last one's fallback
+
+    def _submit(self, call_type: str, backend: str, args, kwargs):
+        # Run in a copy of the caller's context so the call lands in its request trace
+        context = contextvars.copy_context()
+        return self._executor.submit(context.run, self._timed_call, call_type, backend, args, kwargs)
+
+    @staticmethod
+    def _failed(future) -> bool:
+        return future.exception() is not None or _is_failure(future.result())
+
+    def _call_with_failover(self, call_type: str, backends: list, args, kwargs):
+        last_error = None
+        for backend in backends:
+            try:
+                result = self._timed_call(call_type, backend, args, kwargs)
+            except Exception as e:
+                print(f"[LLM ROUTER] {call_type} on {backend} failed: {e}")
+                last_error = e
+                continue
+            if _is_failure(result) and backend != backends[-1]:
+                print(f"[LLM ROUTER] {call_type} on {backend} returned fallback, trying next backend")
+                continue
+            return result
+        raise last_error
+
+    def snapshot(self) -> list:
+        with self._lock:
+            stats = list(self.stats.values())
+        return [s.snapshot() for s in stats]
+
+
+# Singleton instance
+_router_instance = None
+
+
+def get_llm_router():
+    global _router_instance
+    if _router_instance is None:
+        _router_instance = LLMRouter()
+    return _router_instance
+
+
+def routed(call_type: str):
+    """A function with the call type's signature that goes through the router."""
+    def _call(*args, **kwargs):
+        return get_llm_router().call(call_type, *args, **kwargs)
+    _call.__name__ = f"routed_{call_type}"
+    return _call
@@ -0,0 +1,198 @@
+"""
+LLM Request Scheduler
+- Every Ollama request takes a slot; LLM_SLOTS should match OLLAMA_NUM_PARALLEL
+- Priority classes: interactive (live viva) > background (summaries, drafts) > bulk (bank generation)
+- Per-class concurrency limits keep bulk work from occupying every slot
+- A freed slot goes to the highest-priority waiter whose class is under its limit
+- Bulk callers submit small chunks, so live requests get in between chunks
+- Coroutines wait as futures on their event loop (no thread per waiter); a
+  cancelled or timed-out waiter leaves the queue
+- Queue wait time is recorded per class in ai.llm.metrics
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager, asynccontextmanager
+
+import requests
+
+from ai.llm import metrics
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+BULK = 'bulk'
+
+PRIORITIES = {INTERACTIVE: 0, BACKGROUND: 1, BULK: 2}
+
+TOTAL_SLOTS = int(os.environ.get('LLM_SLOTS', 2))
+CLASS_LIMITS = {
+    INTERACTIVE: TOTAL_SLOTS,
+    BACKGROUND: int(os.environ.get('LLM_BACKGROUND_SLOTS', 1)),
+    BULK: int(os.environ.get('LLM_BULK_SLOTS', 1)),
+}
+# Slots that background + bulk work may never take together (kept free for live vivas)
+INTERACTIVE_RESERVED = int(os.environ.get('LLM_INTERACTIVE_RESERVED', 1))
+# Longest a request may wait for a slot before giving up (seconds)
+QUEUE_TIMEOUTS = {
+    INTERACTIVE: float(os.environ.get('LLM_QUEUE_TIMEOUT_INTERACTIVE', 30)),
+    BACKGROUND: float(os.environ.get('LLM_QUEUE_TIMEOUT_BACKGROUND', 120)),
+    BULK: float(os.environ.get('LLM_QUEUE_TIMEOUT_BULK', 900)),
+}
+
+
+class QueueTimeout(requests.exceptions.Timeout):
+    """No LLM slot became free in time (handled like a request timeout)."""
+
+
+class LLMScheduler:
+    def __init__(self, total_slots: int = TOTAL_SLOTS, class_limits: dict = None):
+        self.total_slots = total_slots
+        self.class_limits = dict(class_limits or CLASS_LIMITS)
+        self.running = {cls: 0 for cls in PRIORITIES}
+        self._waiting = []  # heap of (priority, seq, cls, wake); wake is None for threads
+        self._granted = set()
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+
+    def _eligible(self, cls: str) -> bool:
+        if sum(self.running.values()) >= self.total_slots or self.running[cls] >= self.class_limits[cls]:
+            return False
+        if cls != INTERACTIVE:
+            shared = max(1, self.total_slots - INTERACTIVE_RESERVED)
+            return self.running[BACKGROUND] + self.running[BULK] < shared
+        return True
+
+    def _grant(self):
+        # Called with the condition held: hand free slots to the best eligible waiters
+        for entry in sorted(self._waiting):
+            _, seq, cls, wake = entry
+            if self._eligible(cls):
+                self._waiting.remove(entry)
+                self.running[cls] += 1
+                self._granted.add(seq)
+                if wake is not None:
+                    wake()
+        heapq.heapify(self._waiting)
+        self._cond.notify_all()
+
+    def _enqueue(self, cls: str, wake=None) -> int:
+        # Called with the condition held
+        if cls not in PRIORITIES:
+            raise ValueError(f"Unknown priority class: {cls}")
+        seq = next(self._seq)
+        heapq.heappush(self._waiting, (PRIORITIES[cls], seq, cls, wake))
+        self._grant()
+        return seq
+
+    def _withdraw(self, seq: int) -> bool:
+        """Give up waiting (called with the condition held). True if the slot was granted meanwhile."""
+        if seq in self._granted:
+            self._granted.discard(seq)
+            return True
+        self._waiting = [entry for entry in self._waiting if entry[1] != seq]
+        heapq.heapify(self._waiting)
+        return False
+
+    def _timed_out(self, cls: str, timeout: float):
+        metrics.increment('llm_queue_timeouts_total', priority=cls)
+        return QueueTimeout(f"No LLM slot for {cls} request after {timeout:.0f}s")
+
+    def _acquired(self, cls: str, start: float):
+        metrics.observe('llm_queue_wait_seconds', time.time() - start, priority=cls)
+        metrics.increment('llm_scheduled_requests_total', priority=cls)
+
+    def acquire(self, cls: str = INTERACTIVE, timeout: float = None):
+        timeout = QUEUE_TIMEOUTS.get(cls, 0) if timeout is None else timeout
+        start = time.time()
+        with self._cond:
+            seq = self._enqueue(cls)
+            while seq not in self._granted:
+                remaining = timeout - (time.time() - start)
+                if remaining <= 0:
+                    self._withdraw(seq)
+                    raise self._timed_out(cls, timeout)
+                self._cond.wait(remaining)
+            self._granted.discard(seq)
+        self._acquired(cls, start)
+
+    async def aacquire(self, cls: str = INTERACTIVE, timeout: float = None):
+        """
+        acquire() for coroutines: the waiter is a future on the running loop, resolved by
+        release() from any thread - no thread is held while waiting.
+        """
+        timeout = QUEUE_TIMEOUTS.get(cls, 0) if timeout is None else timeout
+        start = time.time()
+        loop = asyncio.get_running_loop()
+        granted = loop.create_future()
+
+        def wake():
+            loop.call_soon_threadsafe(lambda: granted.done() or granted.set_result(None))
+
+        with self._cond:
+            seq = self._enqueue(cls, wake)
+            if seq in self._granted:
+                self._granted.discard(seq)
+                self._acquired(cls, start)
+                return
+        try:
+            await asyncio.wait_for(granted, timeout)
+        except asyncio.TimeoutError:
+            with self._cond:
+                if not self._withdraw(seq):
+                    raise self._timed_out(cls, timeout)
+            # Granted just as the wait timed out: keep the slot
+        except asyncio.CancelledError:
+            with self._cond:
+                got_slot = self._withdraw(seq)
+            if got_slot:
+                self.release(cls)  # Hand it straight to the next waiter
+            raise
+        else:
+            with self._cond:
+                self._granted.discard(seq)
+        self._acquired(cls, start)
+
+    def release(self, cls: str):
+        with self._cond:
+            self.running[cls] -= 1
+            self._grant()
+
+    @contextmanager
+    def slot(self, cls: str = INTERACTIVE, timeout: float = None):
+        self.acquire(cls, timeout)
+        try:
+            yield
+        finally:
+            self.release(cls)
+
+    @asynccontextmanager
+    async def aslot(self, cls: str = INTERACTIVE, timeout: float = None):
+        """slot() for coroutines: waits on the event loop, never blocks it or a worker thread."""
+        await self.aacquire(cls, timeout)
+        try:
+            yield
+        finally:
+            self.release(cls)
+
+    def status(self) -> dict:
+        with self._cond:
+            waiting = {cls: 0 for cls in PRIORITIES}
+            for _, _, cls, _ in self._waiting:
+                waiting[cls] += 1
+            return {
+                "total_slots": self.total_slots,
+                "class_limits": self.class_limits,
+                "running": dict(self.running),
+                "waiting": waiting
+            }
+
+
+_scheduler = LLMScheduler()
+
+
+def get_scheduler() -> LLMScheduler:
+    return _scheduler
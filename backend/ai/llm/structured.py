@@ -0,0 +1,323 @@
+"""
+Structured LLM Output
+- Typed result models shared by Ollama and Gemini consumers
+- Each model carries its JSON schema and a num_predict budget sized to it
+- Ollama: schema is sent as the "format" field (constrained JSON decoding)
+- Gemini: schema is sent as responseSchema with responseMimeType=application/json
+- Invalid output raises StructuredOutputError instead of silently using defaults
+"""
+
+import json
+import re
+from dataclasses import dataclass, field, asdict
+
+from ai.llm import ollama_client, async_client, tracing
+from ai.llm.profiles import get_profile
+
+
+class StructuredOutputError(Exception):
+    """LLM output did not match the expected schema."""
+
+
+def _load_json(text: str) -> dict:
+    text = (text or "").strip()
+    # Models sometimes wrap JSON in ```json fences even in JSON mode
+    text = re.sub(r'^```(?:json)?\s*|\s*```$', '', text)
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise StructuredOutputError(f"Invalid JSON: {e}: {text[:200]}")
+    if not isinstance(data, dict):
+        raise StructuredOutputError(f"Expected a JSON object, got {type(data).__name__}")
+    return data
+
+
+def _score(value) -> int:
+    try:
+        return max(0, min(100, int(round(float(value)))))
+    except (TypeError, ValueError):
+        raise StructuredOutputError(f"Invalid score: {value!r}")
+
+
+@dataclass
+class AnswerEvaluation:
+    """Relevance grading of an answer (optionally against study material)."""
+    relevant: bool
+    score: int
+    reason: str
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "relevant": {"type": "boolean"},
+            "score": {"type": "integer", "minimum": 0, "maximum": 100},
+            "reason": {"type": "string", "description": "one line explanation"}
+        },
+        "required": ["relevant", "score", "reason"]
+    }
+    NUM_PREDICT = 80
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        if "score" not in data:
+            raise StructuredOutputError("Missing score")
+        return cls(relevant=bool(data.get("relevant")), score=_score(data["score"]), reason=str(data.get("reason", "")).strip())
+
+
+@dataclass
+class AnswerMatch:
+    """Semantic match of a candidate answer against the expected answer."""
+    match: str
+    score: int
+    feedback: str
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "match": {"type": "string", "enum": ["YES", "PARTIAL", "NO"]},
+            "score": {"type": "integer", "minimum": 0, "maximum": 100},
+            "feedback": {"type": "string", "description": "one short line"}
+        },
+        "required": ["match", "score", "feedback"]
+    }
+    NUM_PREDICT = 80
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        match = str(data.get("match", "")).strip().upper()
+        if match not in ("YES", "PARTIAL", "NO"):
+            raise StructuredOutputError(f"Invalid match: {match!r}")
+        if "score" not in data:
+            raise StructuredOutputError("Missing score")
+        return cls(match=match, score=_score(data["score"]), feedback=str(data.get("feedback", "")).strip())
+
+
+@dataclass
+class AnswerMatchBatch:
+    """AnswerMatch for several numbered answers graded in one call."""
+    results: dict = field(default_factory=dict)  # {index: AnswerMatch}
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "results": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "index": {"type": "integer"},
+                        **AnswerMatch.SCHEMA["properties"]
+                    },
+                    "required": ["index", "match", "score", "feedback"]
+                }
+            }
+        },
+        "required": ["results"]
+    }
+    TOKENS_PER_ITEM = AnswerMatch.NUM_PREDICT
+
+    @classmethod
+    def num_predict(cls, count: int) -> int:
+        return 20 + cls.TOKENS_PER_ITEM * count
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        items = data.get("results")
+        if not isinstance(items, list):
+            raise StructuredOutputError("Missing results list")
+        results = {}
+        for item in items:
+            try:
+                results[int(item["index"])] = AnswerMatch.from_dict(item)
+            except (KeyError, TypeError, ValueError, StructuredOutputError):
+                continue  # Items missing from the batch are retried one by one
+        return cls(results=results)
+
+
+@dataclass
+class ConversationEvaluation:
+    """Overall grading of a chat viva conversation."""
+    score: int
+    strong_areas: str
+    weak_areas: str
+    summary: str
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "score": {"type": "integer", "minimum": 0, "maximum": 100},
+            "strong_areas": {"type": "string", "description": "comma separated"},
+            "weak_areas": {"type": "string", "description": "comma separated"},
+            "summary": {"type": "string", "description": "one line"}
+        },
+        "required": ["score", "strong_areas", "weak_areas", "summary"]
+    }
+    NUM_PREDICT = 160
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        if "score" not in data:
+            raise StructuredOutputError("Missing score")
+        return cls(
+            score=_score(data["score"]),
+            strong_areas=str(data.get("strong_areas", "")).strip(),
+            weak_areas=str(data.get("weak_areas", "")).strip(),
+            summary=str(data.get("summary", "")).strip()
+        )
+
+
+@dataclass
+class ConversationSummary:
+    """Running summary of folded interview exchanges plus per-concept coverage notes."""
+    summary: str
+    coverage: list = field(default_factory=list)  # [{"concept", "note"}]
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "summary": {"type": "string", "description": "at most 3 sentences"},
+            "coverage": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "concept": {"type": "string"},
+                        "note": {"type": "string", "description": "what the candidate showed, a few words"}
+                    },
+                    "required": ["concept", "note"]
+                }
+            }
+        },
+        "required": ["summary", "coverage"]
+    }
+    NUM_PREDICT = 220
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        summary = str(data.get("summary", "")).strip()
+        if not summary:
+            raise StructuredOutputError("Missing summary")
+        coverage = []
+        for item in data.get("coverage") or []:
+            if isinstance(item, dict) and str(item.get("concept", "")).strip():
+                coverage.append({"concept": str(item["concept"]).strip(), "note": str(item.get("note", "")).strip()})
+        return cls(summary=summary, coverage=coverage)
+
+
+@dataclass
+class QABank:
+    """A list of generated question/answer pairs."""
+    questions: list = field(default_factory=list)  # [{"question", "answer"}]
+
+    SCHEMA = {
+        "type": "object",
+        "properties": {
+            "questions": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "question": {"type": "string"},
+                        "answer": {"type": "string"}
+                    },
+                    "required": ["question", "answer"]
+                }
+            }
+        },
+        "required": ["questions"]
+    }
+    TOKENS_PER_ITEM = 90
+
+    @classmethod
+    def num_predict(cls, count: int) -> int:
+        return 20 + cls.TOKENS_PER_ITEM * count
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        items = data.get("questions")
+        if not isinstance(items, list):
+            raise StructuredOutputError("Missing questions list")
+        pairs = []
+        for item in items:
+            if isinstance(item, dict) and str(item.get("question", "")).strip() and str(item.get("answer", "")).strip():
+                pairs.append({"question": str(item["question"]).strip(), "answer": str(item["answer"]).strip()})
+        return cls(questions=pairs)
+
+    @classmethod
+    def from_text(cls, text: str):
+        """Parse, salvaging complete items if the output was cut off by num_predict."""
+        try:
+            return cls.from_dict(_load_json(text))
+        except StructuredOutputError:
+            salvaged = []
+            for obj in re.findall(r'\{[^{}]*\}', text or ""):
+                try:
+                    salvaged.append(json.loads(obj))
+                except ValueError:
+                    continue
+            result = cls.from_dict({"questions": salvaged})
+            if not result.questions:
+                raise
+            return result
+
+
+def parse(model_cls, text: str):
+    """Parse raw LLM text into model_cls or raise StructuredOutputError."""
+    if hasattr(model_cls, "from_text"):
+        return model_cls.from_text(text)
+    return model_cls.from_dict(_load_json(text))
+
+
+def to_dict(result) -> dict:
+    return asdict(result)
+
+
+def ollama_structured(prompt: str, model_cls, temperature: float = 0.3, num_predict: int = None,
+                      timeout: float = 30, model: str = None, profile: str = None, count: int = None, **kwargs):
+    """
+    Call Ollama with the model's JSON schema as "format" and parse the result.
+    profile: generation profile name (ai.llm.profiles); sets temperature and the
+    num_predict budget (count: number of items, for list models like QABank).
+    Raises requests exceptions (backend failure) or StructuredOutputError (bad output).
+    """
+    return async_client.run(aollama_structured(prompt, model_cls, temperature, num_predict, timeout, model,
+                                               profile, count, **kwargs))
+
+
+async def aollama_structured(prompt: str, model_cls, temperature: float = 0.3, num_predict: int = None,
+                             timeout: float = 30, model: str = None, profile: str = None, count: int = None,
+                             **kwargs):
+    """Coroutine version of ollama_structured() (run it on the async_client loop)."""
+    if profile is not None:
+        options = get_profile(profile).options(model_cls=model_cls, count=count)
+    else:
+        options = {
+            "temperature": temperature,
+            "num_predict": num_predict or model_cls.NUM_PREDICT
+        }
+    result = await ollama_client.agenerate(prompt, options=options, model=model, format=model_cls.SCHEMA, timeout=timeout, **kwargs)
+    try:
+        parsed = parse(model_cls, result.get("response", ""))
+    except StructuredOutputError:
+        tracing.mark('invalid')
+        raise
+    tracing.mark('parsed')
+    return parsed
+
+
+# Keys understood by Gemini's response_schema (OpenAPI subset)
+_GEMINI_SCHEMA_KEYS = {"type", "properties", "required", "items", "enum", "description", "nullable", "format"}
+
+
+def to_gemini_schema(schema: dict) -> dict:
+    """Strip JSON-schema keys that Gemini's response_schema does not support."""
+    converted = {}
+    for key, value in schema.items():
+        if key not in _GEMINI_SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {name: to_gemini_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            value = to_gemini_schema(value)
+        converted[key] = value
+    return converted
@@ -0,0 +1,241 @@
+"""
+LLM Call Instrumentation
+- Every Ollama / Gemini request produces an LLMCall record: call type, backend,
+  model, prompt / output tokens, queue wait, time to first token, tokens per
+  second and outcome
+- Records feed histograms and counters in ai.llm.metrics
+- Calls made while serving an HTTP request are also collected in that request's
+  trace: the per-request breakdown (Server-Timing header, GET /llm/traces)
+- Call type and trace live in contextvars; async_client.submit() and the router
+  carry them over to the LLM loop and worker threads
+"""
+
+import contextvars
+import itertools
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import requests
+
+from ai.llm import metrics
+
+TOKEN_COUNT_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192)
+TOKEN_RATE_BUCKETS = (1, 2, 5, 10, 20, 40, 80, 160)
+TRACE_HISTORY = 50  # Recent request traces kept for GET /llm/traces
+
+_call_type = contextvars.ContextVar('llm_call_type', default='other')
+_trace = contextvars.ContextVar('llm_trace', default=None)
+_last_call = contextvars.ContextVar('llm_last_call', default=None)
+
+_recent = deque(maxlen=TRACE_HISTORY)
+_recent_lock = threading.Lock()
+_trace_ids = itertools.count(1)
+
+
+def _ns(value) -> float:
+    return value / 1e9 if value else 0.0
+
+
+class LLMCall:
+    def __init__(self, backend: str, model: str, call_type: str = None):
+        self.call_type = call_type or _call_type.get()
+        self.backend = backend
+        self.model = model
+        self.started = time.time()
+        self.queue_wait = 0.0
+        self.ttft = None
+        self.prompt_tokens = None
+        self.output_tokens = None
+        self.tokens_per_second = None
+        self.duration = None
+        self.outcome = None
+
+    def queued(self, seconds: float):
+        """Time spent waiting for a scheduler slot / quota before the request was sent."""
+        self.queue_wait += seconds
+
+    def first_token(self):
+        """Streaming callers: the first token just arrived."""
+        if self.ttft is None:
+            self.ttft = time.time() - self.started
+
+    def finish(self, outcome: str = 'ok', prompt_tokens: int = None, output_tokens: int = None,
+               prefill_seconds: float = None, generation_seconds: float = None):
+        """Record the transport outcome (ok / timeout / queue_timeout / rate_limited / rejected / cancelled / error)."""
+        if self.duration is not None:
+            return
+        self.duration = time.time() - self.started
+        self.outcome = outcome
+        self.prompt_tokens = prompt_tokens
+        self.output_tokens = output_tokens
+        if self.ttft is None and prefill_seconds:
+            # Non-streaming: the first token came right after queueing + model load + prompt eval
+            self.ttft = self.queue_wait + prefill_seconds
+        if output_tokens and generation_seconds:
+            self.tokens_per_second = output_tokens / generation_seconds
+        self._emit()
+
+    def _emit(self):
+        labels = {"call_type": self.call_type, "backend": self.backend}
+        metrics.increment('llm_calls_total', model=self.model, outcome=self.outcome, **labels)
+        metrics.observe('llm_call_seconds', self.duration, **labels)
+        if self.queue_wait:
+            metrics.observe('llm_call_queue_seconds', self.queue_wait, **labels)
+        if self.ttft is not None:
+            metrics.observe('llm_ttft_seconds', self.ttft, **labels)
+        if self.prompt_tokens:
+            metrics.increment('llm_tokens_total', self.prompt_tokens, kind='prompt', **labels)
+            metrics.observe('llm_prompt_tokens', self.prompt_tokens, buckets=TOKEN_COUNT_BUCKETS, **labels)
+        if self.output_tokens:
+            metrics.increment('llm_tokens_total', self.output_tokens, kind='output', **labels)
+            metrics.observe('llm_output_tokens', self.output_tokens, buckets=TOKEN_COUNT_BUCKETS, **labels)
+        if self.tokens_per_second:
+            metrics.observe('llm_tokens_per_second', self.tokens_per_second, buckets=TOKEN_RATE_BUCKETS,
+                            backend=self.backend, model=self.model)
+
+    def to_dict(self) -> dict:
+        def ms(seconds):
+            return round(seconds * 1000) if seconds is not None else None
+        return {
+            "call_type": self.call_type,
+            "backend": self.backend,
+            "model": self.model,
+            "outcome": self.outcome,
+            "duration_ms": ms(self.duration),
+            "queue_ms": ms(self.queue_wait),
+            "ttft_ms": ms(self.ttft),
+            "prompt_tokens": self.prompt_tokens,
+            "output_tokens": self.output_tokens,
+            "tokens_per_second": round(self.tokens_per_second, 1) if self.tokens_per_second else None
+        }
+
+
+class RequestTrace:
+    def __init__(self, label: str):
+        self.id = next(_trace_ids)
+        self.label = label
+        self.started = time.time()
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def add(self, call: LLMCall):
+        with self._lock:
+            if call not in self.calls:
+                self.calls.append(call)
+
+    def totals(self) -> dict:
+        with self._lock:
+            calls = [c for c in self.calls if c.duration is not None]
+        prefill = sum(max(0.0, c.ttft - c.queue_wait) for c in calls if c.ttft is not None)
+        return {
+            "calls": len(calls),
+            "llm": sum(c.duration for c in calls),
+            "queue": sum(c.queue_wait for c in calls),
+            "prefill": prefill,
+            "generate": sum(c.duration - (c.ttft or c.queue_wait) for c in calls),
+            "prompt_tokens": sum(c.prompt_tokens or 0 for c in calls),
+            "output_tokens": sum(c.output_tokens or 0 for c in calls)
+        }
+
+    def server_timing(self) -> str:
+        """Server-Timing header value (summed over calls; they may have overlapped)."""
+        t = self.totals()
+        return ", ".join([
+            f'llm;dur={t["llm"] * 1000:.0f};desc="{t["calls"]} LLM calls"',
+            f'llm-queue;dur={t["queue"] * 1000:.0f}',
+            f'llm-prefill;dur={t["prefill"] * 1000:.0f};desc="{t["prompt_tokens"]} prompt tokens"',
+            f'llm-generate;dur={t["generate"] * 1000:.0f};desc="{t["output_tokens"]} output tokens"'
+        ])
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            calls = [c.to_dict() for c in self.calls]
+        totals = {k: round(v * 1000) if isinstance(v, float) else v for k, v in self.totals().items()}
+        return {"id": self.id, "request": self.label, "started": self.started, "totals_ms": totals, "calls": calls}
+
+
+@contextmanager
+def call_type(name: str):
+    """Label LLM calls made inside the block (and in work it submits to the LLM loop)."""
+    token = _call_type.set(name)
+    try:
+        yield
+    finally:
+        _call_type.reset(token)
+
+
+def start_call(backend: str, model: str, call_type: str = None) -> LLMCall:
+    call = LLMCall(backend, model, call_type)
+    _last_call.set(call)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(call)
+    return call
+
+
+def last_call():
+    """The latest LLMCall started in this context (None if none)."""
+    return _last_call.get()
+
+
+def attach(call: LLMCall):
+    """Count a call made on someone else's behalf (e.g. a shared batch request) in this context's trace."""
+    if call is None:
+        return
+    _last_call.set(call)
+    trace = _trace.get()
+    if trace is not None:
+        trace.add(call)
+
+
+def mark(outcome: str):
+    """Result-level outcome of the latest call here: parsed / invalid / fallback."""
+    call = _last_call.get()
+    trace = _trace.get()
+    if call is None and trace is not None and trace.calls:
+        call = trace.calls[-1]  # Sync code: the call ran on the loop, in another context
+    if call is not None:
+        call.outcome = outcome
+    metrics.increment('llm_results_total', call_type=call.call_type if call else _call_type.get(), outcome=outcome)
+
+
+def error_outcome(error: Exception) -> str:
+    return 'timeout' if isinstance(error, requests.exceptions.Timeout) else 'error'
+
+
+def ollama_usage(result: dict) -> dict:
+    """LLMCall.finish() arguments from an Ollama response's counters (durations are in ns)."""
+    return {
+        "prompt_tokens": result.get("prompt_eval_count"),
+        "output_tokens": result.get("eval_count"),
+        "prefill_seconds": _ns(result.get("load_duration")) + _ns(result.get("prompt_eval_duration")) or None,
+        "generation_seconds": _ns(result.get("eval_duration")) or None
+    }
+
+
+def start_trace(label: str):
+    """Begin collecting this request's LLM calls; returns the token for end_trace()."""
+    return _trace.set(RequestTrace(label))
+
+
+def current_trace():
+    return _trace.get()
+
+
+def end_trace(token):
+    trace = _trace.get()
+    try:
+        _trace.reset(token)
+    except ValueError:  # Token from another context (should not happen with sync views)
+        _trace.set(None)
+    if trace is not None and trace.calls:
+        with _recent_lock:
+            _recent.append(trace)
+
+
+def recent_traces() -> list:
+    with _recent_lock:
+        traces = list(_recent)
+    return [t.to_dict() for t in reversed(traces)]
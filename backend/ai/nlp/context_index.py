@@ -0,0 +1,205 @@
+"""
+Study Material Context Index
+- Splits StudyMaterial.content into overlapping chunks
+- Embeds chunks once and keeps them per machine (re-embeds only changed materials)
+- Retrieves the top-k chunks relevant to the current question/answer
+- Falls back to keyword overlap ranking if embeddings are unavailable
+"""
+
+import hashlib
+import os
+import re
+import threading
+import time
+
+CHUNK_SIZE = int(os.environ.get('CONTEXT_CHUNK_SIZE', 600))
+CHUNK_OVERLAP = int(os.environ.get('CONTEXT_CHUNK_OVERLAP', 100))
+TOP_K = int(os.environ.get('CONTEXT_TOP_K', 4))
+SYNC_INTERVAL = 30  # seconds between material change checks per machine
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[\.\?\!।])\s+|\n+')
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def _signature(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8', errors='ignore')).hexdigest()
+
+
+def chunk_text(text: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> list:
+    """
+    Split text into chunks of about chunk_size characters on sentence boundaries.
+    The last `overlap` characters of each chunk are repeated at the start of the next.
+    """
+    sentences = [s.strip() for s in _SENTENCE_SPLIT.split(text or "") if s and s.strip()]
+    chunks = []
+    current = ""
+    for sentence in sentences:
+        # Very long sentences (tables, run-on OCR text) are hard-split
+        if len(sentence) > chunk_size:
+            if current:
+                chunks.append(current)
+            step = max(1, chunk_size - overlap)
+            pieces = [sentence[i:i + chunk_size] for i in range(0, len(sentence) - overlap, step)]
+            chunks.extend(pieces[:-1])
+            current = pieces[-1]
+            continue
+        if current and len(current) + len(sentence) + 1 > chunk_size:
+            chunks.append(current)
+            current = current[-overlap:] if overlap else ""
+        current = (current + " " + sentence).strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _keyword_scores(query: str, chunks: list) -> list:
+    query_words = set(w.lower() for w in _WORD.findall(query or "") if len(w) > 2)
+    scores = []
+    for chunk in chunks:
+        chunk_words = set(w.lower() for w in _WORD.findall(chunk))
+        scores.append(len(query_words & chunk_words) / (len(query_words) or 1))
+    return scores
+
+
+def _embed(chunks: list):
+    try:
+        from ai.nlp.embeddings import encode_batch
+        return encode_batch(chunks)
+    except Exception as e:
+        print(f"[ContextIndex] Embeddings unavailable, using keyword ranking: {e}")
+        return None
+
+
+def _rank(query: str, chunks: list, embeddings) -> list:
+    """Return chunk indices ordered by relevance to the query."""
+    if embeddings is not None:
+        try:
+            from ai.nlp.embeddings import encode_batch
+            query_emb = encode_batch([query])[0]
+            scores = [float(s) for s in (embeddings @ query_emb)]
+        except Exception as e:
+            print(f"[ContextIndex] Query embedding failed, using keyword ranking: {e}")
+            scores = _keyword_scores(query, chunks)
+    else:
+        scores = _keyword_scores(query, chunks)
+    return sorted(range(len(chunks)), key=lambda i: scores[i], reverse=True)
+
+
+def _join(chunks: list, indices: list, max_chars: int) -> str:
+    """Join selected chunks in document order, staying under max_chars."""
+    selected = []
+    total = 0
+    for i in indices:
+        if total + len(chunks[i]) > max_chars and selected:
+            continue
+        selected.append(i)
+        total += len(chunks[i])
+    return "\n...\n".join(chunks[i] for i in sorted(selected))
+
+
+class ContextIndex:
+    def __init__(self):
+        """
+        Per-machine chunk index.
+        _machines[machine_id] = {
+            "materials": {material_id: {"signature": str, "chunks": [...], "embeddings": tensor}},
+            "checked_at": float
+        }
+        """
+        self._machines = {}
+        self._adhoc = {}  # signature -> (chunks, embeddings) for raw text passed in directly
+        self._lock = threading.Lock()
+
+    def _load_materials(self, machine_id: int) -> list:
+        from app.models.models import StudyMaterial
+        materials = StudyMaterial.query.filter_by(machine_id=machine_id, is_active=True).all()
+        return [(m.id, m.content or "") for m in materials]
+
+    def sync(self, machine_id: int, force: bool = False):
+        """Re-chunk and re-embed only the materials that were added or changed."""
+        with self._lock:
+            entry = self._machines.setdefault(machine_id, {"materials": {}, "checked_at": 0})
+            if not force and time.time() - entry["checked_at"] < SYNC_INTERVAL:
+                return entry
+
+        try:
+            materials = self._load_materials(machine_id)
+        except Exception as e:
+            print(f"[ContextIndex] Error loading study material: {e}")
+            return entry
+
+        current = {}
+        for material_id, content in materials:
+            signature = _signature(content)
+            old = entry["materials"].get(material_id)
+            if old and old["signature"] == signature:
+                current[material_id] = old
+                continue
+            chunks = chunk_text(content)
+            print(f"[ContextIndex] Indexing material {material_id} for machine {machine_id}: {len(chunks)} chunks")
+            current[material_id] = {"signature": signature, "chunks": chunks, "embeddings": _embed(chunks)}
+
+        with self._lock:
+            entry["materials"] = current
+            entry["checked_at"] = time.time()
+        return entry
+
+    def invalidate(self, machine_id: int = None):
+        """Force a change check on next use (all machines if machine_id is None)."""
+        with self._lock:
+            for key, entry in self._machines.items():
+                if machine_id is None or key == machine_id:
+                    entry["checked_at"] = 0
+
+    def _flatten(self, machine_id: int):
+        entry = self.sync(machine_id)
+        chunks = []
+        embeddings = []
+        for material_id in sorted(entry["materials"]):
+            material = entry["materials"][material_id]
+            chunks.extend(material["chunks"])
+            embeddings.append(material["embeddings"])
+        if not chunks or any(e is None for e in embeddings):
+            return chunks, None
+        import torch
+        return chunks, torch.cat(embeddings)
+
+    def retrieve(self, machine_id: int, query: str, k: int = TOP_K, max_chars: int = 2000) -> str:
+        """Top-k chunks of the machine's study material most relevant to the query."""
+        chunks, embeddings = self._flatten(machine_id)
+        if not chunks:
+            return ""
+        return _join(chunks, _rank(query, chunks, embeddings)[:k], max_chars)
+
+    def sections(self, machine_id: int) -> list:
+        """All chunks of the machine's study material in document order."""
+        chunks, _ = self._flatten(machine_id)
+        return chunks
+
+    def select_relevant(self, text: str, query: str, k: int = TOP_K, max_chars: int = 2000) -> str:
+        """Same as retrieve() but for raw text that is not tied to a machine."""
+        if not text or len(text) <= max_chars:
+            return text or ""
+        signature = _signature(text)
+        with self._lock:
+            cached = self._adhoc.get(signature)
+        if cached is None:
+            chunks = chunk_text(text)
+            cached = (chunks, _embed(chunks))
+            with self._lock:
+                if len(self._adhoc) >= 32:
+                    self._adhoc.pop(next(iter(self._adhoc)))
+                self._adhoc[signature] = cached
+        chunks, embeddings = cached
+        return _join(chunks, _rank(query, chunks, embeddings)[:k], max_chars)
+
+
+# Singleton instance
+_index_instance = None
+
+
+def get_context_index():
+    global _index_instance
+    if _index_instance is None:
+        _index_instance = ContextIndex()
+    return _index_instance
@@ -0,0 +1,288 @@
+"""
+Cross-Encoder Answer Grader
+- Scores (expected answer, candidate answer) pairs with a small multilingual
+  cross-encoder: one forward pass on CPU instead of a prompted LLM call
+- GRADER_CROSS_ENCODER_RUNTIME=onnx loads the model through the ONNX backend
+  of sentence-transformers (torch otherwise)
+- Raw scores are mapped to the 0-100 scale by an isotonic fit on graded viva
+  history (viva_records.answers_json); calibrate_grader.py builds it
+- Each grade reports a confidence: how often history answers with a similar
+  raw score got the same YES / PARTIAL / NO decision
+- GRADER_BACKEND selects the grader behind /evaluate_with_answer and /evaluate_batch:
+    llm            routed LLM grading (Gemini / Ollama), the default
+    cross_encoder  cross-encoder only (LLM if the model cannot be loaded)
+    hybrid         cross-encoder, LLM only when its confidence is below GRADER_MIN_CONFIDENCE
+"""
+
+import bisect
+import json
+import math
+import os
+import threading
+
+from ai.llm import metrics
+
+CROSS_ENCODER_MODEL = os.environ.get('GRADER_CROSS_ENCODER_MODEL', 'cross-encoder/mmarco-mMiniLMv2-L12-H384-v1')
+CROSS_ENCODER_RUNTIME = os.environ.get('GRADER_CROSS_ENCODER_RUNTIME', 'torch').lower()
+CALIBRATION_PATH = os.environ.get(
+    'GRADER_CALIBRATION_PATH',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'grader_calibration.json')
+)
+MIN_CONFIDENCE = float(os.environ.get('GRADER_MIN_CONFIDENCE', 0.8))
+# Without calibration the raw score is only a guess: never confident enough to skip the LLM in hybrid mode
+UNCALIBRATED_MAX_CONFIDENCE = 0.6
+
+# Same thresholds as evaluate_with_correct_answer()
+CORRECT_SCORE = 70
+PARTIAL_SCORE = 40
+DECISIONS = ('YES', 'PARTIAL', 'NO')
+
+FEEDBACK = {
+    'Hindi': {'YES': "बिल्कुल सही!", 'PARTIAL': "आंशिक रूप से सही।", 'NO': "यह जवाब सही नहीं है।"},
+    'English': {'YES': "Correct!", 'PARTIAL': "Partially correct.", 'NO': "This answer is not correct."},
+}
+
+
+def decision(score: float) -> str:
+    if score >= CORRECT_SCORE:
+        return 'YES'
+    if score >= PARTIAL_SCORE:
+        return 'PARTIAL'
+    return 'NO'
+
+
+def _sigmoid(x: float) -> float:
+    return 1 / (1 + math.exp(-max(-30.0, min(30.0, x))))
+
+
+def _isotonic(xs: list, ys: list) -> tuple:
+    """Pool-adjacent-violators: non-decreasing fit of ys over xs; returns (x knots, y knots)."""
+    blocks = []  # [sum_y, count, x_min, x_max]
+    for x, y in sorted(zip(xs, ys)):
+        blocks.append([y, 1, x, x])
+        while len(blocks) > 1 and blocks[-2][0] / blocks[-2][1] > blocks[-1][0] / blocks[-1][1]:
+            total, count, _, x_max = blocks.pop()
+            blocks[-1][0] += total
+            blocks[-1][1] += count
+            blocks[-1][3] = x_max
+    return [(b[2] + b[3]) / 2 for b in blocks], [b[0] / b[1] for b in blocks]
+
+
+class Calibration:
+    """Raw cross-encoder score -> 0-100 grade, plus per-bin decision agreement for confidence."""
+
+    def __init__(self, knots_x: list, knots_y: list, bin_edges: list, bin_counts: list, samples: int, model: str):
+        self.knots_x = knots_x
+        self.knots_y = knots_y
+        self.bin_edges = bin_edges    # Upper raw-score edge of each bin but the last
+        self.bin_counts = bin_counts  # [{"YES": n, "PARTIAL": n, "NO": n}] per bin
+        self.samples = samples
+        self.model = model
+
+    @classmethod
+    def fit(cls, raw: list, scores: list, model: str = CROSS_ENCODER_MODEL, bins: int = 10):
+        """raw: cross-encoder outputs; scores: graded history (0-100) for the same answers."""
+        knots_x, knots_y = _isotonic(raw, scores)
+        ordered = sorted(zip(raw, scores))
+        size = max(5, -(-len(ordered) // bins))
+        groups = [ordered[i:i + size] for i in range(0, len(ordered), size)]
+        bin_edges = [group[-1][0] for group in groups[:-1]]
+        bin_counts = [{d: sum(1 for _, s in group if decision(s) == d) for d in DECISIONS} for group in groups]
+        return cls(knots_x, knots_y, bin_edges, bin_counts, len(ordered), model)
+
+    def score(self, raw: float) -> int:
+        i = bisect.bisect_left(self.knots_x, raw)
+        if i == 0:
+            value = self.knots_y[0]
+        elif i == len(self.knots_x):
+            value = self.knots_y[-1]
+        else:
+            x0, x1 = self.knots_x[i - 1], self.knots_x[i]
+            y0, y1 = self.knots_y[i - 1], self.knots_y[i]
+            value = y0 + (y1 - y0) * (raw - x0) / (x1 - x0)
+        return max(0, min(100, int(round(value))))
+
+    def confidence(self, raw: float, label: str) -> float:
+        """Share of history answers in this raw-score bin with the same decision (Laplace-smoothed)."""
+        counts = self.bin_counts[bisect.bisect_left(self.bin_edges, raw)]
+        return (counts[label] + 1) / (sum(counts.values()) + len(DECISIONS))
+
+    def to_dict(self) -> dict:
+        return {"model": self.model, "samples": self.samples, "knots_x": self.knots_x, "knots_y": self.knots_y,
+                "bin_edges": self.bin_edges, "bin_counts": self.bin_counts}
+
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(data["knots_x"], data["knots_y"], data["bin_edges"], data["bin_counts"],
+                   data.get("samples", 0), data.get("model", ""))
+
+    def save(self, path: str = CALIBRATION_PATH):
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+
+
+class CrossEncoderGrader:
+    def __init__(self, model_name: str = CROSS_ENCODER_MODEL, runtime: str = CROSS_ENCODER_RUNTIME,
+                 calibration_path: str = CALIBRATION_PATH):
+        self.model_name = model_name
+        self.runtime = runtime
+        self.calibration_path = calibration_path
+        self._model = None
+        self._calibration = None
+        self._calibration_mtime = None
+        self._lock = threading.Lock()
+
+    def _get_model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    print(f"[CrossEncoderGrader] Loading model: {self.model_name} ({self.runtime})")
+                    if self.runtime == 'onnx':
+                        try:
+                            self._model = CrossEncoder(self.model_name, backend='onnx')
+                        except (TypeError, ImportError, ValueError) as e:
+                            print(f"[CrossEncoderGrader] ONNX runtime unavailable, using torch: {e}")
+                    if self._model is None:
+                        self._model = CrossEncoder(self.model_name)
+        return self._model
+
+    def warm_up(self) -> bool:
+        """Load the model now (e.g. while the answer is being transcribed). False if it cannot be loaded."""
+        try:
+            self._get_model()
+            return True
+        except Exception as e:
+            print(f"[CrossEncoderGrader] Model not available: {e}")
+            return False
+
+    def calibration(self):
+        """Current calibration (reloaded when calibrate_grader.py rewrites the file), or None."""
+        try:
+            mtime = os.path.getmtime(self.calibration_path)
+        except OSError:
+            return None
+        if mtime != self._calibration_mtime:
+            try:
+                with open(self.calibration_path, encoding='utf-8') as f:
+                    calibration = Calibration.from_dict(json.load(f))
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[CrossEncoderGrader] Invalid calibration file {self.calibration_path}: {e}")
+                calibration = None
+            if calibration is not None and calibration.model != self.model_name:
+                print(f"[CrossEncoderGrader] Calibration was fitted for {calibration.model}, ignoring it")
+                calibration = None
+            self._calibration, self._calibration_mtime = calibration, mtime
+        return self._calibration
+
+    def raw_scores(self, expected_answers: list, user_answers: list) -> list:
+        """Cross-encoder outputs for expected_answers[i] vs user_answers[i] (one batch)."""
+        if not expected_answers:
+            return []
+        pairs = [(e or "", u or "") for e, u in zip(expected_answers, user_answers)]
+        return [float(s) for s in self._get_model().predict(pairs, batch_size=32)]
+
+    def grade_raw(self, raw: float) -> tuple:
+        """(score 0-100, decision, confidence, calibrated) for a raw cross-encoder output."""
+        calibration = self.calibration()
+        if calibration is None:
+            score = int(round(_sigmoid(raw) * 100))
+            label = decision(score)
+            # Distance from the nearest decision threshold, capped: a guess until calibrated
+            margin = min(abs(score - CORRECT_SCORE), abs(score - PARTIAL_SCORE))
+            return score, label, round(min(UNCALIBRATED_MAX_CONFIDENCE, 0.34 + margin / 100), 3), False
+        score = calibration.score(raw)
+        label = decision(score)
+        return score, label, round(calibration.confidence(raw, label), 3), True
+
+    def evaluate(self, topic: str, question: str, user_answer: str, expected_answer: str, language: str = "Hindi") -> dict:
+        """Same signature and result shape as evaluate_with_correct_answer(), plus match / confidence."""
+        hindi = "hindi" in (language or "").lower()
+        if not user_answer or len(user_answer.strip()) < 3:
+            return {
+                "is_correct": False,
+                "score": 0,
+                "feedback": "कृपया जवाब दें।" if hindi else "Please answer.",
+                "correct_answer": expected_answer,
+                "user_said": user_answer,
+                "confidence": 1.0,
+                "grader": "rule"
+            }
+        raw = self.raw_scores([expected_answer], [user_answer])[0]
+        score, label, confidence, calibrated = self.grade_raw(raw)
+        metrics.increment('grader_decisions_total', grader='cross_encoder', decision=label)
+        metrics.observe('grader_confidence', confidence, buckets=(0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 0.95, 1.0))
+        is_correct = score >= CORRECT_SCORE
+        return {
+            "is_correct": is_correct,
+            "is_partial": label == 'PARTIAL',
+            "score": score,
+            "match": label,
+            "feedback": FEEDBACK['Hindi' if hindi else 'English'][label],
+            "correct_answer": expected_answer if not is_correct else None,
+            "user_said": user_answer,
+            "graded": True,
+            "confidence": confidence,
+            "calibrated": calibrated,
+            "raw_score": round(raw, 4),
+            "grader": "cross_encoder"
+        }
+
+    def status(self) -> dict:
+        calibration = self.calibration()
+        return {
+            "model": self.model_name,
+            "runtime": self.runtime,
+            "loaded": self._model is not None,
+            "calibrated": calibration is not None,
+            "calibration_samples": calibration.samples if calibration else 0,
+            "min_confidence": MIN_CONFIDENCE
+        }
+
+
+# Singleton instance
+_grader_instance = None
+
+
+def get_cross_encoder_grader():
+    global _grader_instance
+    if _grader_instance is None:
+        _grader_instance = CrossEncoderGrader()
+    return _grader_instance
+
+
+def get_grader(backend: str = None):
+    """Grading function with the signature of evaluate_with_correct_answer() for GRADER_BACKEND."""
+    from ai.llm.router import routed
+    backend = (backend or os.environ.get('GRADER_BACKEND', 'llm')).lower()
+    routed_grade = routed('grade')
+
+    def llm_grade(topic, question, user_answer, expected_answer, language="Hindi"):
+        result = routed_grade(topic, question, user_answer, expected_answer, language)
+        result.setdefault("grader", "llm")  # Stored with the answer: calibration learns from LLM grades only
+        return result
+
+    if backend not in ('cross_encoder', 'hybrid'):
+        return llm_grade
+    grader = get_cross_encoder_grader()
+
+    def grade(topic, question, user_answer, expected_answer, language="Hindi"):
+        try:
+            result = grader.evaluate(topic, question, user_answer, expected_answer, language)
+        except Exception as e:
+            print(f"[CrossEncoderGrader] Grading failed, using LLM: {e}")
+            metrics.increment('grader_total', backend=backend, outcome='unavailable')
+            return llm_grade(topic, question, user_answer, expected_answer, language)
+        if backend == 'cross_encoder' or result["confidence"] >= MIN_CONFIDENCE:
+            metrics.increment('grader_total', backend=backend, outcome='cross_encoder')
+            return result
+        # Dispute: not confident enough, let the LLM decide
+        metrics.increment('grader_total', backend=backend, outcome='deferred')
+        llm_result = llm_grade(topic, question, user_answer, expected_answer, language)
+        llm_result.setdefault("grader", "llm")
+        llm_result["cross_encoder"] = {k: result[k] for k in ("score", "match", "confidence")}
+        return llm_result
+
+    return grade
@@ -0,0 +1,52 @@
+"""
+Shared Sentence Embedding Model
+- One lazily loaded SentenceTransformer for the whole process
+- Batch encoding helpers (one forward pass for many texts)
+"""
+
+import os
+import threading
+
+EMBEDDING_MODEL_NAME = os.environ.get('EMBEDDING_MODEL', 'paraphrase-MiniLM-L6-v2')
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """Return the singleton SentenceTransformer (loaded on first use)."""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                from sentence_transformers import SentenceTransformer
+                print(f"[Embeddings] Loading model: {EMBEDDING_MODEL_NAME}")
+                _model = SentenceTransformer(EMBEDDING_MODEL_NAME)
+    return _model
+
+
+def encode_batch(texts: list):
+    """
+    Encode a list of texts in a single batch.
+    Returns a normalized tensor of shape (len(texts), dim).
+    """
+    model = get_embedding_model()
+    return model.encode(
+        [t or "" for t in texts],
+        convert_to_tensor=True,
+        normalize_embeddings=True,
+        batch_size=32
+    )
+
+
+def pairwise_similarity(texts_a: list, texts_b: list) -> list:
+    """
+    Cosine similarity of texts_a[i] vs texts_b[i] for every i.
+    Both lists are encoded together in ONE batch.
+    """
+    if not texts_a:
+        return []
+    embeddings = encode_batch(list(texts_a) + list(texts_b))
+    n = len(texts_a)
+    sims = (embeddings[:n] * embeddings[n:]).sum(dim=1)
+    return [float(s) for s in sims]
@@ -0,0 +1,270 @@
+"""
+Template Question Generator (no LLM)
+- Builds a usable question bank from study material in milliseconds:
+    parameter   sentence with a number + unit  -> "<parameter> kitna hona chahiye?"
+    definition  "X is / means / refers to Y"   -> "X kya hai?"
+    cloze       sentence with a domain term    -> the term blanked out
+- Extraction is indexed per machine from StudyMaterial; a material is only
+  re-extracted when its content changes (same scheme as ai.nlp.context_index)
+- Output has the LLM generators' shape ({question, expected_answer, level})
+  plus "source": "template", so LLM questions can replace or augment it later
+"""
+
+import hashlib
+import re
+import threading
+import time
+from collections import Counter
+
+SYNC_INTERVAL = 30  # seconds between material change checks per machine
+MIN_SENTENCE = 25
+MAX_SENTENCE = 240
+
+_SENTENCE_SPLIT = re.compile(r'(?<=[\.\?\!।])\s+|\n+')
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+# Number (or range) followed by a unit: "145 °C", "140-150°C", "≥ 1.5 N/mm", "± 2 mm", "30 sec"
+_UNIT = (r'°\s?C|°|mm²|mm|cm|µm|um|micron|N/mm|N|kg|gm?|MPa|kPa|Pa|bar|psi|%|kWp|kW|Wp|W|mV|V|mA|A|'
+         r'mΩ|Ω|ohms?|lux|rpm|sec|seconds?|s|min|minutes?|hrs?|hours?|days?|m')
+_MEASURE = re.compile(
+    r'(?P<value>[≥≤<>±~]?\s?\d+(?:[\.,]\d+)?(?:\s?(?:-|–|to|से)\s?\d+(?:[\.,]\d+)?)?)\s?'
+    r'(?P<unit>' + _UNIT + r')(?![\w/])',
+    re.UNICODE
+)
+# Words between the parameter name and its value
+_CONNECTORS = {
+    'should', 'must', 'shall', 'be', 'is', 'are', 'was', 'kept', 'set', 'at', 'of', 'to', 'between',
+    'within', 'around', 'about', 'approximately', 'maximum', 'minimum', 'max', 'min', 'not', 'less',
+    'more', 'than', 'above', 'below', 'under', 'over', 'upto', 'up', 'the', 'a', 'an', 'for', 'with',
+    'होना', 'चाहिए', 'है', 'हैं', 'का', 'की', 'के', 'को', 'में', 'तक', 'लगभग', 'कम', 'से', 'ज्यादा',
+}
+_STOPWORDS = _CONNECTORS | {
+    'and', 'or', 'in', 'on', 'by', 'it', 'this', 'that', 'these', 'those', 'as', 'if', 'then', 'all',
+    'any', 'each', 'check', 'note', 'step', 'and', 'also', 'और', 'या', 'यह', 'वह', 'पर', 'भी',
+}
+_PRONOUN_SUBJECTS = {'it', 'this', 'that', 'these', 'those', 'they', 'there', 'he', 'she', 'we', 'you', 'यह', 'वह', 'ये', 'वे'}
+
+_DEFINITION_EN = re.compile(
+    r'^(?P<term>[^,;:]{3,60}?)\s+(?:is defined as|is called|refers to|means|is|are)\s+(?:a|an|the)?\s*(?P<rest>.{15,})$',
+    re.IGNORECASE
+)
+_DEFINITION_HI = re.compile(r'^(?P<term>[^,;:।]{2,60}?)\s+(?:का मतलब|का अर्थ|यानी|मतलब)\s+(?P<rest>.{10,})$')
+_ACRONYM = re.compile(r'\b[A-Z][A-Z0-9]{1,7}s?\b')
+_CAPITALIZED = re.compile(r'\b[A-Z][a-z]{3,}(?:\s[A-Z][a-z]{3,})?\b')
+
+QUESTION_TEMPLATES = {
+    'Hindi': {
+        'parameter': "{subject} kitna hona chahiye?",
+        'definition': "{subject} kya hai?",
+        'cloze': "Khali jagah bhariye: {subject}",
+    },
+    'English': {
+        'parameter': "What should the {subject} be?",
+        'definition': "What is {subject}?",
+        'cloze': "Fill in the blank: {subject}",
+    },
+}
+# Recall of a term is easy, a value is medium, a value with a range / tolerance is hard
+KIND_LEVELS = {'definition': 1, 'cloze': 1, 'parameter': 2}
+
+
+def _signature(text: str) -> str:
+    return hashlib.sha1(text.encode('utf-8', errors='ignore')).hexdigest()
+
+
+def _sentences(text: str) -> list:
+    sentences = [re.sub(r'\s+', ' ', s).strip(' -•*\t') for s in _SENTENCE_SPLIT.split(text or "")]
+    return [s for s in sentences if MIN_SENTENCE <= len(s) <= MAX_SENTENCE]
+
+
+def _clean_phrase(words: list, max_words: int = 6) -> str:
+    while words and words[-1].lower().strip('.,:;()') in _CONNECTORS:
+        words = words[:-1]
+    words = words[-max_words:]
+    while words and words[0].lower().strip('.,:;()') in _STOPWORDS:
+        words = words[1:]
+    return " ".join(words).strip(' ,:;-=()')
+
+
+def _parameter(sentence: str):
+    """(parameter name, value) for the first measured value in the sentence, or None."""
+    match = _MEASURE.search(sentence)
+    if not match:
+        return None
+    before = re.split(r'[,;:=(]', sentence[:match.start()])[-1].split()
+    # Hindi puts the value before "होना चाहिए": "तापमान 145°C होना चाहिए"
+    name = _clean_phrase(before)
+    if len(_WORD.findall(name)) == 0 or len(name) < 3 or name.split()[0].lower() in _PRONOUN_SUBJECTS:
+        return None
+    return name, match.group(0).strip()
+
+
+def _definition(sentence: str):
+    if _MEASURE.search(sentence):
+        return None
+    match = _DEFINITION_EN.match(sentence) or _DEFINITION_HI.match(sentence)
+    if not match:
+        return None
+    rest = match.group('rest').split()
+    if rest[0].lower().endswith('ed') or rest[0].lower() in ('not', 'used', 'done', 'made', 'kept'):
+        return None  # Passive voice ("is checked for ..."), not a definition
+    term = _clean_phrase(match.group('term').split(), max_words=7)
+    if not term or term.split()[0].lower() in _PRONOUN_SUBJECTS or len(term.split()) > 6:
+        return None
+    return term
+
+
+def domain_terms(text: str, min_count: int = 2) -> set:
+    """Acronyms (EVA, EL, IPQC) and capitalized terms that recur in the material."""
+    terms = set(_ACRONYM.findall(text or ""))
+    counts = Counter(_CAPITALIZED.findall(text or ""))
+    terms.update(term for term, count in counts.items() if count >= min_count and term.lower() not in _STOPWORDS)
+    return {t for t in terms if t.lower() not in _STOPWORDS}
+
+
+def extract_candidates(text: str) -> list:
+    """
+    Language-neutral question candidates from material text, in document order:
+    [{"kind", "subject", "answer", "level", "position"}]. At most one per sentence.
+    """
+    terms = domain_terms(text)
+    term_pattern = re.compile(r'\b(' + "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)) + r')\b') if terms else None
+    candidates = []
+    seen = set()
+    for position, sentence in enumerate(_sentences(text)):
+        key = " ".join(_WORD.findall(sentence.lower()))
+        if key in seen:
+            continue
+        seen.add(key)
+
+        parameter = _parameter(sentence)
+        if parameter:
+            name, value = parameter
+            ranged = bool(re.search(r'\d\s?(?:-|–|to|से)\s?\d|±', value))
+            candidates.append({"kind": "parameter", "subject": name, "answer": sentence,
+                               "level": 3 if ranged else KIND_LEVELS['parameter'], "position": position})
+            continue
+        term = _definition(sentence)
+        if term:
+            candidates.append({"kind": "definition", "subject": term, "answer": sentence,
+                               "level": KIND_LEVELS['definition'], "position": position})
+            continue
+        match = term_pattern.search(sentence) if term_pattern else None
+        if match and len(sentence) <= 180 and len(sentence.split()) >= 6:
+            cloze = sentence[:match.start()] + "..." + sentence[match.end():]
+            candidates.append({"kind": "cloze", "subject": cloze, "answer": f"{match.group(1)} - {sentence}",
+                               "level": KIND_LEVELS['cloze'], "position": position})
+    return candidates
+
+
+def render(candidate: dict, language: str = "Hindi") -> dict:
+    templates = QUESTION_TEMPLATES['Hindi' if 'hindi' in (language or '').lower() else 'English']
+    subject = candidate["subject"]
+    if candidate["kind"] != "cloze" and subject[:2].istitle():
+        subject = subject[0].lower() + subject[1:]  # "Curing time" mid-sentence; acronyms stay
+    question = templates[candidate["kind"]].format(subject=subject)
+    return {
+        "question": question[0].upper() + question[1:],
+        "expected_answer": candidate["answer"],
+        "level": candidate["level"],
+        "kind": candidate["kind"],
+        "source": "template",
+    }
+
+
+def _spread(items: list, count: int) -> list:
+    """Items reordered so the first `count` are evenly spaced through the list."""
+    step = len(items) / count if 0 < count < len(items) else 1
+    first = sorted({int(i * step) for i in range(min(count, len(items)))})
+    return [items[i] for i in first] + [c for i, c in enumerate(items) if i not in set(first)]
+
+
+def select(candidates: list, num_questions: int) -> list:
+    """Spread picks across the material, alternating question kinds; returned in document order."""
+    by_kind = {}
+    for candidate in candidates:
+        by_kind.setdefault(candidate["kind"], []).append(candidate)
+    share = -(-num_questions // max(1, len(by_kind)))
+    queues = [_spread(items, share) for items in by_kind.values()]
+    selected = []
+    while len(selected) < num_questions and any(queues):
+        for queue in queues:
+            if queue and len(selected) < num_questions:
+                selected.append(queue.pop(0))
+    return sorted(selected, key=lambda c: c["position"])
+
+
+def questions_from_text(text: str, num_questions: int, language: str = "Hindi") -> list:
+    """Template questions for raw material text (not cached)."""
+    return [render(c, language) for c in select(extract_candidates(text), num_questions)]
+
+
+class TemplateQuestionIndex:
+    def __init__(self):
+        """
+        Per-machine candidate index.
+        _machines[machine_id] = {"materials": {material_id: {"signature", "candidates"}}, "checked_at": float}
+        """
+        self._machines = {}
+        self._lock = threading.Lock()
+
+    def _load_materials(self, machine_id: int) -> list:
+        from app.models.models import StudyMaterial
+        materials = StudyMaterial.query.filter_by(machine_id=machine_id, is_active=True).all()
+        return [(m.id, m.content or "") for m in materials]
+
+    def sync(self, machine_id: int, force: bool = False):
+        """Re-extract only the materials that were added or changed."""
+        with self._lock:
+            entry = self._machines.setdefault(machine_id, {"materials": {}, "checked_at": 0})
+            if not force and time.time() - entry["checked_at"] < SYNC_INTERVAL:
+                return entry
+
+        try:
+            materials = self._load_materials(machine_id)
+        except Exception as e:
+            print(f"[TemplateQuestions] Error loading study material: {e}")
+            return entry
+
+        current = {}
+        for material_id, content in materials:
+            signature = _signature(content)
+            old = entry["materials"].get(material_id)
+            if old and old["signature"] == signature:
+                current[material_id] = old
+                continue
+            candidates = extract_candidates(content)
+            print(f"[TemplateQuestions] Material {material_id} for machine {machine_id}: {len(candidates)} candidates")
+            current[material_id] = {"signature": signature, "candidates": candidates}
+
+        with self._lock:
+            entry["materials"] = current
+            entry["checked_at"] = time.time()
+        return entry
+
+    def invalidate(self, machine_id: int = None):
+        """Force a change check on next use (all machines if machine_id is None)."""
+        with self._lock:
+            for key, entry in self._machines.items():
+                if machine_id is None or key == machine_id:
+                    entry["checked_at"] = 0
+
+    def questions(self, machine_id: int, num_questions: int = 15, language: str = "Hindi") -> list:
+        """Template question bank for a machine, spread over all of its study material."""
+        entry = self.sync(machine_id)
+        candidates = []
+        for offset, material_id in enumerate(sorted(entry["materials"])):
+            # Keep document order across materials
+            candidates.extend(dict(c, position=(offset, c["position"])) for c in entry["materials"][material_id]["candidates"])
+        return [render(c, language) for c in select(candidates, num_questions)]
+
+
+# Singleton instance
+_index_instance = None
+
+
+def get_template_index():
+    global _index_instance
+    if _index_instance is None:
+        _index_instance = TemplateQuestionIndex()
+    return _index_instance
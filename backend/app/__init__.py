@@ -7,12 +7,15 @@ import os
 from app.routes.main import main_bp
 from app.routes.stt import stt_bp
 from app.routes.eval import eval_bp
-from app.routes.llm import llm_bp
+from app.routes.llm import llm_bp, init_llm_tracing
 from app.routes.training import training_bp
 from app.routes.qa_bank_new import qa_bank_new_bp
 from app.routes.viva_session import viva_session_bp
 from app.routes.chat_viva import chat_viva_bp
 from app.routes.viva_records import viva_records_bp
+from app.routes.jobs import jobs_bp
+from app.routes.workers import workers_bp
+from app.routes.viva_turn import viva_turn_bp
 
 def create_app():
     app = Flask(__name__)
@@ -26,7 +29,8 @@ def create_app():
         r"/*": {
             "origins": allowed_origins,
             "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"]
+            "allow_headers": ["Content-Type", "Authorization"],
+            "expose_headers": ["Server-Timing"]
         }
     })
 
@@ -40,9 +44,27 @@ def create_app():
     app.register_blueprint(viva_session_bp)  # Viva sessions
     app.register_blueprint(chat_viva_bp)  # Conversational Voice Interview
     app.register_blueprint(viva_records_bp)  # Viva records with video
+    app.register_blueprint(jobs_bp)      # Background LLM jobs
+    app.register_blueprint(workers_bp)   # STT / grading worker nodes
+    app.register_blueprint(viva_turn_bp)  # Single round-trip viva turns
 
     db.init_app(app)
     
+    # Per-request LLM breakdown: Server-Timing header + GET /llm/traces
+    init_llm_tracing(app)
+    
+    # Load the provisional grader's cross-encoder now rather than in a candidate's request
+    from app.services.provisional_grading import preload_fast_grader
+    preload_fast_grader()
+    
+    # Background job workers (question-bank generation); resumes unfinished jobs
+    from app.services.job_queue import init_job_queue
+    init_job_queue(app)
+    
+    # Viva WebSocket channel (/viva/ws) when flask-sock is installed
+    from app.routes.viva_socket import init_viva_socket
+    init_viva_socket(app)
+    
     # Preload Whisper STT model in background
     try:
         from app.routes.stt import get_whisper_stt
@@ -3,243 +3,186 @@ Conversational Voice Viva API
 - Natural conversation style interview
 - LLM generates follow-up questions based on user's answers
 - All voice-based interaction
+- Each viva is a chat session with a stable prompt prefix (KV cache reused across turns)
 """
 
 from flask import Blueprint, request, jsonify
-import requests
-import re
-from app.db_config import get_db
+from app.services.chat_sessions import get_chat_sessions
+from app.services.chat_summary import schedule_fold, final_transcript
+from app.services.chat_drafts import submit_partial, take_draft
+from app.services.topic_context import get_topic_context_cache
+from ai.llm import tracing
+from ai.llm.ollama_client import MODEL_NAME
+from ai.llm.structured import ollama_structured, ConversationEvaluation
 
 chat_viva_bp = Blueprint('chat_viva', __name__)
 
-OLLAMA_API_URL = "http://localhost:11434/api/generate"
-MODEL_NAME = "gemma3:1b"
-
 def get_topic_context(topic_id):
-    """Get topic info and sample questions for context"""
-    conn = get_db()
-    cursor = conn.cursor()
-    
-    # Get topic name
-    cursor.execute('SELECT name FROM training_topic WHERE id = %s', (topic_id,))
-    result = cursor.fetchone()
-    topic_name = result[0] if result else 'General'
-    
-    # Get sample Q&A for context
-    cursor.execute('''
-        SELECT question, expected_answer FROM qa_bank_new 
-        WHERE topic_id = %s LIMIT 20
-    ''', (topic_id,))
-    qa_pairs = cursor.fetchall()
-    
-    conn.close()
-    
-    context = f"Topic: {topic_name}\n\nKey concepts to cover:\n"
-    for q, a in qa_pairs:
-        context += f"- {q} -> {a}\n"
-    
-    return topic_name, context
+    """Get topic name and the Q&A context block for prompts (cached per topic)"""
+    topic = get_topic_context_cache().get(topic_id)
+    return topic.topic_name, topic.prompt_block
 
 
 @chat_viva_bp.route('/chat-viva/start', methods=['POST'])
 def start_conversation():
-    """Start a conversational viva - get first question"""
+    """Start a conversational viva - get first question and a session_id for /chat-viva/respond"""
     data = request.json
     topic_id = data.get('topic_id')
     user_name = data.get('user_name', 'Candidate')
     language = data.get('language', 'Hindi')
     
     topic_name, context = get_topic_context(topic_id)
+    session = get_chat_sessions().create(topic_id, topic_name, context, language, user_name)
     
-    # Generate opening question
-    if language == 'Hindi':
-        prompt = f"""You are conducting a friendly technical interview in Hindi about {topic_name}.
-Start with a warm greeting and ask an open-ended question about their work.
-
-Example opening:
-"नमस्ते! मैं आपसे {topic_name} के बारे में कुछ बातें करना चाहता हूँ। सबसे पहले बताइए, आप IPQC में क्या-क्या काम करते हैं?"
-
-Generate a similar friendly opening in Hindi (2-3 sentences max). Only output the greeting, nothing else."""
-    else:
-        prompt = f"""You are conducting a friendly technical interview about {topic_name}.
-Start with a warm greeting and ask an open-ended question about their work.
-
-Generate a friendly opening in English (2-3 sentences max). Only output the greeting, nothing else."""
-
-    try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": MODEL_NAME,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.7, "num_predict": 150}
-            },
-            timeout=30
-        )
-        response.raise_for_status()
-        opening = response.json().get("response", "").strip()
-        
-        # Fallback
-        if len(opening) < 10:
-            opening = f"नमस्ते {user_name}! मैं आपसे {topic_name} के बारे में बात करना चाहता हूँ। सबसे पहले बताइए, आप इस area में क्या-क्या काम करते हैं?"
-        
-        return jsonify({
-            'message': opening,
-            'topic_name': topic_name,
-            'turn': 1
-        })
-    except Exception as e:
-        return jsonify({
-            'message': f"नमस्ते {user_name}! आइए {topic_name} के बारे में बात करते हैं। बताइए, आप क्या-क्या काम करते हैं?",
-            'topic_name': topic_name,
-            'turn': 1
-        })
+    with session.lock, tracing.call_type('chat_opening'):
+        try:
+            opening = session.reply('opening')
+            
+            # Fallback
+            if len(opening) < 10:
+                opening = f"नमस्ते {user_name}! मैं आपसे {topic_name} के बारे में बात करना चाहता हूँ। सबसे पहले बताइए, आप इस area में क्या-क्या काम करते हैं?"
+        except Exception as e:
+            print(f"[CHAT VIVA] Opening generation failed: {e}")
+            tracing.mark('fallback')
+            opening = f"नमस्ते {user_name}! आइए {topic_name} के बारे में बात करते हैं। बताइए, आप क्या-क्या काम करते हैं?"
+        session.add_assistant(opening)
+    
+    return jsonify({
+        'message': opening,
+        'topic_name': topic_name,
+        'session_id': session.id,
+        'turn': 1
+    })
 
 
 @chat_viva_bp.route('/chat-viva/respond', methods=['POST'])
 def respond_to_user():
-    """Generate follow-up based on user's answer"""
+    """
+    Generate follow-up based on user's answer.
+    Send the session_id from /chat-viva/start; without it (or after expiry) the
+    session is rebuilt from history.
+    """
     data = request.json
-    topic_id = data.get('topic_id')
-    user_answer = data.get('user_answer', '')
-    conversation_history = data.get('history', [])
-    turn = data.get('turn', 1)
-    language = data.get('language', 'Hindi')
-    max_turns = data.get('max_turns', 8)
-    
-    topic_name, context = get_topic_context(topic_id)
+    session = resolve_session(data.get('session_id'), data.get('topic_id'),
+                              data.get('language', 'Hindi'), data.get('history', []))
+    return jsonify(chat_turn(session, data.get('user_answer', ''), data.get('turn', 1),
+                             data.get('max_turns', 8), data.get('language', 'Hindi')))
+
+
+def resolve_session(session_id, topic_id, language, conversation_history):
+    """Live chat session, or one rebuilt from the client's history"""
+    sessions = get_chat_sessions()
+    session = sessions.get(session_id) if session_id else None
+    if session is None:
+        topic_name, context = get_topic_context(topic_id)
+        session = sessions.rebuild(topic_id, topic_name, context, language, conversation_history)
+    return session
+
+
+def chat_turn(session, user_answer, turn=1, max_turns=8, language='Hindi'):
+    """One conversation turn: follow-up question, or the closing evaluation after max_turns"""
+    with session.lock:
+        draft = take_draft(session, user_answer)
+        session.add_user(user_answer)
+        finished = turn >= max_turns
+        
+        if not finished and draft:
+            # Drafted from a partial transcript that matches the final answer
+            follow_up = draft
+            session.add_assistant(follow_up)
+        elif not finished:
+            try:
+                # Only the new answer is evaluated; the rest of the prompt is cached
+                with tracing.call_type('chat_followup'):
+                    follow_up = session.reply('followup')
+                
+                # Clean up
+                follow_up = follow_up.split('\n')[0].strip()
+                
+                if len(follow_up) < 10:
+                    follow_up = "अच्छा! और कुछ बताओ इसके बारे में?"
+            except Exception as e:
+                print(f"[CHAT VIVA] Follow-up generation failed: {e}")
+                tracing.mark('fallback')
+                follow_up = "अच्छा! और बताओ, इसमें कौन-कौन सी चीज़ें important हैं?"
+            session.add_assistant(follow_up)
     
     # Check if we should end
-    if turn >= max_turns:
-        return generate_closing(topic_name, conversation_history, language)
+    if finished:
+        get_chat_sessions().end(session.id)
+        return closing_result(session.topic_name, final_transcript(session), language)
     
-    # Build conversation context
-    history_text = ""
-    for h in conversation_history[-6:]:  # Last 6 exchanges
-        history_text += f"Interviewer: {h.get('ai', '')}\n"
-        history_text += f"Candidate: {h.get('user', '')}\n"
+    # Fold older turns into the running summary while the candidate answers
+    schedule_fold(session)
     
-    # Generate follow-up
-    if language == 'Hindi':
-        prompt = f"""You are conducting a technical interview about {topic_name} in Hindi.
-
-{context}
-
-Conversation so far:
-{history_text}
-Candidate's latest answer: {user_answer}
+    return {
+        'message': follow_up,
+        'session_id': session.id,
+        'turn': turn + 1,
+        'continue': True,
+        'draft_used': bool(draft)
+    }
+
+
+@chat_viva_bp.route('/chat-viva/partial', methods=['POST'])
+def partial_answer():
+    """
+    Partial transcript of the answer the candidate is still giving.
+    Starts drafting the next follow-up in the background; /chat-viva/respond
+    (and /viva/turn in chat mode) uses the draft if the final answer is close to this partial one.
+    Expects JSON: { "session_id": "...", "partial_text": "..." }
+    Returns JSON: { "accepted": bool } with 202
+    """
+    data = request.json or {}
+    session = get_chat_sessions().get(data.get('session_id')) if data.get('session_id') else None
+    if session is None:
+        return jsonify({'error': 'Session not found or expired'}), 404
+    
+    accepted = submit_partial(session, data.get('partial_text', ''))
+    return jsonify({'accepted': accepted}), 202
 
-Based on their answer, generate ONE follow-up question that:
-1. Explores deeper into what they mentioned
-2. OR moves to a related concept they haven't discussed
-3. Is conversational and friendly (like "अच्छा! और बताओ..." or "hmm, interesting! तो...")
-4. Tests their practical knowledge
 
-Keep it short (1-2 sentences). Only output the follow-up question in Hindi, nothing else."""
-    else:
-        prompt = f"""You are conducting a technical interview about {topic_name}.
+@chat_viva_bp.route('/chat-viva/session/<session_id>', methods=['GET'])
+def get_session_info(session_id):
+    """Session state and per-turn prompt evaluation cost (tokens / ms)"""
+    session = get_chat_sessions().get(session_id)
+    if not session:
+        return jsonify({'error': 'Session not found or expired'}), 404
+    return jsonify(session.info())
 
-{context}
 
-Conversation so far:
-{history_text}
-Candidate's latest answer: {user_answer}
+def generate_closing(topic_name, transcript, language):
+    """
+    Generate closing message and evaluate.
+    transcript: bounded conversation text (running summary + recent exchanges)
+    """
+    return jsonify(closing_result(topic_name, transcript, language))
 
-Generate ONE short follow-up question (1-2 sentences) that explores their knowledge further.
-Only output the question, nothing else."""
 
-    try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": MODEL_NAME,
-                "prompt": prompt,
-                "stream": False,
-                "options": {"temperature": 0.7, "num_predict": 100}
-            },
-            timeout=30
-        )
-        response.raise_for_status()
-        follow_up = response.json().get("response", "").strip()
-        
-        # Clean up
-        follow_up = follow_up.split('\n')[0].strip()
-        
-        if len(follow_up) < 10:
-            follow_up = "अच्छा! और कुछ बताओ इसके बारे में?"
-        
-        return jsonify({
-            'message': follow_up,
-            'turn': turn + 1,
-            'continue': True
-        })
-    except Exception as e:
-        return jsonify({
-            'message': "अच्छा! और बताओ, इसमें कौन-कौन सी चीज़ें important हैं?",
-            'turn': turn + 1,
-            'continue': True
-        })
-
-
-def generate_closing(topic_name, history, language):
-    """Generate closing message and evaluate"""
-    
-    history_text = ""
-    for h in history:
-        history_text += f"Q: {h.get('ai', '')}\nA: {h.get('user', '')}\n"
+def closing_result(topic_name, transcript, language):
+    """Closing message and overall evaluation of the conversation (see generate_closing)"""
     
     # Evaluate overall understanding
     eval_prompt = f"""Evaluate this candidate's knowledge about {topic_name} based on this conversation:
 
-{history_text}
+{transcript}
 
 Rate their understanding:
-1. SCORE: 0-100 (overall knowledge percentage)
-2. STRONG_AREAS: What they know well (comma separated)
-3. WEAK_AREAS: What they need to learn (comma separated)
-4. SUMMARY: One line summary in Hindi
+1. score: 0-100 (overall knowledge percentage)
+2. strong_areas: What they know well (comma separated)
+3. weak_areas: What they need to learn (comma separated)
+4. summary: One line summary in Hindi
 
-Format exactly like:
-SCORE: 75
-STRONG_AREAS: EL testing, defect identification
-WEAK_AREAS: calibration process, specifications
-SUMMARY: Candidate has good practical knowledge but needs to learn specifications."""
+Respond as JSON only, like:
+{{"score": 75, "strong_areas": "EL testing, defect identification", "weak_areas": "calibration process, specifications", "summary": "Candidate has good practical knowledge but needs to learn specifications."}}"""
 
     try:
-        response = requests.post(
-            OLLAMA_API_URL,
-            json={
-                "model": MODEL_NAME,
-                "prompt": eval_prompt,
-                "stream": False,
-                "options": {"temperature": 0.3, "num_predict": 200}
-            },
-            timeout=30
-        )
-        response.raise_for_status()
-        result = response.json().get("response", "")
-        
-        # Parse result
-        score = 50
-        score_match = re.search(r'SCORE:\s*(\d+)', result)
-        if score_match:
-            score = int(score_match.group(1))
-        
-        strong = ""
-        strong_match = re.search(r'STRONG_AREAS:\s*(.+)', result)
-        if strong_match:
-            strong = strong_match.group(1).strip()
-        
-        weak = ""
-        weak_match = re.search(r'WEAK_AREAS:\s*(.+)', result)
-        if weak_match:
-            weak = weak_match.group(1).strip()
-        
-        summary = ""
-        summary_match = re.search(r'SUMMARY:\s*(.+)', result)
-        if summary_match:
-            summary = summary_match.group(1).strip()
+        with tracing.call_type('chat_evaluation'):
+            evaluation = ollama_structured(eval_prompt, ConversationEvaluation, profile='closing', model=MODEL_NAME, timeout=30)
+        score = evaluation.score
+        strong = evaluation.strong_areas
+        weak = evaluation.weak_areas
+        summary = evaluation.summary
         
         # Generate closing message
         if score >= 70:
@@ -249,27 +192,31 @@ SUMMARY: Candidate has good practical knowledge but needs to learn specification
         else:
             closing = f"धन्यवाद! {topic_name} के बारे में और study करें। Practice से सब आ जाएगा!"
         
-        return jsonify({
+        return {
             'message': closing,
             'continue': False,
             'evaluation': {
                 'score': score,
                 'strong_areas': strong,
                 'weak_areas': weak,
-                'summary': summary
+                'summary': summary,
+                'graded': True
             }
-        })
+        }
     except Exception as e:
-        return jsonify({
+        print(f"[CHAT VIVA] Final evaluation failed: {e}")
+        tracing.mark('fallback')
+        return {
             'message': "बातचीत के लिए धन्यवाद! आपने अच्छा किया।",
             'continue': False,
             'evaluation': {
                 'score': 50,
                 'strong_areas': 'General knowledge',
                 'weak_areas': 'Need more assessment',
-                'summary': 'Evaluation completed'
+                'summary': 'Evaluation completed',
+                'graded': False
             }
-        })
+        }
 
 
 @chat_viva_bp.route('/chat-viva/evaluate-final', methods=['POST'])
@@ -280,5 +227,7 @@ def evaluate_final():
     history = data.get('history', [])
     language = data.get('language', 'Hindi')
     
-    topic_name, _ = get_topic_context(topic_id)
-    return generate_closing(topic_name, history, language)
+    # Expired or lost session: rebuilt from history and folded, so every answer is evaluated
+    session = resolve_session(data.get('session_id'), topic_id, language, history)
+    get_chat_sessions().end(session.id)
+    return generate_closing(session.topic_name, final_transcript(session), language)
@@ -0,0 +1,170 @@
+"""
+Background Job API
+- Submit question-bank generation without holding the HTTP request open
+- Poll job status / partial results, or subscribe over Server-Sent Events
+- Final grades behind provisional /evaluate_with_answer grades (/grades)
+"""
+
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+import json
+import time
+
+from app.services.job_queue import get_job_queue, get_job, list_jobs, FINISHED_STATUSES
+from app.services.provisional_grading import get_grade_status
+
+jobs_bp = Blueprint('jobs', __name__)
+
+SSE_POLL_SECONDS = 1.0
+SSE_MAX_SECONDS = 30 * 60
+
+
+def _sse_error(message: str) -> str:
+    """Last event of a stream that cannot go on (the client can tell it from a dropped connection)."""
+    return f"event: error\ndata: {json.dumps({'error': message}, ensure_ascii=False)}\n\n"
+
+
+@jobs_bp.route('/generate_viva_questions/jobs', methods=['POST'])
+def submit_generate_questions_job():
+    """
+    Queue question generation for a machine (same input as /generate_viva_questions).
+    Expects JSON: { "machine_id": 1, "num_questions": 15, "language": "Hindi" }
+    Returns JSON: { "job_id": "...", "status": "queued" } with 202
+    """
+    from app.models.models import Machine
+
+    data = request.json or {}
+    machine_id = data.get('machine_id')
+    if not machine_id:
+        return jsonify({'error': 'machine_id is required'}), 400
+
+    machine = Machine.query.get(machine_id)
+    params = {
+        'machine_id': machine_id,
+        'machine_name': machine.name if machine else "Solar Panel Manufacturing",
+        'num_questions': data.get('num_questions', 15),
+        'language': data.get('language', 'Hindi')
+    }
+
+    try:
+        job_id = get_job_queue().submit('generate_questions', params)
+        return jsonify({'job_id': job_id, 'status': 'queued'}), 202
+    except Exception as e:
+        return jsonify({'error': f'Could not queue job: {str(e)}'}), 500
+
+
+@jobs_bp.route('/jobs', methods=['GET'])
+def get_jobs():
+    """List recent jobs. Optional ?status=queued|running|completed|failed&limit=50"""
+    try:
+        jobs = list_jobs(request.args.get('status'), request.args.get('limit', 50, type=int))
+        return jsonify({'count': len(jobs), 'jobs': jobs})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@jobs_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_job_status(job_id):
+    """Get job status, progress and (partial) result"""
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
+
+@jobs_bp.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """
+    Server-Sent Events stream of job progress.
+    Sends a 'progress' event whenever progress changes and one final 'done' event,
+    or a final 'error' event if the job can no longer be read.
+    """
+    if not get_job(job_id):
+        return jsonify({'error': 'Job not found'}), 404
+
+    def generate():
+        last_progress = None
+        started = time.time()
+        while time.time() - started < SSE_MAX_SECONDS:
+            try:
+                job = get_job(job_id)
+            except Exception as e:
+                yield _sse_error(f'Could not read job: {str(e)}')
+                return
+            if job is None:
+                yield _sse_error('Job not found')
+                return
+            if job['status'] in FINISHED_STATUSES:
+                yield f"event: done\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                return
+            progress = (job['status'], job['progress'])
+            if progress != last_progress:
+                last_progress = progress
+                payload = {k: job[k] for k in ('id', 'status', 'progress', 'total')}
+                payload['result'] = job.get('result')
+                yield f"event: progress\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            time.sleep(SSE_POLL_SECONDS)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@jobs_bp.route('/grades', methods=['GET'])
+def get_grades():
+    """Final grades for several provisional grades: ?ids=<grade_id>,<grade_id>,..."""
+    ids = [i for i in request.args.get('ids', '').split(',') if i][:100]
+    if not ids:
+        return jsonify({'error': 'ids is required'}), 400
+    grades = []
+    for grade_id in ids:
+        grades.append(get_grade_status(grade_id) or {'grade_id': grade_id, 'status': 'unknown'})
+    return jsonify({'grades': grades, 'pending': sum(g['status'] == 'pending' for g in grades)})
+
+
+@jobs_bp.route('/grades/<grade_id>', methods=['GET'])
+def get_grade(grade_id):
+    """Provisional grade and, once available, the final grade and whether it is a correction"""
+    grade = get_grade_status(grade_id)
+    if not grade:
+        return jsonify({'error': 'Grade not found'}), 404
+    return jsonify(grade)
+
+
+@jobs_bp.route('/grades/<grade_id>/events', methods=['GET'])
+def grade_events(grade_id):
+    """
+    Server-Sent Events stream for one provisional grade.
+    Sends one 'correction' event if the final grade differs materially, 'final' if it
+    confirms the provisional grade, or 'failed' (the provisional grade stands);
+    'error' if the grade can no longer be read.
+    """
+    if not get_grade_status(grade_id):
+        return jsonify({'error': 'Grade not found'}), 404
+
+    def generate():
+        started = time.time()
+        while time.time() - started < SSE_MAX_SECONDS:
+            try:
+                grade = get_grade_status(grade_id)
+            except Exception as e:
+                yield _sse_error(f'Could not read grade: {str(e)}')
+                return
+            if grade is None:
+                yield _sse_error('Grade not found')
+                return
+            if grade['status'] != 'pending':
+                event = 'correction' if grade['corrected'] else grade['status']
+                yield f"event: {event}\ndata: {json.dumps(grade, ensure_ascii=False)}\n\n"
+                return
+            yield ": keep-alive\n\n"
+            time.sleep(SSE_POLL_SECONDS)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
@@ -1,20 +1,64 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, Response, stream_with_context, g
 
 llm_bp = Blueprint('llm', __name__)
 
-# Lazy loading - Use Gemini for production (FREE, cloud-based), Ollama for local dev
+
+def init_llm_tracing(app):
+    """Per-request LLM breakdown for every route: Server-Timing header + GET /llm/traces."""
+    from ai.llm import tracing
+
+    @app.before_request
+    def _start_llm_trace():
+        g.llm_trace_token = tracing.start_trace(f"{request.method} {request.path}")
+
+    @app.after_request
+    def _llm_server_timing(response):
+        trace = tracing.current_trace()
+        if trace is not None and trace.calls:
+            response.headers['Server-Timing'] = trace.server_timing()
+        return response
+
+    @app.teardown_request
+    def _end_llm_trace(error=None):
+        token = g.pop('llm_trace_token', None)
+        if token is not None:
+            tracing.end_trace(token)
+
+
+# Backend choice per call is made by the router (latency, error rate, circuit state).
+# USE_GEMINI=true makes Gemini the preferred backend where it supports the call.
 def get_llm_functions():
-    import os
-    use_gemini = os.getenv('USE_GEMINI', 'true').lower() == 'true'
-    
-    if use_gemini:
-        print("[LLM] Using Google Gemini API (Production)")
-        from ai.llm.gemini_llm import generate_next_question, evaluate_user_answer
-    else:
-        print("[LLM] Using Ollama (Local Development)")
-        from ai.llm.ollama_llm import generate_next_question, evaluate_user_answer
-    
-    return generate_next_question, evaluate_user_answer
+    from ai.llm.router import routed
+    return routed('followup'), routed('evaluate')
+
+def get_grading_function():
+    """
+    evaluate_with_correct_answer for GRADER_BACKEND: routed to the fastest healthy LLM
+    backend (Gemini or Ollama), the local cross-encoder, or hybrid (LLM for disputes).
+    Runs on a registered grading worker node when one has less load than this process.
+    """
+    from dotenv import load_dotenv
+    load_dotenv()  # Load .env file (USE_GEMINI, LLM_BACKENDS, GEMINI_API_KEY)
+    from ai.nlp.cross_encoder_grader import get_grader
+    from app.services.workers import get_worker_registry
+    return get_worker_registry().grader(get_grader())
+
+
+def grade_answer(topic, question, user_answer, expected_answer, language="Hindi", provisional=None):
+    """
+    Grade one answer: provisional fast grade with the final grade queued (provisional
+    None = PROVISIONAL_GRADING), or the grading function synchronously.
+    """
+    evaluate_with_correct_answer = get_grading_function()
+    from app.services.provisional_grading import evaluate_provisionally, provisional_enabled
+    if provisional is None:
+        provisional = provisional_enabled()
+    result = None
+    if provisional:
+        result = evaluate_provisionally(topic, question, user_answer, expected_answer, language)
+    if result is None:
+        result = evaluate_with_correct_answer(topic, question, user_answer, expected_answer, language)
+    return result
 
 @llm_bp.route('/next_question', methods=['POST'])
 def next_question():
@@ -120,10 +164,16 @@ def generate_viva_questions():
     """
     Generate all questions for a viva from study material OR LLM knowledge.
     If no study material, uses machine/department name to generate relevant questions.
-    Expects JSON: { "machine_id": 1, "num_questions": 15, "language": "Hindi" }
+    Expects JSON: { "machine_id": 1, "num_questions": 15, "language": "Hindi", "stream": false }
     Returns JSON: { "questions": [...], "total": 15 }
+    With "stream": true, returns NDJSON - one {"section", "questions"} line per finished
+    section of study material, then a final {"done": true, "questions": [...], "total"} line.
+    With "mode": "instant", returns template questions built from the study material
+    without calling the LLM ("source": "template"), and queues the LLM generation as a
+    background job ("job_id", see /jobs/<job_id>) whose questions replace or top up
+    them; "augment": false skips the job.
     """
-    from ai.llm.ollama_llm import generate_questions_for_department
+    from ai.llm.ollama_llm import generate_questions_for_department, instant_questions_for_department
     from app.models.models import Machine
     
     data = request.json
@@ -138,6 +188,28 @@ def generate_viva_questions():
     machine = Machine.query.get(machine_id)
     machine_name = machine.name if machine else "Solar Panel Manufacturing"
     
+    if data.get('mode') == 'instant':
+        questions = instant_questions_for_department(machine_id, machine_name, num_questions, language)
+        response = {'questions': questions, 'total': len(questions), 'source': 'template', 'job_id': None}
+        if data.get('augment', True):
+            from app.services.job_queue import get_job_queue
+            try:
+                response['job_id'] = get_job_queue().submit('generate_questions', {
+                    'machine_id': machine_id,
+                    'machine_name': machine_name,
+                    'num_questions': num_questions,
+                    'language': language
+                })
+            except Exception as e:
+                print(f"[LLM] Could not queue background generation: {e}")
+        return jsonify(response)
+    
+    if data.get('stream'):
+        return Response(
+            stream_with_context(_stream_viva_questions(machine_id, machine_name, num_questions, language)),
+            mimetype='application/x-ndjson'
+        )
+    
     try:
         print(f"[LLM] Generating {num_questions} questions for machine {machine_id} ({machine_name})")
         questions = generate_questions_for_department(machine_id, machine_name, num_questions, language)
@@ -153,6 +225,19 @@ def generate_viva_questions():
         return jsonify({'error': f'Failed to generate questions: {str(e)}'}), 500
 
 
+def _stream_viva_questions(machine_id, machine_name, num_questions, language):
+    """Yield NDJSON lines as each section of study material finishes generating."""
+    import json
+    from ai.llm.ollama_llm import iter_questions_for_department
+    
+    try:
+        for event in iter_questions_for_department(machine_id, machine_name, num_questions, language):
+            yield json.dumps(event, ensure_ascii=False) + '\n'
+    except Exception as e:
+        print(f"[LLM] Error streaming questions: {e}")
+        yield json.dumps({'done': True, 'error': str(e)}) + '\n'
+
+
 @llm_bp.route('/evaluate_with_answer', methods=['POST'])
 def evaluate_with_answer():
     """
@@ -161,23 +246,12 @@ def evaluate_with_answer():
         "question": "...", 
         "user_answer": "...", 
         "expected_answer": "...",
-        "language": "Hindi" 
+        "language": "Hindi",
+        "provisional": true  # Optional - default PROVISIONAL_GRADING
     }
+    With provisional grading the reply comes from the fast local scorer and carries
+    "provisional": true and a "grade_id"; the final grade is at /grades/<grade_id>.
     """
-    # Load environment variable to choose LLM
-    import os
-    from dotenv import load_dotenv
-    load_dotenv()  # Load .env file
-    
-    use_gemini = os.getenv('USE_GEMINI', 'true').lower() == 'true'
-    
-    if use_gemini:
-        from ai.llm.gemini_llm import evaluate_with_correct_answer
-        print("[LLM EVALUATION] Using Google Gemini API ✅")
-    else:
-        from ai.llm.ollama_llm import evaluate_with_correct_answer
-        print("[LLM EVALUATION] Calling Ollama LLM (gemma3:1b)")
-    
     data = request.json
     question = data.get('question', '')
     user_answer = data.get('user_answer', '')
@@ -193,13 +267,91 @@ def evaluate_with_answer():
         return jsonify({'error': 'question and expected_answer are required'}), 400
     
     try:
-        result = evaluate_with_correct_answer(topic, question, user_answer, expected_answer, language)
+        result = grade_answer(topic, question, user_answer, expected_answer, language, data.get('provisional'))
         print(f"[LLM EVALUATION] ✅ Score: {result.get('score')}, Correct: {result.get('is_correct')}")
         return jsonify(result)
     except Exception as e:
         return jsonify({'error': f'Evaluation failed: {str(e)}'}), 500
 
 
+@llm_bp.route('/evaluate_batch', methods=['POST'])
+def evaluate_batch():
+    """
+    Evaluate all answers of a viva in one call (end-of-viva grading).
+    Expects JSON: {
+        "answers": [{"question": "...", "user_answer": "...", "expected_answer": "...", "topic": "..."}],
+        "language": "Hindi",
+        "timeout": 60  # Optional - seconds before returning partial results
+    }
+    Returns JSON: { "results": [...], "partial": bool, "llm_graded": int, "elapsed": float }
+    Each result has the same fields as /evaluate_with_answer plus "graded_by" and "pending".
+    """
+    from ai.llm.batch_eval import evaluate_batch as run_batch_evaluation
+    
+    data = request.json or {}
+    answers = data.get('answers', [])
+    language = data.get('language', 'Hindi')
+    timeout = data.get('timeout')
+    
+    if not isinstance(answers, list) or not answers:
+        return jsonify({'error': 'answers list is required'}), 400
+    
+    for i, item in enumerate(answers):
+        if not isinstance(item, dict):
+            return jsonify({'error': f'answers[{i}] must be an object'}), 400
+        if not item.get('question') or not item.get('expected_answer'):
+            return jsonify({'error': f'answers[{i}]: question and expected_answer are required'}), 400
+
+    if timeout is not None and (isinstance(timeout, bool) or not isinstance(timeout, (int, float)) or timeout <= 0):
+        return jsonify({'error': 'timeout must be a positive number of seconds'}), 400
+
+    try:
+        evaluate_fn = get_grading_function()
+        result = run_batch_evaluation(answers, evaluate_fn, language, timeout=timeout)
+        return jsonify(result)
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Batch evaluation failed: {str(e)}'}), 500
+
+
+@llm_bp.route('/llm/health', methods=['GET'])
+def llm_health():
+    """Circuit breaker state and rolling latency / error rate of each LLM backend that has been used."""
+    from ai.llm.health import health_status
+    from ai.llm.router import get_llm_router
+    return jsonify({'backends': health_status(), 'routing': get_llm_router().snapshot()})
+
+
+@llm_bp.route('/llm/metrics', methods=['GET'])
+def llm_metrics():
+    """LLM counters / histograms (model loads, queue wait per priority, ...), residency, scheduler, Gemini quota, recorder state, generation profiles and cross-encoder grader."""
+    from ai.llm import metrics
+    from ai.llm.gemini_client import get_gemini_client
+    from ai.llm.profiles import PROFILES
+    from ai.nlp.cross_encoder_grader import get_cross_encoder_grader
+    from ai.llm.recorder import get_recorder
+    from ai.llm.residency import get_residency_manager
+    from ai.llm.scheduler import get_scheduler
+    return jsonify({
+        'metrics': metrics.snapshot(),
+        'residency': get_residency_manager().status(),
+        'scheduler': get_scheduler().status(),
+        'gemini': get_gemini_client().status(),
+        'recorder': get_recorder().status(),
+        'profiles': {name: profile.to_dict() for name, profile in PROFILES.items()},
+        'cross_encoder_grader': get_cross_encoder_grader().status()
+    })
+
+
+@llm_bp.route('/llm/traces', methods=['GET'])
+def llm_traces():
+    """Per-request LLM breakdown of recent requests: each call's queue wait, TTFT, tokens, tokens/sec and outcome."""
+    from ai.llm.tracing import recent_traces
+    limit = request.args.get('limit', 20, type=int)
+    return jsonify({'traces': recent_traces()[:limit]})
+
+
 @llm_bp.route('/get_welcome', methods=['POST'])
 def get_welcome():
     """Get welcome message for viva."""
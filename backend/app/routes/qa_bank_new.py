@@ -9,6 +9,7 @@ from werkzeug.utils import secure_filename
 import os
 import json
 from app.db_config import get_db
+from app.services.topic_context import get_topic_context_cache
 
 qa_bank_new_bp = Blueprint('qa_bank_new', __name__)
 
@@ -226,6 +227,7 @@ def upload_qa_excel():
         conn.commit()
         conn.close()
         os.remove(filepath)
+        get_topic_context_cache().invalidate()
         
         return jsonify({
             'success': True,
@@ -264,6 +266,7 @@ def add_question():
     question_id = cursor.lastrowid
     conn.commit()
     conn.close()
+    get_topic_context_cache().invalidate(data.get('topic_id'))
     
     return jsonify({'success': True, 'question_id': question_id})
 
@@ -277,6 +280,7 @@ def delete_question(question_id):
     cursor.execute("UPDATE qa_bank_new SET is_active = FALSE WHERE id = %s", (question_id,))
     conn.commit()
     conn.close()
+    get_topic_context_cache().invalidate()
     
     return jsonify({'success': True})
 
@@ -291,6 +295,7 @@ def clear_topic_questions(topic_id):
     affected = cursor.rowcount
     conn.commit()
     conn.close()
+    get_topic_context_cache().invalidate(topic_id)
     
     return jsonify({'success': True, 'deleted': affected})
 
@@ -378,6 +383,7 @@ def upload_topic_qa_excel():
         conn.commit()
         conn.close()
         os.remove(filepath)
+        get_topic_context_cache().invalidate(topic_id)
         
         return jsonify({
             'success': True,
@@ -25,6 +25,14 @@ def get_whisper_stt(model_size=None):
         print("Whisper model loaded successfully!")
     return whisper_stt
 
+
+def transcribe(file_path, language='hi'):
+    """Transcribe on the least-loaded STT node: a registered worker, or this process."""
+    from app.services.workers import get_worker_registry
+    return get_worker_registry().transcribe(
+        file_path, language, local=lambda: get_whisper_stt().transcribe(file_path, language=language)
+    )
+
 @stt_bp.route('/stt', methods=['POST'])
 def speech_to_text():
     print("[STT] Received STT request")
@@ -52,8 +60,7 @@ def speech_to_text():
         import time
         start_time = time.time()
         
-        stt_model = get_whisper_stt()
-        text = stt_model.transcribe(temp_path, language=language)
+        text = transcribe(temp_path, language=language)
         
         elapsed = time.time() - start_time
         print(f"[STT] Transcription completed in {elapsed:.2f} seconds")
@@ -98,6 +98,13 @@ def save_viva_record():
         conn.commit()
         conn.close()
         
+        # Answers graded provisionally get their final grade written back to this record
+        try:
+            from app.services.provisional_grading import link_grades
+            link_grades(record_id, json.loads(answers_json or '[]'))
+        except Exception as e:
+            print(f"Error linking final grades to viva record {record_id}: {e}")
+        
         return jsonify({
             'success': True,
             'message': 'Viva record saved successfully',
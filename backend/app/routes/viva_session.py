@@ -217,12 +217,21 @@ def submit_answer():
     if not session_id:
         return jsonify({'error': 'session_id required'}), 400
     
+    result, status = answer_question(session_id, user_answer)
+    return jsonify(result), status
+
+
+def answer_question(session_id, user_answer):
+    """
+    Evaluate the answer to the session's current question and move on.
+    Returns: (response dict, HTTP status) - evaluation + next question, or the final result
+    """
     session = active_sessions.get(session_id)
     if not session:
-        return jsonify({'error': 'Session not found or expired'}), 404
+        return {'error': 'Session not found or expired'}, 404
     
     if session['status'] != 'active':
-        return jsonify({'error': 'Session already completed'}), 400
+        return {'error': 'Session already completed'}, 400
     
     try:
         current_index = session['current_index']
@@ -273,7 +282,7 @@ def submit_answer():
         # Check if more questions
         if session['current_index'] < len(session['questions']):
             next_question = session['questions'][session['current_index']]
-            return jsonify({
+            return {
                 'success': True,
                 'evaluation': evaluation,
                 'has_next': True,
@@ -285,7 +294,7 @@ def submit_answer():
                     'level': next_question['level'],
                     'category': next_question.get('category', 'General')
                 }
-            })
+            }, 200
         else:
             # All questions answered - auto complete
             session['status'] = 'completed'
@@ -324,7 +333,7 @@ def submit_answer():
             except Exception as db_err:
                 print(f"Error saving viva result: {db_err}")
             
-            return jsonify({
+            return {
                 'success': True,
                 'evaluation': evaluation,
                 'has_next': False,
@@ -338,12 +347,12 @@ def submit_answer():
                     'passed': final_passed,
                     'grade': get_grade(avg_score)
                 }
-            })
+            }, 200
         
     except Exception as e:
         import traceback
         traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        return {'error': str(e)}, 500
 
 
 @viva_session_bp.route('/viva/status/<session_id>', methods=['GET'])
@@ -0,0 +1,238 @@
+"""
+Viva WebSocket Channel
+- /viva/ws: one WebSocket per viva carries answer audio up and transcripts, grades,
+  next prompts and progress down - no per-turn HTTP request or CORS preflight
+- Same turn pipeline as POST /viva/turn (kbc / session / chat modes), so it works
+  with /viva/start sessions and /chat-viva sessions alike
+- Needs the optional flask-sock package; without it only the HTTP endpoints exist
+- A turn runs on its own thread: the socket keeps answering pings and sending
+  heartbeats meanwhile, and a client waiting on a turn is never timed out
+- Channel state and resume: app/services/viva_channels.py
+
+Text frames are JSON, binary frames are answer audio.
+Client -> server:
+    {"type": "hello", "mode": "chat", "context": {"session_id": ..., "language": ...}}   open a channel
+    {"type": "hello", "channel_id": "...", "last_seq": 12}     resume after a reconnect
+    {"type": "start_answer", "context": {...}}                  per-turn context (kbc: question, expected_answer)
+    <binary frames>                                             answer audio
+    {"type": "end_answer", "filename": "answer.webm"}           run the turn (one at a time)
+    {"type": "partial", "text": "..."}                          chat: partial transcript, drafts the follow-up
+    {"type": "ping"}  /  {"type": "close"}                      keep-alive / viva over
+Server -> client, numbered with "seq" and replayed on resume:
+    progress, transcript, grade, next_prompt, turn (full /viva/turn response),
+    final_grade (final grade of a provisional one), error
+Server -> client, not numbered:
+    ready (after hello, once missed events are replayed), pong, heartbeat
+"""
+
+import json
+import os
+import threading
+import time
+
+from flask import current_app
+
+from app.services.viva_channels import get_viva_channels
+from app.services.viva_turn import MODES, run_turn, TurnError
+
+HEARTBEAT_SECONDS = float(os.environ.get('VIVA_WS_HEARTBEAT', 15))
+# A client silent for this long is gone: close the socket, keep the channel for resume
+IDLE_TIMEOUT = HEARTBEAT_SECONDS * 3
+
+
+def init_viva_socket(app) -> bool:
+    """Register /viva/ws if flask-sock is installed."""
+    try:
+        from flask_sock import Sock
+    except ImportError:  # Optional dependency
+        print("[VIVA WS] flask-sock not installed, WebSocket channel disabled (POST /viva/turn still works)")
+        return False
+    Sock(app).route('/viva/ws')(viva_socket)
+    return True
+
+
+def viva_socket(ws):
+    from simple_websocket import ConnectionClosed
+
+    app = current_app._get_current_object()
+    channels = get_viva_channels()
+    channel = None
+
+    def send(event):
+        ws.send(json.dumps(event, ensure_ascii=False))
+
+    def error(message, status=400):
+        send({'type': 'error', 'data': {'message': message, 'status': status}})
+
+    last_heard = time.time()
+    next_tick = last_heard + HEARTBEAT_SECONDS
+    try:
+        while True:
+            now = time.time()
+            if now >= next_tick:
+                # Heartbeat tick, also while the client keeps pinging
+                if channel is not None and channel.turn_lock.locked():
+                    last_heard = now  # Client is waiting for its turn, not gone
+                if now - last_heard > IDLE_TIMEOUT:
+                    break
+                send({'type': 'heartbeat', 'ts': now})
+                if channel is not None:
+                    _push_final_grades(channel)
+                next_tick = now + HEARTBEAT_SECONDS
+            message = ws.receive(timeout=max(0.1, next_tick - time.time()))
+            if message is None:
+                continue
+            last_heard = time.time()
+
+            if isinstance(message, bytes):
+                if channel is None or channel.turn_context is None:
+                    error('Send start_answer before audio')
+                elif not channel.add_audio(message):
+                    channel.take_audio()
+                    channel.turn_context = None
+                    channel.emit('error', {'message': 'Answer audio too large', 'status': 413})
+                continue
+
+            try:
+                msg = json.loads(message)
+            except ValueError:
+                error('Frames must be JSON text or binary audio')
+                continue
+            if not isinstance(msg, dict):
+                error('Frames must be JSON objects')
+                continue
+            kind = msg.get('type')
+
+            if kind == 'ping':
+                send({'type': 'pong', 'ts': time.time()})
+            elif kind == 'hello':
+                if channel is not None:
+                    channel.detach(send)
+                channel = _hello(channels, msg, send, error)
+            elif channel is None:
+                error('Send hello first')
+            elif kind == 'start_answer':
+                context = msg.get('context') or {}
+                if not isinstance(context, dict):
+                    error('context must be a JSON object')
+                    continue
+                channel.take_audio()
+                channel.turn_context = context
+            elif kind == 'end_answer':
+                _start_turn(app, channel, msg.get('filename') or channel.audio_filename)
+            elif kind == 'partial':
+                if not isinstance(msg.get('text', ''), str):
+                    error('text must be a string')
+                    continue
+                _partial(channel, msg.get('text', ''))
+            elif kind == 'close':
+                channels.close(channel.id)
+                break
+            else:
+                error(f"Unknown message type: {kind}")
+    except ConnectionClosed:
+        pass
+    finally:
+        if channel is not None:
+            channel.detach(send)
+
+
+def _hello(channels, msg, send, error):
+    """Open a new channel or resume one; missed events are replayed before 'ready'."""
+    if msg.get('channel_id'):
+        channel = channels.get(msg['channel_id'])
+        if channel is None:
+            error('Channel expired, open a new one', 404)
+            return None
+        try:
+            last_seq = int(msg.get('last_seq') or 0)
+        except (TypeError, ValueError):
+            error('last_seq must be a number')
+            return None
+    else:
+        mode = msg.get('mode', 'kbc')
+        if mode not in MODES:
+            error(f"mode must be one of {', '.join(MODES)}")
+            return None
+        context = msg.get('context') or {}
+        if not isinstance(context, dict):
+            error('context must be a JSON object')
+            return None
+        channel = channels.create(mode, context)
+        last_seq = 0
+
+    complete = channel.attach(send, last_seq)
+    send({'type': 'ready', 'data': dict(channel.info(), replay_complete=complete, heartbeat_seconds=HEARTBEAT_SECONDS)})
+    return channel
+
+
+def _start_turn(app, channel, filename):
+    """Hand the answer to a turn thread; its events reach the client through the channel."""
+    if channel.turn_context is None:
+        channel.emit('error', {'message': 'Send start_answer before end_answer', 'status': 400})
+        return
+    if not channel.turn_lock.acquire(blocking=False):
+        channel.emit('error', {'message': 'Previous answer is still being processed', 'status': 409})
+        return
+    context = dict(channel.context, **channel.turn_context)
+    channel.turn_context = None
+    audio = channel.take_audio()
+    threading.Thread(target=_run_turn, args=(app, channel, context, audio, filename),
+                     name=f'viva-turn-{channel.id[:8]}', daemon=True).start()
+
+
+def _run_turn(app, channel, context, audio, filename):
+    """Turn thread: holds channel.turn_lock (taken by _start_turn) until the turn is done."""
+    try:
+        with app.app_context():
+            _turn(channel, context, audio, filename)
+    finally:
+        channel.turn_lock.release()
+
+
+def _turn(channel, context, audio, filename):
+    channel.emit('progress', {'stage': 'stt', 'audio_bytes': len(audio)})
+    try:
+        response = run_turn(channel.mode, audio, filename, context, on_event=channel.emit)
+    except TurnError as e:
+        channel.emit('error', {'message': str(e), 'status': e.status})
+        return
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        channel.emit('error', {'message': f'Turn failed: {str(e)}', 'status': 500})
+        return
+
+    result = response.get('result') or {}
+    if channel.mode == 'chat' and result.get('continue'):
+        # Next turn continues the same chat session
+        channel.context.update(session_id=result['session_id'], turn=result['turn'])
+    grade = response.get('grade') or {}
+    if grade.get('provisional') and grade.get('grade_id'):
+        channel.pending_grades.add(grade['grade_id'])
+    channel.emit('turn', response)
+
+
+def _partial(channel, text):
+    """Chat mode: start drafting the follow-up from a partial transcript (as /chat-viva/partial)."""
+    from app.services.chat_drafts import submit_partial
+    from app.services.chat_sessions import get_chat_sessions
+    session_id = channel.context.get('session_id')
+    session = get_chat_sessions().get(session_id) if channel.mode == 'chat' and session_id else None
+    if session is not None:
+        submit_partial(session, text)
+
+
+def _push_final_grades(channel):
+    """Send the final grade of each provisional grade of this viva once it is known."""
+    from app.services.provisional_grading import get_grade_status
+    for grade_id in list(channel.pending_grades):
+        try:
+            grade = get_grade_status(grade_id)
+        except Exception as e:
+            print(f"[VIVA WS] Could not check grade {grade_id}: {e}")
+            return
+        if grade is None or grade['status'] != 'pending':
+            channel.pending_grades.discard(grade_id)
+        if grade is not None and grade['status'] != 'pending':
+            channel.emit('final_grade', grade)
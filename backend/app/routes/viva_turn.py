@@ -0,0 +1,45 @@
+"""
+Viva Turn API
+- One request per spoken answer: audio + session context in, transcript + grade +
+  next prompt + per-stage timings out (app/services/viva_turn.py)
+"""
+
+from flask import Blueprint, request, jsonify
+import json
+
+from app.services.viva_turn import run_turn, TurnError
+
+viva_turn_bp = Blueprint('viva_turn', __name__)
+
+
+@viva_turn_bp.route('/viva/turn', methods=['POST'])
+def viva_turn():
+    """
+    Transcribe, grade and get the next prompt in a single round trip.
+    Expects multipart form:
+        audio    answer recording
+        mode     kbc | session | chat
+        context  JSON:
+            kbc      {"question", "expected_answer", "topic", "language", "provisional"}
+            session  {"session_id"}                              (from /viva/start)
+            chat     {"session_id", "topic_id", "turn", "max_turns", "language", "history"}
+    Returns JSON: { "transcript", "retry", "grade", "next_prompt", "result", "timings" }
+    """
+    if 'audio' not in request.files:
+        return jsonify({'error': 'No audio file provided'}), 400
+    try:
+        context = json.loads(request.form.get('context') or '{}')
+    except ValueError:
+        return jsonify({'error': 'context must be JSON'}), 400
+    if not isinstance(context, dict):
+        return jsonify({'error': 'context must be a JSON object'}), 400
+
+    audio = request.files['audio']
+    try:
+        return jsonify(run_turn(request.form.get('mode', 'kbc'), audio.read(), audio.filename, context))
+    except TurnError as e:
+        return jsonify({'error': str(e)}), e.status
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': f'Turn failed: {str(e)}'}), 500
@@ -0,0 +1,73 @@
+"""
+Worker Node API
+- worker_node.py registers extra STT / grading machines here and heartbeats its load
+- GET /workers shows every node (this process included), its load and circuit state
+"""
+
+from flask import Blueprint, request, jsonify
+
+from app.services.workers import get_worker_registry, check_token, workers_enabled, WORKER_TTL
+
+workers_bp = Blueprint('workers', __name__)
+
+
+def _refused():
+    """Error response unless the request carries the worker token, None if it does."""
+    if not workers_enabled():
+        return jsonify({'error': 'Worker nodes are disabled: set WORKER_TOKEN on the API server'}), 503
+    if not check_token(request.headers.get('X-Worker-Token', '')):
+        return jsonify({'error': 'Invalid worker token'}), 401
+    return None
+
+
+@workers_bp.route('/workers/register', methods=['POST'])
+def register_worker():
+    """
+    Register (or re-register) a worker node.
+    Expects JSON: {
+        "worker_id": "plant2:9100",
+        "url": "http://10.0.0.12:9100",
+        "roles": ["stt", "grade"],
+        "capacity": {"stt": 2, "grade": 4},
+        "info": {...}  # Optional - model sizes, versions
+    }
+    Returns JSON: { "registered": true, "heartbeat_seconds": 10 }
+    """
+    refused = _refused()
+    if refused:
+        return refused
+    data = request.json or {}
+    try:
+        node = get_worker_registry().register(
+            data.get('worker_id'), data.get('url'), data.get('roles') or [],
+            {k: int(v) for k, v in (data.get('capacity') or {}).items()}, data.get('info')
+        )
+    except (ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'registered': True, 'worker': node.status(), 'heartbeat_seconds': max(1, int(WORKER_TTL / 3))})
+
+
+@workers_bp.route('/workers/<worker_id>/heartbeat', methods=['POST'])
+def worker_heartbeat(worker_id):
+    """Expects JSON: { "load": {"stt": 1, "grade": 0} }. 404 means: register again."""
+    refused = _refused()
+    if refused:
+        return refused
+    if not get_worker_registry().heartbeat(worker_id, (request.json or {}).get('load')):
+        return jsonify({'error': 'Unknown worker, register again'}), 404
+    return jsonify({'ok': True})
+
+
+@workers_bp.route('/workers/<worker_id>', methods=['DELETE'])
+def unregister_worker(worker_id):
+    """Worker shutting down: stop sending it jobs."""
+    refused = _refused()
+    if refused:
+        return refused
+    return jsonify({'removed': get_worker_registry().unregister(worker_id)})
+
+
+@workers_bp.route('/workers', methods=['GET'])
+def list_workers():
+    """All nodes with roles, capacity, in-flight jobs and circuit state"""
+    return jsonify(get_worker_registry().status())
@@ -0,0 +1,123 @@
+"""
+Speculative Follow-up Drafts (chat viva)
+- While the candidate is still answering, partial transcripts (POST /chat-viva/partial;
+  ChatViva sends the browser's interim speech recognition) trigger background drafts
+  of the next follow-up question
+- On /chat-viva/respond the draft is used if its partial answer is close enough to
+  the final answer and the conversation has not moved on; otherwise a fresh reply
+  is generated as before
+- Drafting also warms Ollama's KV cache with the conversation prefix
+"""
+
+import difflib
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai.llm import metrics, tracing
+from ai.llm.scheduler import BACKGROUND
+
+MIN_SIMILARITY = float(os.environ.get('CHAT_DRAFT_MIN_SIMILARITY', 0.85))
+MIN_PARTIAL_WORDS = 4
+MAX_DRAFTS = 3
+DRAFT_TTL = 120  # Seconds
+
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='chat-draft')
+_state_lock = threading.Lock()
+
+
+def _normalize(text: str) -> str:
+    return ' '.join(re.sub(r'[^\w\s]', ' ', (text or "").lower()).split())
+
+
+def similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, _normalize(a), _normalize(b)).ratio()
+
+
+class DraftState:
+    """Per-session speculation state (stored on the ChatSession as .drafts)."""
+
+    def __init__(self):
+        self.drafts = []         # [{"version", "answer", "reply", "created"}]
+        self.in_flight = False
+        self.pending = None      # Latest partial that arrived while a draft was running
+        self.lock = threading.Lock()
+
+
+def _state(session) -> DraftState:
+    with _state_lock:
+        if session.drafts is None:
+            session.drafts = DraftState()
+        return session.drafts
+
+
+def submit_partial(session, partial_text: str) -> bool:
+    """Queue a draft for this partial answer. Returns False if it was ignored."""
+    partial_text = (partial_text or "").strip()
+    if len(partial_text.split()) < MIN_PARTIAL_WORDS:
+        return False
+
+    state = _state(session)
+    with state.lock:
+        latest = state.drafts[-1]["answer"] if state.drafts else ""
+        if latest and similarity(latest, partial_text) >= MIN_SIMILARITY:
+            return False  # Existing draft already covers this direction
+        if state.in_flight:
+            state.pending = partial_text
+            return True
+        state.in_flight = True
+    _executor.submit(_draft_loop, session, partial_text)
+    return True
+
+
+def _draft_loop(session, partial_text: str):
+    state = _state(session)
+    while partial_text:
+        try:
+            with session.lock:
+                version = len(session.turns)
+                messages = session.messages + [{"role": "user", "content": partial_text}]
+            with tracing.call_type('chat_draft'):
+                reply = session.complete(messages, 'followup', priority=BACKGROUND)
+            reply = reply.split('\n')[0].strip()
+            if len(reply) >= 10:
+                with state.lock:
+                    state.drafts.append({"version": version, "answer": partial_text, "reply": reply, "created": time.time()})
+                    del state.drafts[:-MAX_DRAFTS]
+                metrics.increment('chat_draft_total', result='generated')
+        except Exception as e:
+            print(f"[CHAT DRAFT] Draft failed: {e}")
+            metrics.increment('chat_draft_total', result='error')
+
+        with state.lock:
+            partial_text, state.pending = state.pending, None
+            if not partial_text:
+                state.in_flight = False
+
+
+def take_draft(session, final_answer: str):
+    """
+    Best draft for the final answer, or None. Call with session.lock held,
+    before the answer is added to the session.
+    """
+    state = _state(session)
+    with state.lock:
+        drafts, state.drafts = state.drafts, []
+    if not drafts:
+        return None
+
+    version = len(session.turns)
+    now = time.time()
+    usable = [d for d in drafts if d["version"] == version and now - d["created"] < DRAFT_TTL]
+    if not usable:
+        metrics.increment('chat_draft_total', result='stale')
+        return None
+
+    best = max(usable, key=lambda d: similarity(d["answer"], final_answer))
+    if similarity(best["answer"], final_answer) < MIN_SIMILARITY:
+        metrics.increment('chat_draft_total', result='miss')
+        return None
+    metrics.increment('chat_draft_total', result='hit')
+    return best["reply"]
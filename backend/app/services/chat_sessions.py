@@ -0,0 +1,209 @@
+"""
+Chat Viva Sessions
+- One in-memory session per conversational viva (expires after CHAT_SESSION_TTL idle seconds)
+- The message list is append-only (between summary folds) behind a fixed system
+  prompt, so every /api/chat request shares its prefix with the previous one and
+  Ollama reuses the KV cache: each turn only pays for the newest messages
+- Older turns are folded into a running summary (app.services.chat_summary),
+  so the prompt stays bounded however long the interview runs
+- Sessions lost on restart are rebuilt from the client's history
+"""
+
+import os
+import threading
+import time
+import uuid
+
+from ai.llm import ollama_client, metrics
+from ai.llm.ollama_client import MODEL_NAME
+from ai.llm.profiles import get_profile
+from ai.llm.scheduler import INTERACTIVE
+
+SESSION_TTL = int(os.environ.get('CHAT_SESSION_TTL', 1800))
+MAX_SESSIONS = int(os.environ.get('CHAT_MAX_SESSIONS', 200))
+# Fixed context window: changing num_ctx between requests reloads the model and drops the cache
+CHAT_NUM_CTX = int(os.environ.get('CHAT_NUM_CTX', 4096))
+
+SYSTEM_PROMPTS = {
+    'Hindi': """You are conducting a friendly technical interview in Hindi about {topic_name}.
+
+{context}
+
+Rules:
+- Ask ONE question at a time, short (1-2 sentences), in Hindi.
+- After each candidate answer, ask a follow-up that explores deeper into what they mentioned, or moves to a related concept they haven't discussed.
+- Be conversational and friendly (like "अच्छा! और बताओ..." or "hmm, interesting! तो...").
+- Test their practical knowledge.
+- Only output what you say to the candidate, nothing else.""",
+    'English': """You are conducting a friendly technical interview about {topic_name}.
+
+{context}
+
+Rules:
+- Ask ONE short question at a time (1-2 sentences), in English.
+- After each candidate answer, ask a follow-up that explores their knowledge further.
+- Only output what you say to the candidate, nothing else."""
+}
+
+OPENING_REQUESTS = {
+    'Hindi': """Candidate name: {user_name}. Start with a warm greeting and ask an open-ended question about their work.
+
+Example opening:
+"नमस्ते! मैं आपसे {topic_name} के बारे में कुछ बातें करना चाहता हूँ। सबसे पहले बताइए, आप IPQC में क्या-क्या काम करते हैं?"
+
+Generate a similar friendly opening in Hindi (2-3 sentences max).""",
+    'English': """Candidate name: {user_name}. Start with a warm greeting and ask an open-ended question about their work (2-3 sentences max)."""
+}
+
+
+class ChatSession:
+    def __init__(self, topic_id, topic_name: str, context: str, language: str, user_name: str):
+        self.id = uuid.uuid4().hex
+        self.topic_id = topic_id
+        self.topic_name = topic_name
+        self.language = 'Hindi' if language == 'Hindi' else 'English'
+        self.system_prompt = SYSTEM_PROMPTS[self.language].format(topic_name=topic_name, context=context)
+        self.opening_request = OPENING_REQUESTS[self.language].format(user_name=user_name, topic_name=topic_name)
+        self.turns = []       # [{"ai", "user"}] - full transcript
+        self.summary = ""     # Running summary of turns[:folded]
+        self.coverage = {}    # concept -> coverage note, for turns[:folded]
+        self.folded = 0       # Number of leading turns represented only by summary / coverage
+        self.turn_stats = []  # Per-turn prompt evaluation cost
+        self.drafts = None    # app.services.chat_drafts.DraftState, created on first partial answer
+        self.last_used = time.time()
+        self.lock = threading.Lock()
+
+    def add_assistant(self, text: str):
+        self.turns.append({"ai": text, "user": ""})
+
+    def add_user(self, text: str):
+        if self.turns and not self.turns[-1]["user"]:
+            self.turns[-1]["user"] = text
+        else:
+            self.turns.append({"ai": "", "user": text})
+
+    def summary_block(self) -> str:
+        lines = [f"Interview so far (summary of earlier exchanges): {self.summary}"]
+        if self.coverage:
+            lines.append("Concepts already discussed:")
+            lines.extend(f"- {concept}: {note}" for concept, note in self.coverage.items())
+        return "\n".join(lines)
+
+    @property
+    def messages(self) -> list:
+        """
+        Chat messages for the next request. Append-only between folds, so the
+        prefix (and Ollama's KV cache) only changes when older turns are summarized.
+        """
+        messages = [{"role": "system", "content": self.system_prompt}]
+        if self.folded:
+            messages.append({"role": "system", "content": self.summary_block()})
+        else:
+            messages.append({"role": "user", "content": self.opening_request})
+        for turn in self.turns[self.folded:]:
+            if turn["ai"]:
+                messages.append({"role": "assistant", "content": turn["ai"]})
+            if turn["user"]:
+                messages.append({"role": "user", "content": turn["user"]})
+        return messages
+
+    def reply(self, profile: str, timeout: float = 30) -> str:
+        """Ask the model for the next interviewer message (not yet appended); profile: 'opening' / 'followup'."""
+        return self.complete(self.messages, profile, timeout)
+
+    def complete(self, messages: list, profile: str, timeout: float = 30, priority: str = INTERACTIVE) -> str:
+        """Chat completion for an explicit message list (e.g. a speculative draft)."""
+        profile = get_profile(profile)
+        result = ollama_client.chat(
+            messages,
+            options=profile.options(self.language, num_ctx=CHAT_NUM_CTX),
+            model=MODEL_NAME,
+            timeout=timeout,
+            priority=priority,
+            cutoff=profile.cutoff()
+        )
+        self._record(result, len(messages))
+        return (result.get("message") or {}).get("content", "").strip()
+
+    def _record(self, result: dict, message_count: int):
+        tokens = result.get("prompt_eval_count") or 0
+        seconds = (result.get("prompt_eval_duration") or 0) / 1e9
+        self.turn_stats.append({
+            "messages": message_count,
+            "prompt_eval_tokens": tokens,
+            "prompt_eval_ms": round(seconds * 1000, 1)
+        })
+        metrics.increment('llm_chat_prompt_eval_tokens_total', tokens, model=MODEL_NAME)
+        metrics.observe('llm_chat_prompt_eval_seconds', seconds, model=MODEL_NAME)
+
+    def exchanges(self) -> list:
+        """Full conversation as [{ai, user}] pairs."""
+        return [dict(turn) for turn in self.turns]
+
+    def info(self) -> dict:
+        return {
+            "session_id": self.id,
+            "topic_id": self.topic_id,
+            "topic_name": self.topic_name,
+            "language": self.language,
+            "turns": len(self.turns),
+            "folded_turns": self.folded,
+            "summary": self.summary,
+            "coverage": self.coverage,
+            "messages": len(self.messages),
+            "idle_seconds": round(time.time() - self.last_used, 1),
+            "turn_stats": self.turn_stats
+        }
+
+
+class ChatSessionStore:
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        # Called with the lock held
+        now = time.time()
+        for session_id in [sid for sid, s in self._sessions.items() if now - s.last_used > SESSION_TTL]:
+            del self._sessions[session_id]
+        while len(self._sessions) >= MAX_SESSIONS:
+            oldest = min(self._sessions.values(), key=lambda s: s.last_used)
+            del self._sessions[oldest.id]
+
+    def create(self, topic_id, topic_name: str, context: str, language: str, user_name: str) -> ChatSession:
+        session = ChatSession(topic_id, topic_name, context, language, user_name)
+        with self._lock:
+            self._expire()
+            self._sessions[session.id] = session
+        return session
+
+    def get(self, session_id) -> ChatSession:
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session and time.time() - session.last_used > SESSION_TTL:
+                del self._sessions[session_id]
+                session = None
+            if session:
+                session.last_used = time.time()
+            return session
+
+    def rebuild(self, topic_id, topic_name: str, context: str, language: str, history: list) -> ChatSession:
+        """Recreate a session from the client's history ([{ai, user}] items, either may be empty)."""
+        session = self.create(topic_id, topic_name, context, language, 'Candidate')
+        for item in history:
+            if item.get('ai'):
+                session.add_assistant(item['ai'])
+            if item.get('user'):
+                session.add_user(item['user'])
+        return session
+
+    def end(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+_store = ChatSessionStore()
+
+
+def get_chat_sessions() -> ChatSessionStore:
+    return _store
@@ -0,0 +1,122 @@
+"""
+Rolling Chat Viva Summarization
+- After a turn, older exchanges are folded (in the background) into the session's
+  running summary and per-concept coverage notes
+- Only the last KEEP_RECENT turns stay verbatim, so follow-up and final-evaluation
+  prompts stay bounded however long the interview runs
+- Folding happens in batches: the chat prefix (and KV cache) changes once per batch,
+  not once per turn
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from ai.llm import metrics, tracing
+from ai.llm.ollama_client import MODEL_NAME
+from ai.llm.scheduler import BACKGROUND, INTERACTIVE
+from ai.llm.structured import ollama_structured, ConversationSummary
+
+KEEP_RECENT = int(os.environ.get('CHAT_KEEP_RECENT_TURNS', 3))
+FOLD_BATCH = int(os.environ.get('CHAT_FOLD_BATCH', 3))
+MAX_CONCEPTS = 12
+MAX_SUMMARY_CHARS = 600
+MAX_TURN_CHARS = 300
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chat-summary')
+
+
+def _clip(text: str, limit: int) -> str:
+    text = (text or "").strip()
+    return text if len(text) <= limit else text[:limit].rsplit(' ', 1)[0] + "..."
+
+
+def _turns_text(turns: list) -> str:
+    return "\n".join(
+        f"Q: {_clip(t.get('ai', ''), MAX_TURN_CHARS)}\nA: {_clip(t.get('user', ''), MAX_TURN_CHARS)}"
+        for t in turns
+    )
+
+
+def needs_fold(session) -> bool:
+    return len(session.turns) - KEEP_RECENT - session.folded >= FOLD_BATCH
+
+
+def schedule_fold(session):
+    """Fold older turns in the background if enough have accumulated."""
+    if needs_fold(session):
+        _executor.submit(fold_older_turns, session)
+
+
+def fold_older_turns(session, priority: str = BACKGROUND) -> bool:
+    """Summarize turns[folded:-KEEP_RECENT] into the session. Returns True if folded."""
+    with session.lock:
+        start = session.folded
+        end = len(session.turns) - KEEP_RECENT
+        if end - start < FOLD_BATCH:
+            return False
+        batch = [dict(t) for t in session.turns[start:end]]
+        summary = session.summary
+        coverage = dict(session.coverage)
+
+    known = "\n".join(f"- {concept}: {note}" for concept, note in coverage.items()) or "(none)"
+    prompt = f"""Update the running summary of a technical interview about {session.topic_name}.
+
+Current summary: {summary or "(none)"}
+Concepts noted so far:
+{known}
+
+New exchanges:
+{_turns_text(batch)}
+
+Return:
+- summary: the updated summary (max 3 sentences): what was asked and how well the candidate answered
+- coverage: for each concept discussed in the new exchanges, the concept name and a few words on how well the candidate knew it
+
+Respond as JSON only."""
+
+    try:
+        with tracing.call_type('chat_summary'):
+            result = ollama_structured(prompt, ConversationSummary, profile='summary', model=MODEL_NAME,
+                                        timeout=60, priority=priority)
+        new_summary = _clip(result.summary, MAX_SUMMARY_CHARS)
+        for item in result.coverage:
+            coverage.pop(item["concept"], None)  # Re-insert so recent concepts are kept when trimming
+            coverage[item["concept"]] = _clip(item["note"], 120)
+        outcome = 'ok'
+    except Exception as e:
+        # Extractive fallback keeps the prompt bounded even without the LLM
+        print(f"[CHAT SUMMARY] Summarization failed, using extractive summary: {e}")
+        pairs = " | ".join(f"{_clip(t.get('ai', ''), 60)} -> {_clip(t.get('user', ''), 60)}" for t in batch)
+        new_summary = (f"{summary} | {pairs}" if summary else pairs)[-MAX_SUMMARY_CHARS:]
+        outcome = 'fallback'
+
+    while len(coverage) > MAX_CONCEPTS:
+        coverage.pop(next(iter(coverage)))
+
+    with session.lock:
+        if session.folded != start:  # Another fold won the race
+            return False
+        session.summary = new_summary
+        session.coverage = coverage
+        session.folded = end
+    metrics.increment('chat_summary_folds_total', outcome=outcome)
+    return True
+
+
+def session_transcript(session) -> str:
+    """Bounded conversation text for grading: summary + coverage + recent turns verbatim."""
+    with session.lock:
+        parts = [session.summary_block()] if session.folded else []
+        recent = [dict(t) for t in session.turns[session.folded:]]
+    parts.append(_turns_text(recent))
+    return "\n\n".join(parts)
+
+
+def final_transcript(session) -> str:
+    """
+    Conversation text for the final evaluation. Turns not folded yet (a session rebuilt
+    from client history, or a fold still queued) are folded now, so none is dropped.
+    """
+    if needs_fold(session):
+        fold_older_turns(session, priority=INTERACTIVE)
+    return session_transcript(session)
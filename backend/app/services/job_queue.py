@@ -0,0 +1,320 @@
+"""
+Background Job Queue (MySQL-backed)
+- Long LLM work (question-bank generation) runs outside the HTTP request
+- Jobs, progress and partial results are stored in the llm_job table
+- A small worker pool runs jobs inside the Flask app context
+- Queued jobs, and running jobs whose worker died, are picked up again on restart;
+  a periodic sweep also re-queues running jobs that stopped updating
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from app.db_config import get_db
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 1))
+# Kinds with their own worker pool, so short jobs never wait behind a question-bank job
+JOB_POOLS = {
+    'final_grade': int(os.environ.get('GRADE_JOB_WORKERS', 2)),
+}
+# A running job with no progress update for this long is considered orphaned
+JOB_STALE_SECONDS = int(os.environ.get('JOB_STALE_SECONDS', 600))
+# One API process (pm2 instances=1): on startup every running job of an earlier process is orphaned
+JOB_SINGLE_PROCESS = os.environ.get('JOB_SINGLE_PROCESS', 'true').lower() in ('1', 'true', 'yes')
+JOB_MAX_ATTEMPTS = 3
+
+CREATE_JOB_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS llm_job (
+    id VARCHAR(36) PRIMARY KEY,
+    kind VARCHAR(50) NOT NULL,
+    params TEXT,
+    status VARCHAR(20) DEFAULT 'queued' COMMENT 'queued, running, completed, failed',
+    progress INT DEFAULT 0,
+    total INT DEFAULT 0,
+    result LONGTEXT,
+    error TEXT,
+    attempts INT DEFAULT 0,
+    worker VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    started_at DATETIME NULL,
+    finished_at DATETIME NULL,
+    INDEX idx_llm_job_status (status)
+)
+"""
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+
+def _run_generate_questions(job_id: str, params: dict):
+    """Job handler: generate a question bank, storing partial results per section."""
+    from ai.llm.ollama_llm import iter_questions_for_department
+
+    num_questions = params.get('num_questions', 15)
+    update_job(job_id, total=num_questions)
+
+    partial = []
+    for event in iter_questions_for_department(
+        params['machine_id'],
+        params.get('machine_name', 'Solar Panel Manufacturing'),
+        num_questions,
+        params.get('language', 'Hindi')
+    ):
+        if event.get('done'):
+            return {'questions': event['questions'], 'total': event['total']}
+        partial.extend(event['questions'])
+        update_job(job_id, progress=min(len(partial), num_questions), result={'questions': partial, 'partial': True})
+
+
+def _run_final_grade(job_id: str, params: dict):
+    """Job handler: authoritative grade behind a provisional /evaluate_with_answer grade."""
+    from app.services.provisional_grading import finalize_grade
+    return finalize_grade(job_id, params)
+
+
+# kind -> handler(job_id, params) -> result dict
+JOB_HANDLERS = {
+    'generate_questions': _run_generate_questions,
+    'final_grade': _run_final_grade,
+}
+
+
+def ensure_job_table():
+    """Create the llm_job table if it does not exist."""
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(CREATE_JOB_TABLE_SQL)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _row_to_job(row: dict) -> dict:
+    job = dict(row)
+    for key in ('params', 'result'):
+        if job.get(key):
+            try:
+                job[key] = json.loads(job[key])
+            except ValueError:
+                pass
+    for key in ('created_at', 'updated_at', 'started_at', 'finished_at'):
+        if job.get(key):
+            job[key] = job[key].isoformat()
+    return job
+
+
+def get_job(job_id: str):
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM llm_job WHERE id = %s", (job_id,))
+        row = cursor.fetchone()
+    finally:
+        conn.close()
+    return _row_to_job(row) if row else None
+
+
+def list_jobs(status: str = None, limit: int = 50) -> list:
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        query = "SELECT id, kind, status, progress, total, error, attempts, created_at, updated_at, started_at, finished_at FROM llm_job"
+        params = []
+        if status:
+            query += " WHERE status = %s"
+            params.append(status)
+        query += " ORDER BY created_at DESC LIMIT %s"
+        params.append(limit)
+        cursor.execute(query, params)
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    return [_row_to_job(r) for r in rows]
+
+
+def update_job(job_id: str, **fields):
+    """Update progress / total / result / error columns of a job."""
+    if not fields:
+        return
+    if 'result' in fields and not isinstance(fields['result'], str):
+        fields['result'] = json.dumps(fields['result'], ensure_ascii=False)
+    assignments = ", ".join(f"{key} = %s" for key in fields)
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute(f"UPDATE llm_job SET {assignments} WHERE id = %s", list(fields.values()) + [job_id])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+class JobQueue:
+    def __init__(self, app, max_workers: int = JOB_WORKERS):
+        self.app = app
+        self.worker_name = f"{socket.gethostname()}:{os.getpid()}"
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='llm-job')
+        self.pools = {
+            kind: ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'llm-job-{kind}')
+            for kind, workers in JOB_POOLS.items()
+        }
+        self._submitted = set()  # Job ids handed to a pool and not finished yet
+        self._lock = threading.Lock()
+
+    def _executor(self, kind: str):
+        return self.pools.get(kind, self.executor)
+
+    def _start(self, job_id: str, kind: str) -> bool:
+        """Hand a job to its pool unless this process already has it."""
+        with self._lock:
+            if job_id in self._submitted:
+                return False
+            self._submitted.add(job_id)
+        self._executor(kind).submit(self._run, job_id)
+        return True
+
+    def submit(self, kind: str, params: dict) -> str:
+        """Store a new job and hand it to the worker pool. Returns the job id."""
+        if kind not in JOB_HANDLERS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job_id = str(uuid.uuid4())
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO llm_job (id, kind, params, status) VALUES (%s, %s, %s, 'queued')",
+                (job_id, kind, json.dumps(params, ensure_ascii=False))
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        self._start(job_id, kind)
+        print(f"[JOBS] Submitted {kind} job {job_id}")
+        return job_id
+
+    def _claim(self, job_id: str):
+        """Atomically move a queued job to running. Returns the job row, or None if taken."""
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE llm_job
+                SET status = 'running', worker = %s, attempts = attempts + 1, started_at = NOW()
+                WHERE id = %s AND status = 'queued'
+            """, (self.worker_name, job_id))
+            conn.commit()
+            if cursor.rowcount != 1:
+                return None
+            cursor.execute("SELECT * FROM llm_job WHERE id = %s", (job_id,))
+            return cursor.fetchone()
+        finally:
+            conn.close()
+
+    def _run(self, job_id: str):
+        try:
+            self._run_claimed(job_id)
+        finally:
+            with self._lock:
+                self._submitted.discard(job_id)
+
+    def _run_claimed(self, job_id: str):
+        with self.app.app_context():
+            try:
+                row = self._claim(job_id)
+            except Exception as e:
+                print(f"[JOBS] Could not claim job {job_id}: {e}")
+                return
+            if not row:
+                return
+
+            params = json.loads(row['params'] or '{}')
+            print(f"[JOBS] Running {row['kind']} job {job_id} (attempt {row['attempts']})")
+            try:
+                result = JOB_HANDLERS[row['kind']](job_id, params) or {}
+                update_job(job_id, status='completed', result=result, progress=result.get('total', 0), finished_at=datetime.now())
+                print(f"[JOBS] Job {job_id} completed")
+            except Exception as e:
+                import traceback
+                traceback.print_exc()
+                update_job(job_id, status='failed', error=str(e), finished_at=datetime.now())
+                print(f"[JOBS] Job {job_id} failed: {e}")
+
+    def recover(self, startup: bool = False) -> int:
+        """
+        Re-queue running jobs whose worker is gone, then start every queued job.
+        startup (single process): all running jobs of an earlier process are orphaned.
+        Otherwise (periodic sweep): running jobs with no update for JOB_STALE_SECONDS.
+        Jobs this process is running are never touched. Returns the number of jobs started.
+        """
+        if startup and JOB_SINGLE_PROCESS:
+            orphaned, args = "(worker IS NULL OR worker <> %s)", (self.worker_name,)
+        else:
+            orphaned, args = "updated_at < NOW() - INTERVAL %s SECOND", (JOB_STALE_SECONDS,)
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT id, attempts FROM llm_job WHERE status = 'running' AND {orphaned}", args)
+            with self._lock:
+                orphans = [row for row in cursor.fetchall() if row['id'] not in self._submitted]
+            for row in orphans:
+                if row['attempts'] < JOB_MAX_ATTEMPTS:
+                    cursor.execute("UPDATE llm_job SET status = 'queued' WHERE id = %s AND status = 'running'",
+                                   (row['id'],))
+                else:
+                    cursor.execute("""
+                        UPDATE llm_job SET status = 'failed', error = 'Too many attempts', finished_at = NOW()
+                        WHERE id = %s AND status = 'running'
+                    """, (row['id'],))
+            conn.commit()
+            cursor.execute("SELECT id, kind FROM llm_job WHERE status = 'queued' ORDER BY created_at")
+            queued = cursor.fetchall()
+        finally:
+            conn.close()
+        started = sum(self._start(row['id'], row['kind']) for row in queued)
+        if started or orphans:
+            print(f"[JOBS] {len(orphans)} orphaned running job(s) recovered, {started} queued job(s) started")
+        return started
+
+    def sweep_forever(self):
+        """Periodic stale-job sweep (a worker that hangs or dies without a restart)."""
+        while True:
+            time.sleep(max(30, JOB_STALE_SECONDS // 2))
+            try:
+                self.recover()
+            except Exception as e:
+                print(f"[JOBS] Stale job sweep failed: {e}")
+
+
+# Singleton instance (created by init_job_queue)
+_queue_instance = None
+
+
+def init_job_queue(app):
+    """Create the job table and worker pool, resume unfinished jobs, then keep sweeping for stale ones (background)."""
+    global _queue_instance
+    if _queue_instance is not None:
+        return _queue_instance
+    _queue_instance = JobQueue(app)
+
+    def _startup():
+        try:
+            ensure_job_table()
+            _queue_instance.recover(startup=True)
+        except Exception as e:
+            print(f"[JOBS] Job queue startup failed: {e}")
+        _queue_instance.sweep_forever()
+
+    threading.Thread(target=_startup, daemon=True).start()
+    return _queue_instance
+
+
+def get_job_queue():
+    if _queue_instance is None:
+        raise RuntimeError("Job queue not initialized - call init_job_queue(app)")
+    return _queue_instance
@@ -0,0 +1,244 @@
+"""
+Provisional Grading
+- /evaluate_with_answer replies with a grade from the local cross-encoder and
+  queues the authoritative grade as a 'final_grade' job; the job id is the grade_id
+- Off by default (PROVISIONAL_GRADING); even when on, only a cross-encoder
+  calibrated on viva history (calibrate_grader.py) gives provisional grades -
+  otherwise answers are graded synchronously as before
+- The client keeps grade_id in the answer it saves with the viva record; the
+  final grade is written back to that record (answers_json, counts, score, result)
+  whichever of the two finishes first
+- A final grade that changes the YES / PARTIAL / NO decision, or moves the score
+  by GRADE_CORRECTION_DELTA or more, is a correction: flagged in the job result
+  and sent as a 'correction' event by /grades/<grade_id>/events
+"""
+
+import json
+import os
+import threading
+
+from ai.llm import metrics
+from app.db_config import get_db
+from app.services.job_queue import get_job, get_job_queue, update_job
+
+GRADE_CORRECTION_DELTA = int(os.environ.get('GRADE_CORRECTION_DELTA', 15))
+# Same pass mark as the viva screen
+PASS_PERCENT = 60
+
+
+def provisional_enabled() -> bool:
+    """PROVISIONAL_GRADING, read at call time so .env applies."""
+    return os.environ.get('PROVISIONAL_GRADING', 'false').lower() in ('1', 'true', 'yes')
+
+
+def preload_fast_grader():
+    """Load the cross-encoder in the background at startup, so no candidate waits for the model download."""
+    from ai.nlp.cross_encoder_grader import get_cross_encoder_grader
+    grader = get_cross_encoder_grader()
+    if not provisional_enabled():
+        return
+    if grader.calibration() is None:
+        print("[GRADES] PROVISIONAL_GRADING is on but the cross-encoder is not calibrated "
+              "(run calibrate_grader.py): grading synchronously")
+        return
+    threading.Thread(target=grader.warm_up, name='grader-preload', daemon=True).start()
+
+
+def _decision(result: dict) -> str:
+    if result.get('is_correct'):
+        return 'YES'
+    return 'PARTIAL' if result.get('is_partial') else 'NO'
+
+
+def is_correction(provisional: dict, final: dict) -> bool:
+    """True if the final grade differs materially from the provisional one."""
+    if _decision(provisional) != _decision(final):
+        return True
+    return abs((final.get('score') or 0) - (provisional.get('score') or 0)) >= GRADE_CORRECTION_DELTA
+
+
+def evaluate_provisionally(topic: str, question: str, user_answer: str, expected_answer: str,
+                           language: str = "Hindi", backend: str = None):
+    """
+    Provisional grade with "grade_id" and "provisional": True, the final grade queued.
+    Returns None when there is nothing to gain (the fast grade is the final one), or
+    no grade worth showing (cross-encoder uncalibrated or unavailable, job queue down):
+    grade synchronously instead.
+    """
+    from ai.nlp.cross_encoder_grader import MIN_CONFIDENCE, get_cross_encoder_grader
+    backend = (backend or os.environ.get('GRADER_BACKEND', 'llm')).lower()
+    if backend == 'cross_encoder':
+        return None
+    grader = get_cross_encoder_grader()
+    if grader.calibration() is None:
+        # Uncalibrated cross-encoder scores are guesses: not something to tell a candidate
+        return None
+    try:
+        result = grader.evaluate(topic, question, user_answer, expected_answer, language)
+    except Exception as e:
+        print(f"[GRADES] Cross-encoder unavailable, grading synchronously: {e}")
+        return None
+    # Rule grades, and confident hybrid grades, are what the final grader would return anyway
+    if result.get('grader') == 'rule' or (backend == 'hybrid' and result.get('confidence', 0) >= MIN_CONFIDENCE):
+        return dict(result, provisional=False)
+
+    params = {
+        'topic': topic,
+        'question': question,
+        'user_answer': user_answer,
+        'expected_answer': expected_answer,
+        'language': language,
+        'provisional': {k: result.get(k) for k in ('score', 'is_correct', 'is_partial', 'grader', 'confidence')},
+    }
+    try:
+        grade_id = get_job_queue().submit('final_grade', params)
+    except Exception as e:
+        print(f"[GRADES] Could not queue final grade: {e}")
+        return None
+    metrics.increment('provisional_grades_total', grader=result.get('grader', 'unknown'))
+    return dict(result, provisional=True, grade_id=grade_id)
+
+
+def finalize_grade(grade_id: str, params: dict) -> dict:
+    """'final_grade' job: authoritative grade, correction check, write-back to a saved viva record."""
+    from ai.nlp.cross_encoder_grader import get_grader
+    from app.services.workers import get_worker_registry
+
+    final = get_worker_registry().grader(get_grader())(
+        params.get('topic', 'General'), params.get('question', ''), params['user_answer'],
+        params['expected_answer'], params.get('language', 'Hindi')
+    )
+    final.setdefault('grader', 'llm')
+    provisional = params.get('provisional') or {}
+    corrected = is_correction(provisional, final)
+    result = {
+        'grade': final,
+        'provisional': provisional,
+        'corrected': corrected,
+        'score_delta': (final.get('score') or 0) - (provisional.get('score') or 0),
+    }
+    metrics.increment('final_grades_total', outcome='corrected' if corrected else 'confirmed')
+    if corrected:
+        print(f"[GRADES] {grade_id}: provisional {provisional.get('score')} -> final {final.get('score')}")
+
+    # Store the grade before looking for the record: link_grades() links first and reads
+    # grades second, so whichever side runs last sees the other's write
+    update_job(grade_id, result=result)
+    record_id = (get_job(grade_id)['params'] or {}).get('viva_record_id')
+    if record_id:
+        apply_final_grades(record_id)
+    return result
+
+
+def get_grade_status(grade_id: str):
+    """A provisional grade's state (pending | final | failed) with the final grade once known, or None."""
+    job = get_job(grade_id)
+    if not job or job['kind'] != 'final_grade':
+        return None
+    params = job.get('params') or {}
+    result = job.get('result') if isinstance(job.get('result'), dict) else {}
+    status = 'failed' if job['status'] == 'failed' else ('final' if result.get('grade') else 'pending')
+    return {
+        'grade_id': job['id'],
+        'status': status,
+        'provisional': params.get('provisional'),
+        'final': result.get('grade'),
+        'corrected': result.get('corrected', False),
+        'score_delta': result.get('score_delta'),
+        'viva_record_id': params.get('viva_record_id'),
+        'error': job.get('error'),
+    }
+
+
+def link_grades(record_id: int, answers: list):
+    """Attach the grades of a newly saved viva record to it, then apply those already final."""
+    grade_ids = [a['grade_id'] for a in answers if isinstance(a, dict) and a.get('grade_id')]
+    if not grade_ids:
+        return
+    for grade_id in grade_ids:
+        job = get_job(grade_id)
+        if not job or job['kind'] != 'final_grade':
+            continue
+        params = dict(job['params'] or {}, viva_record_id=record_id)
+        update_job(grade_id, params=json.dumps(params, ensure_ascii=False))
+    apply_final_grades(record_id)
+
+
+def _final_grades(grade_ids: list) -> dict:
+    """grade_id -> job result for the grades that have been finalized."""
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        placeholders = ", ".join(["%s"] * len(grade_ids))
+        cursor.execute(f"SELECT id, result FROM llm_job WHERE id IN ({placeholders}) AND kind = 'final_grade'", grade_ids)
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+    grades = {}
+    for row in rows:
+        try:
+            result = json.loads(row['result'] or 'null')
+        except ValueError:
+            continue
+        if isinstance(result, dict) and result.get('grade'):
+            grades[row['id']] = result
+    return grades
+
+
+def apply_final_grades(record_id: int) -> int:
+    """Rewrite a viva record with the final grades available so far. Returns the number of answers changed."""
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        # Row lock: final grades of one viva usually land within seconds of each other
+        cursor.execute("SELECT answers_json FROM viva_records WHERE id = %s FOR UPDATE", (record_id,))
+        row = cursor.fetchone()
+        if not row:
+            return 0
+        try:
+            answers = json.loads(row['answers_json'] or '[]')
+        except ValueError:
+            return 0
+        grade_ids = [a['grade_id'] for a in answers if isinstance(a, dict) and a.get('grade_id')]
+        grades = _final_grades(grade_ids) if grade_ids else {}
+
+        changed = 0
+        for answer in answers:
+            graded = grades.get(answer.get('grade_id')) if isinstance(answer, dict) else None
+            if not graded or answer.get('provisional') is False:
+                continue
+            final = graded['grade']
+            answer.setdefault('provisional_score', answer.get('score'))
+            answer.update({
+                'score': final.get('score', 0),
+                'is_correct': bool(final.get('is_correct')),
+                'is_partial': bool(final.get('is_partial')) and not final.get('is_correct'),
+                'feedback': final.get('feedback', answer.get('feedback')),
+                'grader': final.get('grader', 'llm'),
+                'graded': final.get('graded', True),
+                'provisional': False,
+                'corrected': graded.get('corrected', False),
+            })
+            changed += 1
+        if not changed:
+            return 0
+
+        # Same summary as the viva screen: percent counts fully correct answers only
+        total = len(answers)
+        correct = sum(1 for a in answers if a.get('is_correct'))
+        partial = sum(1 for a in answers if a.get('is_partial') and not a.get('is_correct'))
+        percent = round(correct / total * 100) if total else 0
+        cursor.execute("""
+            UPDATE viva_records
+            SET answers_json = %s, correct_answers = %s, partial_answers = %s, wrong_answers = %s,
+                score_percent = %s, result = %s
+            WHERE id = %s
+        """, (
+            json.dumps(answers, ensure_ascii=False), correct, partial, total - correct - partial,
+            percent, 'Pass' if percent >= PASS_PERCENT else 'Fail', record_id
+        ))
+        conn.commit()
+    finally:
+        conn.close()
+    print(f"[GRADES] Viva record {record_id}: {changed} final grade(s) applied")
+    return changed
@@ -0,0 +1,85 @@
+"""
+Topic Context Cache (chat viva)
+- Caches per topic: name, sampled Q&A pairs and the rendered prompt block
+- Entries expire after TOPIC_CONTEXT_TTL seconds
+- qa_bank_new writers call invalidate() so edits show up immediately
+- Hits / misses / invalidations are counted in ai.llm.metrics
+"""
+
+import os
+import threading
+import time
+
+from app.db_config import get_db
+from ai.llm import metrics
+
+CACHE_TTL = int(os.environ.get('TOPIC_CONTEXT_TTL', 600))
+SAMPLE_SIZE = 20
+
+
+class TopicContext:
+    def __init__(self, topic_id, topic_name: str, qa_pairs: list):
+        self.topic_id = topic_id
+        self.topic_name = topic_name
+        self.qa_pairs = qa_pairs  # [{"question", "expected_answer"}]
+        self.loaded_at = time.time()
+
+        self.prompt_block = f"Topic: {topic_name}\n\nKey concepts to cover:\n"
+        for qa in qa_pairs:
+            self.prompt_block += f"- {qa['question']} -> {qa['expected_answer']}\n"
+
+
+class TopicContextCache:
+    def __init__(self, ttl: int = CACHE_TTL):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _load(self, topic_id) -> TopicContext:
+        conn = get_db()
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT name FROM training_topic WHERE id = %s', (topic_id,))
+            result = cursor.fetchone()
+            topic_name = result['name'] if result else 'General'
+
+            # Random sample so large banks are not always represented by the same 20 rows
+            cursor.execute('''
+                SELECT question, expected_answer FROM qa_bank_new
+                WHERE topic_id = %s AND is_active = TRUE
+                ORDER BY RAND() LIMIT %s
+            ''', (topic_id, SAMPLE_SIZE))
+            qa_pairs = cursor.fetchall()
+        finally:
+            conn.close()
+        return TopicContext(topic_id, topic_name, list(qa_pairs))
+
+    def get(self, topic_id) -> TopicContext:
+        key = str(topic_id)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and time.time() - entry.loaded_at < self.ttl:
+            metrics.increment('topic_context_cache_total', result='hit')
+            return entry
+
+        metrics.increment('topic_context_cache_total', result='miss')
+        entry = self._load(topic_id)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, topic_id=None):
+        """Drop one topic, or everything when topic_id is None."""
+        with self._lock:
+            if topic_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(str(topic_id), None)
+        metrics.increment('topic_context_cache_total', result='invalidate')
+
+
+_cache = TopicContextCache()
+
+
+def get_topic_context_cache() -> TopicContextCache:
+    return _cache
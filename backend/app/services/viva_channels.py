@@ -0,0 +1,141 @@
+"""
+Viva Channels (WebSocket session state)
+- One channel per viva: mode + session context, the answer audio being uploaded,
+  and every event sent to the browser with a sequence number
+- A channel outlives its connection: on reconnect the client sends the last seq
+  it saw and the missed events are replayed (a turn that finished while the
+  socket was down is delivered on resume)
+- Channels with no connection for CHANNEL_TTL seconds are dropped
+- Socket-independent: app/routes/viva_socket.py is the transport
+"""
+
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+CHANNEL_TTL = int(os.environ.get('VIVA_CHANNEL_TTL', 600))
+REPLAY_EVENTS = 200            # Events kept per channel for resume
+MAX_AUDIO_BYTES = 10 * 1024 * 1024
+
+
+class VivaChannel:
+    def __init__(self, mode: str, context: dict):
+        self.id = str(uuid.uuid4())
+        self.mode = mode
+        self.context = dict(context or {})
+        self.audio = bytearray()
+        self.audio_filename = 'answer.webm'
+        self.turn_context = None      # Set by start_answer, cleared when the turn runs
+        self.pending_grades = set()   # Provisional grade ids whose final grade is not sent yet
+        self.seq = 0
+        self.events = deque(maxlen=REPLAY_EVENTS)
+        self.connected = False
+        self.last_active = time.time()
+        self._send = None
+        self.lock = threading.Lock()       # seq / events / sender
+        self.turn_lock = threading.Lock()  # One turn at a time, even across reconnects
+
+    def attach(self, send, last_seq: int = 0) -> bool:
+        """
+        New connection: replay the events after last_seq, then send new events to send(dict).
+        Returns False if some missed events were already evicted from the replay buffer.
+        """
+        with self.lock:
+            missed = [e for e in self.events if e['seq'] > last_seq]
+            complete = not self.events or self.events[0]['seq'] <= last_seq + 1
+            for event in missed:
+                send(event)
+            self._send = send
+            self.connected = True
+            self.last_active = time.time()
+        return complete
+
+    def detach(self, send):
+        with self.lock:
+            if self._send is send:
+                self._send, self.connected = None, False
+            self.last_active = time.time()
+
+    def emit(self, kind: str, data: dict = None) -> dict:
+        """Number, buffer and (if connected) send an event. Never raises on a dead socket."""
+        with self.lock:
+            self.seq += 1
+            event = {'type': kind, 'seq': self.seq, 'data': data or {}}
+            self.events.append(event)
+            if self._send is not None:
+                try:
+                    self._send(event)
+                except Exception as e:
+                    print(f"[VIVA WS] Channel {self.id}: send failed, kept for resume ({e})")
+                    self._send, self.connected = None, False
+        return event
+
+    def add_audio(self, chunk: bytes) -> bool:
+        if len(self.audio) + len(chunk) > MAX_AUDIO_BYTES:
+            return False
+        self.audio.extend(chunk)
+        self.last_active = time.time()
+        return True
+
+    def take_audio(self) -> bytes:
+        audio, self.audio = bytes(self.audio), bytearray()
+        return audio
+
+    def info(self) -> dict:
+        return {
+            'channel_id': self.id,
+            'mode': self.mode,
+            'seq': self.seq,
+            'connected': self.connected,
+            'audio_bytes': len(self.audio),
+            'answer_open': self.turn_context is not None,
+            'pending_grades': len(self.pending_grades),
+        }
+
+
+class VivaChannels:
+    def __init__(self, ttl: int = CHANNEL_TTL):
+        self.ttl = ttl
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def create(self, mode: str, context: dict) -> VivaChannel:
+        self._evict()
+        channel = VivaChannel(mode, context)
+        with self._lock:
+            self._channels[channel.id] = channel
+        return channel
+
+    def get(self, channel_id: str):
+        self._evict()
+        with self._lock:
+            return self._channels.get(channel_id)
+
+    def close(self, channel_id: str):
+        with self._lock:
+            self._channels.pop(channel_id, None)
+
+    def _evict(self):
+        now = time.time()
+        with self._lock:
+            expired = [cid for cid, c in self._channels.items() if not c.connected and now - c.last_active > self.ttl]
+            for channel_id in expired:
+                del self._channels[channel_id]
+
+    def stats(self) -> dict:
+        with self._lock:
+            channels = list(self._channels.values())
+        return {'channels': len(channels), 'connected': sum(c.connected for c in channels)}
+
+
+# Singleton instance
+_channels_instance = None
+
+
+def get_viva_channels():
+    global _channels_instance
+    if _channels_instance is None:
+        _channels_instance = VivaChannels()
+    return _channels_instance
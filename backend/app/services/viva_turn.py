@@ -0,0 +1,191 @@
+"""
+Viva Turn Pipeline
+- One server-side pipeline per spoken answer: save audio -> transcribe -> grade ->
+  next prompt, instead of /stt followed by /evaluate_with_answer, /viva/answer or
+  /chat-viva/respond from the browser
+- Work that does not need the transcript (chat session lookup / rebuild from
+  history, grader model warm-up) runs while the answer is being transcribed
+- Every stage is timed; timings come back with the turn and go to the metrics
+- Modes reuse the existing turn logic:
+    kbc      client-held question list: grade against expected_answer (provisional grading applies)
+    session  /viva/start session: answer_question() - evaluation + next question
+    chat     /chat-viva session: chat_turn() - follow-up question, or the closing evaluation
+"""
+
+import contextvars
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from ai.llm import metrics
+
+MODES = ('kbc', 'session', 'chat')
+MIN_TRANSCRIPT = 3  # Shorter transcripts: ask the candidate to repeat
+STT_LANGUAGES = {'hindi': 'hi', 'english': 'en'}
+TEMP_AUDIO_DIR = 'temp_audio'  # Same folder as /stt
+
+_stt_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('VIVA_TURN_STT_WORKERS', 4)),
+                                   thread_name_prefix='viva-turn-stt')
+
+
+class TurnError(Exception):
+    """Invalid turn (missing context, unknown session); status is the HTTP status to return."""
+
+    def __init__(self, message: str, status: int = 400):
+        super().__init__(message)
+        self.status = status
+
+
+class TurnTimer:
+    """Per-stage wall-clock timings (ms) of one turn."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.stages = {}
+
+    def record(self, name: str, seconds: float):
+        self.stages[name] = round(seconds * 1000, 1)
+        metrics.observe('viva_turn_stage_seconds', seconds, stage=name)
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.record(name, time.time() - start)
+
+    def summary(self) -> dict:
+        total = time.time() - self.started
+        metrics.observe('viva_turn_seconds', total)
+        return dict(self.stages, total=round(total * 1000, 1))
+
+
+def stt_language(context: dict) -> str:
+    """Whisper language code: explicit stt_language, else from the viva language (Hindi -> hi)."""
+    return context.get('stt_language') or STT_LANGUAGES.get((context.get('language') or 'Hindi').lower(), 'hi')
+
+
+def _save_audio(audio: bytes, filename: str) -> str:
+    os.makedirs(TEMP_AUDIO_DIR, exist_ok=True)
+    extension = os.path.splitext(filename or '')[1] or '.webm'
+    path = os.path.join(TEMP_AUDIO_DIR, f"turn_{uuid.uuid4().hex}{extension}")
+    with open(path, 'wb') as f:
+        f.write(audio)
+    return path
+
+
+def _transcribe(path: str, language: str) -> tuple:
+    """(text, seconds) - on a worker node or in this process, like /stt."""
+    from app.routes.stt import transcribe
+    start = time.time()
+    text = transcribe(path, language=language)
+    return text, time.time() - start
+
+
+def _validate(mode: str, context: dict):
+    """Cheap checks before any audio work."""
+    if mode not in MODES:
+        raise TurnError(f"mode must be one of {', '.join(MODES)}")
+    if mode == 'kbc' and (not context.get('question') or not context.get('expected_answer')):
+        raise TurnError('question and expected_answer are required')
+    if mode == 'session':
+        from app.routes.viva_session import active_sessions
+        session = active_sessions.get(context.get('session_id'))
+        if not session:
+            raise TurnError('Session not found or expired', 404)
+        if session['status'] != 'active':
+            raise TurnError('Session already completed')
+    if mode == 'chat' and not context.get('session_id') and not context.get('topic_id'):
+        raise TurnError('session_id or topic_id is required')
+
+
+def _prepare(mode: str, context: dict):
+    """Transcript-independent work, run while the answer is transcribed. Returns the chat session for chat mode."""
+    if mode == 'chat':
+        from app.routes.chat_viva import resolve_session
+        return resolve_session(context.get('session_id'), context.get('topic_id'),
+                               context.get('language', 'Hindi'), context.get('history', []))
+    if mode == 'kbc':
+        from ai.nlp.cross_encoder_grader import get_cross_encoder_grader
+        from app.services.provisional_grading import provisional_enabled
+        grader = get_cross_encoder_grader()
+        # Only a calibrated grader gives provisional grades
+        if context.get('provisional', provisional_enabled()) and grader.calibration() is not None:
+            grader.warm_up()
+    return None
+
+
+def run_turn(mode: str, audio: bytes, filename: str, context: dict, on_event=None) -> dict:
+    """
+    Run one spoken turn. Raises TurnError for invalid input.
+    on_event(kind, data) is called as results become available: "transcript" as soon
+    as STT finishes, then "grade" and / or "next_prompt" (the WebSocket channel pushes them).
+    Returns: {
+        "mode", "transcript", "retry",   # retry: nothing usable was heard, ask again
+        "grade",                         # kbc: /evaluate_with_answer result; session: evaluation; chat: closing evaluation or None
+        "next_prompt",                   # next question / follow-up text, None when the viva is over (or kbc)
+        "result",                        # full response of the underlying endpoint
+        "timings"                        # ms per stage: upload, stt, prepare, grade / next, total
+    }
+    """
+    context = context or {}
+    _validate(mode, context)
+    if not audio:
+        raise TurnError('No audio provided')
+
+    timer = TurnTimer()
+    with timer.stage('upload'):
+        path = _save_audio(audio, filename)
+    try:
+        future = _stt_executor.submit(contextvars.copy_context().run, _transcribe, path, stt_language(context))
+        try:
+            with timer.stage('prepare'):
+                state = _prepare(mode, context)
+        finally:
+            transcript, stt_seconds = future.result()
+        timer.record('stt', stt_seconds)
+    finally:
+        os.remove(path)
+
+    transcript = (transcript or '').strip()
+    emit = on_event or (lambda kind, data: None)
+    emit('transcript', {'transcript': transcript, 'stt_ms': timer.stages['stt']})
+    response = {'mode': mode, 'transcript': transcript, 'retry': False,
+                'grade': None, 'next_prompt': None, 'result': None}
+    if len(transcript) < MIN_TRANSCRIPT:
+        response['retry'] = True
+        response['timings'] = timer.summary()
+        return response
+
+    language = context.get('language', 'Hindi')
+    if mode == 'kbc':
+        from app.routes.llm import grade_answer
+        with timer.stage('grade'):
+            result = grade_answer(context.get('topic', 'General'), context['question'], transcript,
+                                  context['expected_answer'], language, context.get('provisional'))
+        response.update(grade=result, result=result)
+    elif mode == 'session':
+        from app.routes.viva_session import answer_question
+        with timer.stage('grade'):
+            result, status = answer_question(context['session_id'], transcript)
+        if status != 200:
+            raise TurnError(result.get('error', 'Answer failed'), status)
+        response.update(grade=result['evaluation'], result=result,
+                        next_prompt=(result.get('current_question') or {}).get('question'))
+    else:
+        from app.routes.chat_viva import chat_turn
+        with timer.stage('next'):
+            result = chat_turn(state, transcript, context.get('turn', 1), context.get('max_turns', 8), language)
+        response.update(grade=result.get('evaluation'), result=result,
+                        next_prompt=result['message'] if result.get('continue') else None)
+
+    if response['grade'] is not None:
+        emit('grade', response['grade'])
+    if response['next_prompt']:
+        emit('next_prompt', {'text': response['next_prompt']})
+    response['timings'] = timer.summary()
+    print(f"[VIVA TURN] {mode}: {response['timings']}")
+    return response
@@ -0,0 +1,303 @@
+"""
+Worker Node Registry
+- Extra machines on the LAN run worker_node.py and register here as STT and / or
+  grading workers, advertising a capacity per role
+- Workers heartbeat every few seconds with their current load; a worker missing
+  heartbeats for WORKER_TTL seconds is dropped (after an API restart, workers
+  re-register on their next heartbeat)
+- Each job goes to the least-loaded healthy node - this process counts as one node
+  with WORKER_LOCAL_CAPACITY - and is retried on the next node if a worker fails
+- Every worker has a circuit breaker (ai.llm.health), so a dead box is skipped
+  until its cooldown passes
+- Workers receive candidate audio and return grades, so the protocol is off until
+  WORKER_TOKEN (shared secret) is set on both ends
+"""
+
+import hmac
+import os
+import threading
+import time
+
+import requests
+
+from ai.llm import metrics
+from ai.llm.health import CircuitBreaker
+
+WORKER_TTL = float(os.environ.get('WORKER_TTL', 30))
+WORKER_MAX_ATTEMPTS = int(os.environ.get('WORKER_MAX_ATTEMPTS', 3))
+WORKER_TOKEN = os.environ.get('WORKER_TOKEN', '')
+WORKER_STT_TIMEOUT = float(os.environ.get('WORKER_STT_TIMEOUT', 120))
+WORKER_GRADE_TIMEOUT = float(os.environ.get('WORKER_GRADE_TIMEOUT', 90))
+
+ROLES = ('stt', 'grade')
+LOCAL_NODE = 'local'
+
+
+def _parse_capacity(value: str) -> dict:
+    """'stt=1,grade=4' -> {'stt': 1, 'grade': 4}"""
+    capacity = {}
+    for part in (value or '').split(','):
+        role, _, count = part.partition('=')
+        if role.strip() in ROLES and count.strip().isdigit():
+            capacity[role.strip()] = int(count)
+    return capacity
+
+
+LOCAL_CAPACITY = {'stt': 1, 'grade': 4, **_parse_capacity(os.environ.get('WORKER_LOCAL_CAPACITY', ''))}
+
+
+class WorkerBusy(Exception):
+    """The worker is at capacity (HTTP 503): try another node, not a health failure."""
+
+
+class WorkerRejected(Exception):
+    """The worker refused the job itself (HTTP 4xx): retrying elsewhere would not help."""
+
+
+class WorkerNode:
+    def __init__(self, worker_id: str, url: str = None, roles=(), capacity: dict = None):
+        self.id = worker_id
+        self.url = (url or '').rstrip('/')
+        self.roles = set(roles)
+        self.capacity = dict(capacity or {})
+        self.reported_load = {}
+        self.in_flight = {role: 0 for role in ROLES}
+        self.info = {}
+        self.registered_at = time.time()
+        self.last_seen = time.time()
+        self.completed = 0
+        self.failed = 0
+        self.breaker = CircuitBreaker(f"worker:{worker_id}")
+
+    @property
+    def is_local(self) -> bool:
+        return self.id == LOCAL_NODE
+
+    def alive(self) -> bool:
+        return self.is_local or time.time() - self.last_seen < WORKER_TTL
+
+    def load(self, role: str) -> float:
+        """Busy share of the role's capacity; our own in-flight jobs are in the reported load once it catches up."""
+        busy = max(self.in_flight.get(role, 0), self.reported_load.get(role, 0))
+        return busy / max(1, self.capacity.get(role, 1))
+
+    def status(self) -> dict:
+        return {
+            "id": self.id,
+            "url": self.url or None,
+            "roles": sorted(self.roles),
+            "capacity": self.capacity,
+            "in_flight": {r: n for r, n in self.in_flight.items() if r in self.roles},
+            "reported_load": self.reported_load,
+            "alive": self.alive(),
+            "seconds_since_heartbeat": None if self.is_local else round(time.time() - self.last_seen, 1),
+            "completed": self.completed,
+            "failed": self.failed,
+            "circuit": self.breaker.state,
+            "info": self.info,
+        }
+
+
+class WorkerRegistry:
+    def __init__(self, local_capacity: dict = None):
+        local_capacity = LOCAL_CAPACITY if local_capacity is None else local_capacity
+        self._local = WorkerNode(LOCAL_NODE, roles=[r for r, n in local_capacity.items() if n > 0],
+                                 capacity=local_capacity)
+        self._workers = {}
+        self._lock = threading.Lock()
+
+    # ---- Protocol: register / heartbeat / leave ----
+
+    def register(self, worker_id: str, url: str, roles: list, capacity: dict, info: dict = None) -> WorkerNode:
+        roles = [r for r in roles if r in ROLES]
+        if not worker_id or worker_id == LOCAL_NODE or not url or not roles:
+            raise ValueError("worker_id, url and at least one of roles " + "/".join(ROLES) + " are required")
+        with self._lock:
+            node = self._workers.get(worker_id)
+            if node is None or node.url != url.rstrip('/'):
+                node = WorkerNode(worker_id, url, roles, capacity)
+                self._workers[worker_id] = node
+                print(f"[WORKERS] Registered {worker_id} at {node.url}: {capacity}")
+            else:
+                node.roles, node.capacity = set(roles), dict(capacity)
+            node.info = info or {}
+            node.last_seen = time.time()
+        return node
+
+    def heartbeat(self, worker_id: str, load: dict = None) -> bool:
+        """False if the worker is unknown (expired, or this process restarted): it must register again."""
+        with self._lock:
+            node = self._workers.get(worker_id)
+            if node is None or not node.alive():
+                self._workers.pop(worker_id, None)
+                return False
+            node.reported_load = {r: int(n) for r, n in (load or {}).items() if r in ROLES}
+            node.last_seen = time.time()
+        return True
+
+    def unregister(self, worker_id: str) -> bool:
+        with self._lock:
+            removed = self._workers.pop(worker_id, None) is not None
+        if removed:
+            print(f"[WORKERS] {worker_id} left")
+        return removed
+
+    # ---- Dispatch ----
+
+    def _candidates(self, role: str, with_local: bool) -> list:
+        """Nodes that can take a job for the role, least loaded first (this process wins ties)."""
+        with self._lock:
+            expired = [w for w, node in self._workers.items() if not node.alive()]
+            for worker_id in expired:
+                print(f"[WORKERS] {worker_id} missed heartbeats, dropped")
+                del self._workers[worker_id]
+            nodes = [n for n in self._workers.values() if role in n.roles and n.breaker.available()]
+        if with_local and role in self._local.roles:
+            nodes.append(self._local)
+        return sorted(nodes, key=lambda n: (n.load(role), not n.is_local))
+
+    def has_workers(self, role: str) -> bool:
+        with self._lock:
+            return any(role in n.roles and n.alive() for n in self._workers.values())
+
+    def dispatch(self, role: str, remote, local=None):
+        """
+        Run one job on the best node.
+        remote(node) sends it to a worker node; local() runs it in this process.
+        Failed workers are retried on the next node, this process is the last resort.
+        """
+        if local is not None and not self.has_workers(role):
+            return local()  # Single box: no bookkeeping
+
+        last_error = None
+        attempts = 0
+        for node in self._candidates(role, local is not None):
+            if attempts >= WORKER_MAX_ATTEMPTS:
+                break
+            if node.is_local:
+                return self._run_local(role, local)
+            if not node.breaker.allow():
+                continue
+            attempts += 1
+            self._track(node, role, 1)
+            started = time.time()
+            try:
+                result = remote(node)
+            except WorkerRejected:
+                node.breaker.abandon()
+                raise
+            except WorkerBusy as e:
+                node.breaker.abandon()
+                last_error = e
+                metrics.increment('worker_jobs_total', role=role, outcome='busy')
+                continue
+            except Exception as e:
+                node.breaker.record_failure(e)
+                node.failed += 1
+                last_error = e
+                metrics.increment('worker_jobs_total', role=role, outcome='failed')
+                print(f"[WORKERS] {role} job failed on {node.id}, retrying elsewhere: {e}")
+                continue
+            finally:
+                self._track(node, role, -1)
+            node.breaker.record_success()
+            node.completed += 1
+            metrics.increment('worker_jobs_total', role=role, outcome='remote')
+            metrics.observe('worker_job_seconds', time.time() - started, role=role)
+            return result
+
+        if local is not None:
+            return self._run_local(role, local)
+        raise last_error or RuntimeError(f"No {role} worker available")
+
+    def _track(self, node: WorkerNode, role: str, delta: int):
+        with self._lock:
+            node.in_flight[role] += delta
+
+    def _run_local(self, role: str, local):
+        self._track(self._local, role, 1)
+        try:
+            result = local()
+        finally:
+            self._track(self._local, role, -1)
+        self._local.completed += 1
+        metrics.increment('worker_jobs_total', role=role, outcome='local')
+        return result
+
+    # ---- Jobs ----
+
+    def transcribe(self, audio_path: str, language: str, local=None) -> str:
+        """Speech-to-text on the least-loaded STT node."""
+        def remote(node):
+            with open(audio_path, 'rb') as f:
+                response = requests.post(
+                    f"{node.url}/work/stt",
+                    files={'audio': (os.path.basename(audio_path), f)},
+                    data={'language': language},
+                    headers=_auth_headers(),
+                    timeout=(3, WORKER_STT_TIMEOUT)
+                )
+            return _json_or_raise(response)['text']
+
+        return self.dispatch('stt', remote, local)
+
+    def grader(self, grade_fn):
+        """Wrap an evaluate_with_correct_answer()-style function so grades run on grading nodes too."""
+        def remote_grade(topic, question, user_answer, expected_answer, language="Hindi"):
+            payload = {'topic': topic, 'question': question, 'user_answer': user_answer,
+                       'expected_answer': expected_answer, 'language': language}
+
+            def remote(node):
+                response = requests.post(f"{node.url}/work/grade", json=payload, headers=_auth_headers(),
+                                         timeout=(3, WORKER_GRADE_TIMEOUT))
+                result = _json_or_raise(response)
+                result['worker'] = node.id
+                return result
+
+            return self.dispatch('grade', remote,
+                                 lambda: grade_fn(topic, question, user_answer, expected_answer, language))
+
+        return remote_grade
+
+    def status(self) -> dict:
+        with self._lock:
+            nodes = [self._local] + list(self._workers.values())
+        return {
+            "workers": [n.status() for n in nodes],
+            "ttl_seconds": WORKER_TTL,
+            "max_attempts": WORKER_MAX_ATTEMPTS,
+        }
+
+
+def _auth_headers() -> dict:
+    return {'X-Worker-Token': WORKER_TOKEN} if WORKER_TOKEN else {}
+
+
+def workers_enabled() -> bool:
+    """Worker nodes may only register once a shared secret is configured."""
+    return bool(WORKER_TOKEN)
+
+
+def check_token(token: str) -> bool:
+    """Shared-secret check for both ends of the protocol (always refused when WORKER_TOKEN is unset)."""
+    return workers_enabled() and hmac.compare_digest((token or '').encode(), WORKER_TOKEN.encode())
+
+
+def _json_or_raise(response) -> dict:
+    if response.status_code == 503:
+        raise WorkerBusy(response.text[:200])
+    if 400 <= response.status_code < 500 and response.status_code not in (401, 403):
+        raise WorkerRejected(f"HTTP {response.status_code}: {response.text[:200]}")
+    response.raise_for_status()
+    return response.json()
+
+
+# Singleton instance
+_registry_instance = None
+
+
+def get_worker_registry():
+    global _registry_instance
+    if _registry_instance is None:
+        _registry_instance = WorkerRegistry()
+    return _registry_instance
@@ -15,16 +15,22 @@ import os
 from app.routes.main import main_bp
 from app.routes.stt import stt_bp
 from app.routes.eval import eval_bp
-from app.routes.llm import llm_bp
+from app.routes.llm import llm_bp, init_llm_tracing
 from app.routes.training import training_bp
 from app.routes.qa_bank_new import qa_bank_new_bp
 from app.routes.viva_session import viva_session_bp
 from app.routes.chat_viva import chat_viva_bp
 from app.routes.viva_records import viva_records_bp
+from app.routes.jobs import jobs_bp
+from app.routes.workers import workers_bp
+from app.routes.viva_turn import viva_turn_bp
+from app.routes.viva_socket import init_viva_socket
+from app.services.job_queue import init_job_queue
+from app.services.provisional_grading import preload_fast_grader
 
 # Create Flask app
 app = Flask(__name__, static_folder='../frontend/build', static_url_path='')
-CORS(app)
+CORS(app, expose_headers=["Server-Timing"])
 
 # Register all API blueprints - NO PREFIX (routes already have their paths)
 app.register_blueprint(main_bp, url_prefix='/api')  # main_bp has "/" route
@@ -36,6 +42,21 @@ app.register_blueprint(qa_bank_new_bp)  # routes: /qa/*
 app.register_blueprint(viva_session_bp) # routes: /viva/*
 app.register_blueprint(chat_viva_bp)    # routes: /chat-viva/*
 app.register_blueprint(viva_records_bp) # routes: /viva-records/*
+app.register_blueprint(jobs_bp)         # routes: /jobs/*
+app.register_blueprint(workers_bp)      # routes: /workers/*
+app.register_blueprint(viva_turn_bp)    # routes: /viva/turn
+
+# Per-request LLM breakdown: Server-Timing header + GET /llm/traces
+init_llm_tracing(app)
+
+# Load the provisional grader's cross-encoder now rather than in a candidate's request
+preload_fast_grader()
+
+# Background job workers (question-bank generation); resumes unfinished jobs
+init_job_queue(app)
+
+# Viva WebSocket channel (/viva/ws) when flask-sock is installed
+init_viva_socket(app)
 
 # Serve React App - this MUST come after blueprint registration
 @app.route('/')
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark generation profiles (ai/llm/profiles.py) against the old fixed budgets
+- Runs each text profile twice: legacy options (num_predict 100 / 150, no stop,
+  whole response read) and the profile (stop sequences, derived num_predict,
+  streamed with client-side cutoff)
+- Reports latency p50 / p90, output tokens generated, and how often the profile's
+  reply is a prefix of the legacy reply (nothing lost except the tail we threw away)
+- Uses an in-process fake_llm_server.py unless --ollama-host points at a real server
+
+Examples:
+    python benchmark_profiles.py
+    python benchmark_profiles.py --runs 20 --tokens-per-sec 25 --language Hindi
+    python benchmark_profiles.py --ollama-host http://localhost:11434 --runs 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# Budgets used before generation profiles existed
+LEGACY_OPTIONS = {
+    'followup': {"temperature": 0.7, "top_p": 0.9, "num_predict": 100},
+    'opening': {"temperature": 0.7, "num_predict": 150},
+}
+
+PROMPTS = {
+    'followup': [
+        "Topic: Lamination\nPrevious Question: What is the lamination temperature?\nCandidate's Answer: Around 145 degrees.\n"
+        "Generate ONE relevant follow-up question in {language}. Only output the question, nothing else.",
+        "Topic: Stringer\nPrevious Question: How do you check ribbon alignment?\nCandidate's Answer: Visually and with a gauge.\n"
+        "Generate ONE relevant follow-up question in {language}. Only output the question, nothing else.",
+        "Topic: EL Testing\nPrevious Question: What defects does EL show?\nCandidate's Answer: Cracks and dark cells.\n"
+        "Generate ONE relevant follow-up question in {language}. Only output the question, nothing else.",
+    ],
+    'opening': [
+        "Candidate name: Ravi. Start with a warm greeting and ask an open-ended question about their work in {language} (2-3 sentences max).",
+        "Candidate name: Priya. Start with a warm greeting and ask an open-ended question about their work in {language} (2-3 sentences max).",
+    ],
+}
+
+
+def _percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare generation profiles with the old fixed budgets")
+    parser.add_argument("--runs", type=int, default=10, help="Calls per profile and variant")
+    parser.add_argument("--language", default="English")
+    parser.add_argument("--ollama-host", help="Real Ollama server (default: in-process fake server)")
+    parser.add_argument("--model", help="Model name (default: OLLAMA_MODEL)")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Fake server: time to first token")
+    parser.add_argument("--tokens-per-sec", type=float, default=40, help="Fake server: generation speed")
+    args = parser.parse_args()
+
+    server = None
+    if args.ollama_host:
+        os.environ['OLLAMA_HOST'] = args.ollama_host
+    else:
+        from fake_llm_server import start_in_thread
+        server = start_in_thread(ttft=args.ttft, tokens_per_sec=args.tokens_per_sec, load_seconds=0)
+        os.environ['OLLAMA_HOST'] = server.url
+    os.environ['LLM_RECORD_MODE'] = 'off'
+
+    # Imported after OLLAMA_HOST is set: the client reads it at import time
+    from ai.llm import ollama_client
+    from ai.llm.profiles import get_profile
+
+    print(f"Benchmarking against {os.environ['OLLAMA_HOST']} ({args.runs} runs per variant, {args.language})")
+    print("=" * 80)
+    print(f"{'profile':<11}{'variant':<9}{'num_predict':>12}{'p50':>9}{'p90':>9}{'out tokens':>12}{'prefix':>9}")
+    print("=" * 80)
+
+    for name, prompts in PROMPTS.items():
+        profile = get_profile(name)
+        variants = {
+            'legacy': (LEGACY_OPTIONS[name], None),
+            'profile': (profile.options(args.language), profile.cutoff()),
+        }
+        kept = {}
+        for variant, (options, cutoff) in variants.items():
+            latencies, tokens, texts = [], [], []
+            for i in range(args.runs):
+                prompt = prompts[i % len(prompts)].format(language=args.language)
+                start = time.time()
+                result = ollama_client.generate(prompt, options=dict(options), model=args.model, timeout=120,
+                                                cutoff=cutoff)
+                latencies.append(time.time() - start)
+                tokens.append(result.get("eval_count") or 0)
+                text = result.get("response", "")
+                texts.append(text.strip())
+            kept[variant] = texts
+            same = "-"
+            if variant == 'profile':
+                matches = sum(bool(b) and a.startswith(b) for a, b in zip(kept['legacy'], texts))
+                same = f"{100 * matches / len(texts):.0f}%"
+            print(f"{name:<11}{variant:<9}{options['num_predict']:>12}"
+                  f"{_percentile(latencies, 0.5):>8.2f}s{_percentile(latencies, 0.9):>8.2f}s"
+                  f"{statistics.mean(tokens):>12.1f}{same:>9}")
+
+    if server is not None:
+        print(f"\nFake server generated {server.stats()['counts'].get('output_tokens', 0)} output tokens in total")
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
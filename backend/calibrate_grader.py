@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Calibrate the cross-encoder grader on graded viva history
+- Reads every LLM-graded answer from viva_records.answers_json
+  ({question, user_answer, expected_answer, score, grader, graded, ...} items).
+  Fallback scores (graded: false), cross-encoder / rule grades and provisional
+  grades are skipped, so the calibration never learns from its own output
+- Scores (expected, user) pairs with the cross-encoder and fits the raw -> 0-100
+  isotonic mapping and per-bin decision agreement (ai/nlp/cross_encoder_grader.py)
+- Reports agreement with the historical grades on a held-out split, and how many
+  answers hybrid mode would grade without the LLM at GRADER_MIN_CONFIDENCE
+- Writes GRADER_CALIBRATION_PATH (picked up by the running server on next grade)
+
+Examples:
+    python calibrate_grader.py
+    python calibrate_grader.py --holdout 0.3 --min-confidence 0.85 --dry-run
+    python calibrate_grader.py --include-unlabelled   # Also records saved before grader / graded were stored
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ai.nlp.cross_encoder_grader import (
+    Calibration, CrossEncoderGrader, CALIBRATION_PATH, MIN_CONFIDENCE, decision
+)
+
+
+def is_llm_grade(item: dict, include_unlabelled: bool = False) -> bool:
+    """A real LLM grade: not a fallback score, not the cross-encoder's (or a rule's) own grade."""
+    if item.get('provisional'):
+        return False  # Final grade not written back yet
+    if 'grader' not in item and 'graded' not in item:
+        return include_unlabelled
+    return item.get('grader') == 'llm' and item.get('graded') is True
+
+
+def load_history(limit: int = None, include_unlabelled: bool = False) -> list:
+    """(expected_answer, user_answer, score) for every LLM-graded, non-empty answer."""
+    from app.db_config import get_db
+    conn = get_db()
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT answers_json FROM viva_records WHERE answers_json IS NOT NULL ORDER BY id DESC")
+        rows = cursor.fetchall()
+    finally:
+        conn.close()
+
+    history = []
+    for row in rows:
+        try:
+            answers = json.loads(row['answers_json'] or '[]')
+        except ValueError:
+            continue
+        for item in answers if isinstance(answers, list) else []:
+            user_answer = (item.get('user_answer') or '').strip()
+            expected = (item.get('expected_answer') or '').strip()
+            score = item.get('score')
+            # Empty answers are graded by rule, not by the model: nothing to learn from them
+            if len(user_answer) < 3 or not expected or not isinstance(score, (int, float)):
+                continue
+            if not is_llm_grade(item, include_unlabelled):
+                continue
+            history.append((expected, user_answer, max(0, min(100, score))))
+    return history[:limit] if limit else history
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit the cross-encoder grader calibration from viva history")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of answers kept out of the fit for the report")
+    parser.add_argument("--min-confidence", type=float, default=MIN_CONFIDENCE)
+    parser.add_argument("--limit", type=int, help="Use at most N answers (newest first)")
+    parser.add_argument("--out", default=CALIBRATION_PATH)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--dry-run", action="store_true", help="Report only, do not write the calibration")
+    parser.add_argument("--include-unlabelled", action="store_true",
+                        help="Also use answers without grader / graded fields (may include fallback scores)")
+    args = parser.parse_args()
+
+    history = load_history(args.limit, args.include_unlabelled)
+    if len(history) < 30:
+        print(f"❌ Only {len(history)} LLM-graded answers in viva_records; need at least 30 to calibrate")
+        return 1
+
+    grader = CrossEncoderGrader(calibration_path=args.out)
+    print(f"Scoring {len(history)} answers with {grader.model_name} ({grader.runtime})...")
+    raw = grader.raw_scores([h[0] for h in history], [h[1] for h in history])
+    scores = [h[2] for h in history]
+
+    indices = list(range(len(history)))
+    random.Random(args.seed).shuffle(indices)
+    cut = int(len(indices) * (1 - args.holdout)) if args.holdout > 0 else len(indices)
+    train, test = indices[:cut], indices[cut:] or indices
+
+    fitted = Calibration.fit([raw[i] for i in train], [scores[i] for i in train], grader.model_name)
+    agree = confident = confident_agree = 0
+    abs_error = 0
+    for i in test:
+        score = fitted.score(raw[i])
+        label = decision(score)
+        same = label == decision(scores[i])
+        agree += same
+        abs_error += abs(score - scores[i])
+        if fitted.confidence(raw[i], label) >= args.min_confidence:
+            confident += 1
+            confident_agree += same
+
+    n = len(test)
+    print("=" * 60)
+    print(f"Held-out answers:            {n}")
+    print(f"Mean |score error|:          {abs_error / n:.1f}")
+    print(f"Decision agreement:          {100 * agree / n:.1f}%")
+    print(f"Confident (>= {args.min_confidence:.2f}):         {100 * confident / n:.1f}% of answers skip the LLM")
+    if confident:
+        print(f"Agreement when confident:    {100 * confident_agree / confident:.1f}%")
+    print("=" * 60)
+
+    if args.dry_run:
+        return 0
+    # Final calibration uses every answer
+    Calibration.fit(raw, scores, grader.model_name).save(args.out)
+    print(f"✅ Calibration written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
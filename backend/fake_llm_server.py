@@ -0,0 +1,491 @@
+#!/usr/bin/env python3
+"""
+Fake LLM Server - stand-in for Ollama and Gemini in benchmarks and tests
+- Ollama: POST /api/generate, POST /api/chat (streaming NDJSON and non-streaming),
+  GET /api/tags, GET /api/ps
+- Gemini: POST /v1beta/models/<model>:generateContent
+- Structured output: when the request carries a JSON schema (Ollama "format",
+  Gemini responseSchema) the reply is deterministic JSON that matches it
+- Timing model: time to first token from a latency distribution + prompt tokens
+  at --prefill-tps, then output tokens at --tokens-per-sec; --parallel requests
+  run at once (like OLLAMA_NUM_PARALLEL), the rest queue
+- Stop sequences (options.stop / stopSequences) and num_predict are honoured;
+  streamed output stops when the client disconnects (early cutoff)
+- Error injection: HTTP 500, 429 (Retry-After), hung requests, dropped connections
+- Replay: --replay FILE (JSONL of {"request", "response"}) or the record store
+  directory written by LLM_RECORD_MODE=record (ai/llm/recorder.py) answers known
+  requests with the recorded response
+- Runtime control: GET /_fake/stats, POST /_fake/config {"error_rate": 0.1, ...}
+
+Usage:
+    python fake_llm_server.py --port 11500 --ttft 0.2 --tokens-per-sec 40
+    OLLAMA_HOST=http://localhost:11500 GEMINI_API_ENDPOINT=http://localhost:11500 python run.py
+
+In-process (benchmarks):
+    from fake_llm_server import start_in_thread
+    server = start_in_thread(port=0, ttft=0.05)   # server.url, server.stats(), server.shutdown()
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, asdict, fields
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Fields that do not change what the model would answer
+VOLATILE_FIELDS = {"stream", "keep_alive"}
+
+FOLLOWUP_QUESTIONS = [
+    "What safety checks do you do before starting the machine?",
+    "How do you know when the lamination temperature is wrong?",
+    "Which parameters do you record at the start of a shift?",
+    "What do you do if the EL test shows micro-cracks?",
+    "How often is this machine cleaned and calibrated?",
+    "What happens if the string alignment is off by a few millimetres?",
+]
+# Small models often keep talking after the question; fake_text() does the same
+RAMBLE = ("\n\nThis question checks whether the candidate understands the practical side of the process "
+          "and can explain the reasoning behind each step, not only recite the procedure.")
+
+
+@dataclass
+class FakeConfig:
+    ttft: float = 0.15             # Mean seconds before the first token (excluding prefill)
+    ttft_dist: str = 'lognormal'   # fixed | uniform | exponential | lognormal
+    ttft_spread: float = 0.5       # uniform: +/- fraction of the mean; lognormal: sigma
+    prefill_tps: float = 2000.0    # Prompt tokens evaluated per second
+    tokens_per_sec: float = 40.0   # Output tokens per second
+    load_seconds: float = 2.0      # First request for a model "loads" it
+    parallel: int = 2              # Requests processed at once; others wait
+    error_rate: float = 0.0        # HTTP 500
+    rate_limit_rate: float = 0.0   # HTTP 429 with Retry-After
+    hang_rate: float = 0.0         # Sleep hang_seconds before answering (client timeouts)
+    hang_seconds: float = 120.0
+    drop_rate: float = 0.0         # Close the connection without a response
+    retry_after: int = 5
+    max_output_tokens: int = 120   # When the request sets no limit
+    seed: int = 0                  # 0 = non-deterministic latency / errors
+
+    def update(self, values: dict):
+        names = {f.name: f.type for f in fields(self)}
+        for key, value in values.items():
+            if key in names:
+                setattr(self, key, type(getattr(self, key))(value))
+
+
+def request_key(body: dict) -> str:
+    """Content hash of a request body, ignoring fields that do not affect the answer."""
+    canonical = {k: v for k, v in body.items() if k not in VOLATILE_FIELDS}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _stable_int(text: str) -> int:
+    return int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+
+
+def _count_hint(prompt: str, default: int = 3) -> int:
+    """Array length the prompt asks for ("Create 5 ...", "all 4 answers")."""
+    match = re.search(r'(?:Create|all|EACH of the)\s+(\d+)', prompt)
+    return max(1, min(20, int(match.group(1)))) if match else default
+
+
+def fake_json(schema: dict, prompt: str, path: str = "") -> object:
+    """Deterministic value matching a JSON schema (also accepts Gemini upper-case types)."""
+    kind = str(schema.get("type", "string")).lower()
+    seed = _stable_int(prompt + path)
+    if "enum" in schema:
+        return schema["enum"][seed % len(schema["enum"])]
+    if kind == "object":
+        return {name: fake_json(prop, prompt, f"{path}.{name}") for name, prop in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        items = []
+        for i in range(_count_hint(prompt)):
+            item = fake_json(schema.get("items") or {}, prompt, f"{path}[{i}]")
+            if isinstance(item, dict) and "index" in item:
+                item["index"] = i + 1
+            items.append(item)
+        return items
+    if kind == "integer":
+        low, high = schema.get("minimum", 0), schema.get("maximum", 100)
+        return low + seed % (high - low + 1)
+    if kind == "number":
+        return round((seed % 1000) / 10, 1)
+    if kind == "boolean":
+        return seed % 2 == 0
+    label = path.rsplit('.', 1)[-1].split('[')[0] or "text"
+    return f"{label} {seed % 1000}"
+
+
+def fake_text(prompt: str) -> str:
+    return FOLLOWUP_QUESTIONS[_stable_int(prompt) % len(FOLLOWUP_QUESTIONS)] + RAMBLE
+
+
+def apply_stop(text: str, stop) -> tuple:
+    """Cut text at the first stop sequence like the real servers do; returns (text, stopped)."""
+    cuts = [text.find(s) for s in (stop or []) if s and s in text]
+    return (text[:min(cuts)], True) if cuts else (text, False)
+
+
+class FakeLLM:
+    def __init__(self, config: FakeConfig, replay: dict = None, replay_strict: bool = False):
+        self.config = config
+        self.replay = replay or {}
+        self.replay_strict = replay_strict
+        self.random = random.Random(config.seed or None)
+        self.loaded = {}  # model -> loaded_at
+        self.counts = {"requests": 0, "replayed": 0, "errors": 0, "rate_limited": 0, "hung": 0,
+                       "dropped": 0, "output_tokens": 0, "queued": 0}
+        self.in_flight = 0
+        self._slots = threading.BoundedSemaphore(max(1, config.parallel))
+        self._lock = threading.Lock()
+
+    def count(self, name: str, value: int = 1):
+        with self._lock:
+            self.counts[name] += value
+
+    def sample_ttft(self) -> float:
+        c = self.config
+        with self._lock:
+            if c.ttft_dist == 'fixed':
+                return c.ttft
+            if c.ttft_dist == 'uniform':
+                return max(0.0, self.random.uniform(c.ttft * (1 - c.ttft_spread), c.ttft * (1 + c.ttft_spread)))
+            if c.ttft_dist == 'exponential':
+                return self.random.expovariate(1 / c.ttft) if c.ttft > 0 else 0.0
+            # lognormal with the configured mean
+            sigma = c.ttft_spread
+            return self.random.lognormvariate(math.log(max(c.ttft, 1e-6)) - sigma * sigma / 2, sigma)
+
+    def roll(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self.random.random() < rate
+
+    def take_load_time(self, model: str) -> float:
+        with self._lock:
+            if model in self.loaded:
+                return 0.0
+            self.loaded[model] = time.time()
+            return self.config.load_seconds
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"counts": dict(self.counts), "in_flight": self.in_flight,
+                    "loaded_models": list(self.loaded), "replay_entries": len(self.replay),
+                    "config": asdict(self.config)}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "FakeLLM/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    @property
+    def fake(self) -> FakeLLM:
+        return self.server.fake
+
+    def _send_json(self, status: int, data: dict, headers: dict = None):
+        body = json.dumps(data, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, str(value))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b"{}"
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return {}
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            models = self.fake.stats()["loaded_models"] or ["gemma3:1b"]
+            self._send_json(200, {"models": [{"name": m, "model": m} for m in models]})
+        elif self.path == "/api/ps":
+            with self.fake._lock:
+                loaded = dict(self.fake.loaded)
+            self._send_json(200, {"models": [{"name": m, "model": m, "expires_at": None} for m in loaded]})
+        elif self.path == "/_fake/stats":
+            self._send_json(200, self.fake.stats())
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        body = self._read_json()
+        if self.path == "/_fake/config":
+            self.fake.config.update(body)
+            self._send_json(200, asdict(self.fake.config))
+            return
+        if self.path == "/_fake/reset":
+            with self.fake._lock:
+                self.fake.loaded.clear()
+                for key in self.fake.counts:
+                    self.fake.counts[key] = 0
+            self._send_json(200, {"reset": True})
+            return
+
+        gemini = re.match(r'^/v1beta/models/([^/:]+):generateContent', self.path)
+        if self.path not in ("/api/generate", "/api/chat") and not gemini:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+
+        self.fake.count("requests")
+        if self._inject_fault(gemini is not None):
+            return
+
+        with self.fake._lock:
+            self.fake.counts["queued"] += 1
+        with self.fake._slots:
+            with self.fake._lock:
+                self.fake.counts["queued"] -= 1
+                self.fake.in_flight += 1
+            try:
+                if gemini:
+                    self._gemini(body, gemini.group(1))
+                else:
+                    self._ollama(body, chat=self.path == "/api/chat")
+            finally:
+                with self.fake._lock:
+                    self.fake.in_flight -= 1
+
+    def _inject_fault(self, gemini: bool) -> bool:
+        config = self.fake.config
+        if self.fake.roll(config.drop_rate):
+            self.fake.count("dropped")
+            self.close_connection = True
+            self.connection.close()
+            return True
+        if self.fake.roll(config.hang_rate):
+            self.fake.count("hung")
+            time.sleep(config.hang_seconds)
+        if self.fake.roll(config.rate_limit_rate):
+            self.fake.count("rate_limited")
+            self._send_json(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}},
+                            headers={"Retry-After": config.retry_after})
+            return True
+        if self.fake.roll(config.error_rate):
+            self.fake.count("errors")
+            self._send_json(500, {"error": "injected failure"})
+            return True
+        return False
+
+    def _replayed(self, body: dict):
+        recorded = self.fake.replay.get(request_key(body))
+        if recorded is not None:
+            self.fake.count("replayed")
+        return recorded
+
+    # --- Ollama ---
+
+    def _ollama(self, body: dict, chat: bool):
+        model = body.get("model", "gemma3:1b")
+        if chat:
+            prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages") or [])
+        else:
+            prompt = body.get("prompt", "")
+        load = self.fake.take_load_time(model)
+
+        if not chat and not prompt and not body.get("messages"):
+            # Load-only request (residency warm-up)
+            time.sleep(load)
+            self._send_json(200, {"model": model, "response": "", "done": True, "done_reason": "load",
+                                  "load_duration": int(load * 1e9)})
+            return
+
+        recorded = self._replayed(body)
+        if recorded is None and self.fake.replay_strict:
+            self._send_json(404, {"error": "no recorded response for this request"})
+            return
+        if recorded is not None:
+            text = (recorded.get("message") or {}).get("content") if chat else recorded.get("response")
+        elif isinstance(body.get("format"), dict):
+            text = json.dumps(fake_json(body["format"], prompt), ensure_ascii=False)
+        elif body.get("format") == "json":
+            text = json.dumps({"response": fake_text(prompt)})
+        else:
+            text = fake_text(prompt)
+
+        options = body.get("options") or {}
+        text, _ = apply_stop(text or "", options.get("stop"))
+        limit = options.get("num_predict") or self.fake.config.max_output_tokens
+        pieces = re.findall(r'\S+\s*', text or "") or [""]
+        pieces = pieces[:max(1, limit)] if limit > 0 else pieces
+        prompt_tokens = _tokens(prompt)
+        prefill = self.fake.sample_ttft() + prompt_tokens / self.fake.config.prefill_tps
+        per_token = 1 / max(self.fake.config.tokens_per_sec, 0.001)
+
+        counters = {
+            "total_duration": 0,
+            "load_duration": int(load * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(prefill * 1e9),
+            "eval_count": len(pieces),
+            "eval_duration": int(len(pieces) * per_token * 1e9)
+        }
+        counters["total_duration"] = counters["load_duration"] + counters["prompt_eval_duration"] + counters["eval_duration"]
+
+        def chunk(piece: str, done: bool) -> dict:
+            data = {"model": model, "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()), "done": done}
+            if chat:
+                data["message"] = {"role": "assistant", "content": piece}
+            else:
+                data["response"] = piece
+            return data
+
+        time.sleep(load + prefill)
+        if body.get("stream", True):
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            try:
+                for piece in pieces:
+                    self._write_chunk(json.dumps(chunk(piece, False), ensure_ascii=False) + "\n")
+                    self.fake.count("output_tokens")  # Only what was generated before the client hung up
+                    time.sleep(per_token)
+                final = chunk("", True)
+                final.update(counters, done_reason="stop" if len(pieces) < limit else "length")
+                self._write_chunk(json.dumps(final) + "\n")
+                self._write_chunk("")
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True  # Client stopped reading (e.g. early cutoff)
+            return
+
+        time.sleep(len(pieces) * per_token)
+        self.fake.count("output_tokens", len(pieces))
+        data = chunk("".join(pieces), True)
+        data.update(counters, done_reason="stop")
+        self._send_json(200, data)
+
+    def _write_chunk(self, text: str):
+        data = text.encode()
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    # --- Gemini ---
+
+    def _gemini(self, body: dict, model: str):
+        parts = [p.get("text", "") for c in body.get("contents") or [] for p in c.get("parts") or []]
+        prompt = "\n".join(parts)
+        config = body.get("generationConfig") or {}
+
+        recorded = self._replayed(dict(body, model=model))  # The recorder keys Gemini requests with the model
+        if recorded is None and self.fake.replay_strict:
+            self._send_json(404, {"error": {"code": 404, "message": "no recorded response for this request"}})
+            return
+        if recorded is not None:
+            time.sleep(self.fake.sample_ttft())
+            self._send_json(200, recorded)
+            return
+
+        if config.get("responseSchema"):
+            text = json.dumps(fake_json(config["responseSchema"], prompt), ensure_ascii=False)
+        else:
+            text = fake_text(prompt)
+        text, _ = apply_stop(text, config.get("stopSequences"))
+        output_tokens = _tokens(text)
+        prompt_tokens = _tokens(prompt)
+        time.sleep(self.fake.sample_ttft() + prompt_tokens / self.fake.config.prefill_tps
+                   + output_tokens / max(self.fake.config.tokens_per_sec, 0.001))
+        self.fake.count("output_tokens", output_tokens)
+        self._send_json(200, {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens,
+                              "totalTokenCount": prompt_tokens + output_tokens},
+            "modelVersion": model
+        })
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, fake: FakeLLM, verbose: bool = False):
+        super().__init__(address, Handler)
+        self.fake = fake
+        self.verbose = verbose
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def stats(self) -> dict:
+        return self.fake.stats()
+
+
+def load_replay(path: str) -> dict:
+    """
+    {request_key: response} from a JSONL file of {"request": <body>, "response": <body>}
+    lines, or from a record store directory (objects/*/<key>.json).
+    """
+    entries = {}
+    if os.path.isdir(path):
+        for root, _, names in os.walk(os.path.join(path, "objects")):
+            for name in names:
+                if name.endswith(".json"):
+                    with open(os.path.join(root, name), encoding="utf-8") as f:
+                        record = json.load(f)
+                    entries[request_key(record["request"])] = record["response"]
+        return entries
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            entries[request_key(record["request"])] = record["response"]
+    return entries
+
+
+def start_in_thread(host: str = "127.0.0.1", port: int = 0, replay: str = None, replay_strict: bool = False,
+                    verbose: bool = False, **config) -> FakeLLMServer:
+    """Start a fake server on a background thread (port 0 = any free port)."""
+    fake = FakeLLM(FakeConfig(**config), load_replay(replay) if replay else None, replay_strict)
+    server = FakeLLMServer((host, port), fake, verbose)
+    threading.Thread(target=server.serve_forever, name="fake-llm-server", daemon=True).start()
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Ollama / Gemini server for benchmarks and tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11500)
+    parser.add_argument("--replay", help="JSONL of recorded {request, response} pairs, or a record store directory")
+    parser.add_argument("--replay-strict", action="store_true", help="404 for requests not in the replay file")
+    parser.add_argument("--verbose", action="store_true")
+    for f in fields(FakeConfig):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=type(f.default), default=f.default)
+    args = vars(parser.parse_args())
+
+    host, port = args.pop("host"), args.pop("port")
+    replay, replay_strict, verbose = args.pop("replay"), args.pop("replay_strict"), args.pop("verbose")
+    fake = FakeLLM(FakeConfig(**args), load_replay(replay) if replay else None, replay_strict)
+    server = FakeLLMServer((host, port), fake, verbose)
+    print(f"Fake LLM server on {server.url} (ttft {fake.config.ttft}s {fake.config.ttft_dist}, "
+          f"{fake.config.tokens_per_sec} tok/s, parallel {fake.config.parallel}, "
+          f"{len(fake.replay)} replay entries)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
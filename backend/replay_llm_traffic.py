@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Replay recorded LLM traffic offline
+- Reads a day's traffic log from the record store (LLM_RECORD_MODE=record)
+- Re-sends each recorded request to an Ollama / Gemini endpoint (real or
+  fake_llm_server.py), optionally with changed parameters
+- Reports latency (recorded vs now) and how much the outputs changed, per call type
+
+Examples:
+    python replay_llm_traffic.py --date 2026-10-18
+    python replay_llm_traffic.py --date 2026-10-18 --set options.num_predict=60 --set model=gemma3:4b
+    python replay_llm_traffic.py --call-type grade --concurrency 2 --out replay_results.jsonl
+"""
+
+import argparse
+import copy
+import json
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ai.llm.recorder import LLMRecorder, RECORD_DIR
+
+
+def _set_path(request: dict, path: str, raw_value: str):
+    """--set options.num_predict=60 (values parsed as JSON when possible)."""
+    try:
+        value = json.loads(raw_value)
+    except ValueError:
+        value = raw_value
+    target = request
+    keys = path.split('.')
+    for key in keys[:-1]:
+        target = target.setdefault(key, {})
+    target[keys[-1]] = value
+
+
+def _send(record: dict, request: dict, ollama_host: str, gemini_endpoint: str, api_key: str, timeout: float) -> tuple:
+    """POST one request; returns (latency, response JSON)."""
+    start = time.time()
+    if record["backend"] == 'gemini':
+        request = dict(request)
+        model = request.pop("model")
+        response = requests.post(f"{gemini_endpoint}/v1beta/models/{model}:generateContent", json=request,
+                                 headers={"x-goog-api-key": api_key}, timeout=timeout)
+    else:
+        path = "/api/chat" if "messages" in request else "/api/generate"
+        response = requests.post(f"{ollama_host}{path}", json=dict(request, stream=False), timeout=timeout)
+    response.raise_for_status()
+    return time.time() - start, response.json()
+
+
+def _text(backend: str, response: dict) -> str:
+    if backend == 'gemini':
+        try:
+            return "".join(p.get("text", "") for p in response["candidates"][0]["content"]["parts"])
+        except (KeyError, IndexError, TypeError):
+            return ""
+    return (response.get("message") or {}).get("content") or response.get("response") or ""
+
+
+def _score(text: str):
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return None
+    return data.get("score") if isinstance(data, dict) and isinstance(data.get("score"), (int, float)) else None
+
+
+def _percentile(values: list, p: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a day of recorded LLM traffic")
+    parser.add_argument("--dir", default=RECORD_DIR, help="Record store directory")
+    parser.add_argument("--date", default=time.strftime('%Y-%m-%d'), help="Traffic log date (YYYY-MM-DD)")
+    parser.add_argument("--set", action="append", default=[], metavar="PATH=VALUE",
+                        help="Override a request field, e.g. options.num_predict=60 or model=gemma3:4b")
+    parser.add_argument("--call-type", help="Only replay this call type")
+    parser.add_argument("--limit", type=int, help="Replay at most N calls")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=120)
+    parser.add_argument("--ollama-host", default=os.environ.get('OLLAMA_HOST', 'http://localhost:11434').rstrip('/'))
+    parser.add_argument("--gemini-endpoint", default=os.environ.get('GEMINI_API_ENDPOINT', 'https://generativelanguage.googleapis.com').rstrip('/'))
+    parser.add_argument("--out", help="Write per-call results as JSONL")
+    args = parser.parse_args()
+
+    api_key = os.environ.get('GEMINI_API_KEY', '')
+    store = LLMRecorder(mode='off', directory=args.dir)
+    log_path = os.path.join(args.dir, f"traffic-{args.date}.jsonl")
+    if not os.path.exists(log_path):
+        print(f"❌ No traffic log at {log_path}")
+        return 1
+
+    with open(log_path, encoding='utf-8') as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+    if args.call_type:
+        entries = [e for e in entries if e.get("call_type") == args.call_type]
+    if args.limit:
+        entries = entries[:args.limit]
+    print(f"Replaying {len(entries)} calls from {log_path} (concurrency {args.concurrency})")
+    if args.set:
+        print(f"Overrides: {', '.join(args.set)}")
+
+    def replay(entry):
+        record = store.load(entry["key"])
+        if record is None:
+            return {"key": entry["key"], "call_type": entry.get("call_type"), "error": "object missing"}
+        request = copy.deepcopy(record["request"])
+        for override in args.set:
+            path, _, value = override.partition('=')
+            _set_path(request, path, value)
+        result = {"key": entry["key"], "call_type": entry.get("call_type"), "backend": record["backend"],
+                  "recorded_latency": entry.get("latency", record.get("latency"))}
+        try:
+            latency, response = _send(record, request, args.ollama_host, args.gemini_endpoint, api_key, args.timeout)
+        except (requests.exceptions.RequestException, ValueError) as e:
+            result["error"] = str(e)[:200]
+            return result
+        old_text = _text(record["backend"], record["response"])
+        new_text = _text(record["backend"], response)
+        old_score, new_score = _score(old_text), _score(new_text)
+        result.update({
+            "latency": round(latency, 4),
+            "same_output": old_text.strip() == new_text.strip(),
+            "score_delta": new_score - old_score if old_score is not None and new_score is not None else None,
+            "output_tokens": response.get("eval_count") or (response.get("usageMetadata") or {}).get("candidatesTokenCount")
+        })
+        return result
+
+    with ThreadPoolExecutor(max_workers=max(1, args.concurrency)) as executor:
+        results = list(executor.map(replay, entries))
+
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            for r in results:
+                f.write(json.dumps(r) + "\n")
+
+    groups = {}
+    for r in results:
+        groups.setdefault(r.get("call_type") or "other", []).append(r)
+
+    print("=" * 78)
+    print(f"{'call type':<18}{'calls':>6}{'errors':>7}{'rec p50':>9}{'now p50':>9}{'rec p90':>9}{'now p90':>9}{'same':>7}{'|Δscore|':>9}")
+    print("=" * 78)
+    for call_type, items in sorted(groups.items()):
+        ok = [r for r in items if "error" not in r]
+        recorded = [r["recorded_latency"] for r in ok if r.get("recorded_latency") is not None]
+        now = [r["latency"] for r in ok]
+        deltas = [abs(r["score_delta"]) for r in ok if r["score_delta"] is not None]
+
+        def fmt(value):
+            return f"{value:.2f}s" if value is not None else "-"
+        same = f"{100 * sum(r['same_output'] for r in ok) / len(ok):.0f}%" if ok else "-"
+        print(f"{call_type:<18}{len(items):>6}{len(items) - len(ok):>7}"
+              f"{fmt(_percentile(recorded, 0.5)):>9}{fmt(_percentile(now, 0.5)):>9}"
+              f"{fmt(_percentile(recorded, 0.9)):>9}{fmt(_percentile(now, 0.9)):>9}"
+              f"{same:>7}{(f'{statistics.mean(deltas):.1f}' if deltas else '-'):>9}")
+    errors = [r for r in results if "error" in r]
+    if errors:
+        print(f"\n⚠️  {len(errors)} calls failed, e.g.: {errors[0]['error']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
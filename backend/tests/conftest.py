@@ -0,0 +1,44 @@
+"""
+Unit tests for the backend (pytest, run from backend/: python -m pytest tests)
+- No database, Ollama or Gemini needed: LLM calls go to fake_llm_server.py or to
+  plain functions passed in
+- Tests that import the Flask app need the full requirements (Whisper); they are
+  skipped without them
+- The test_*.py scripts next to run.py are live checks against a running server
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def flask_client():
+    """Test client of the full app (no database access until a route needs it)."""
+    pytest.importorskip('whisper')
+    from app import create_app
+    app = create_app()
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+@pytest.fixture
+def fake_llm():
+    """In-process fake Ollama / Gemini server answering at once; .url, .stats(), .fake.config."""
+    from fake_llm_server import start_in_thread
+    server = start_in_thread(port=0, ttft=0.0, ttft_dist='fixed', load_seconds=0.0, tokens_per_sec=5000.0,
+                             prefill_tps=1e6, seed=1)
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture
+def ollama_server(fake_llm, monkeypatch):
+    """Point ai.llm.ollama_client at the fake server."""
+    from ai.llm import ollama_client
+    monkeypatch.setattr(ollama_client, 'OLLAMA_API_URL', f"{fake_llm.url}/api/generate")
+    monkeypatch.setattr(ollama_client, 'OLLAMA_CHAT_URL', f"{fake_llm.url}/api/chat")
+    return fake_llm
@@ -0,0 +1,115 @@
+"""ai/llm/batch_eval.py: every answer graded, pending similarity grades, deadline, and /evaluate_batch input checks."""
+
+import threading
+
+import pytest
+
+from ai.llm import batch_eval
+
+
+def _item(user_answer, expected='Temperature 145 degree', question='EVA temperature?'):
+    return {'question': question, 'user_answer': user_answer, 'expected_answer': expected, 'topic': 'Laminator'}
+
+
+@pytest.fixture
+def similarities(monkeypatch):
+    """Similarity per user answer, set by the test."""
+    values = {}
+    monkeypatch.setattr('ai.nlp.embeddings.pairwise_similarity',
+                        lambda answers, expected: [values[a] for a in answers])
+    return values
+
+
+def _llm_grade(calls):
+    def grade(topic, question, user_answer, expected_answer, language):
+        calls.append(user_answer)
+        return {'is_correct': True, 'is_partial': False, 'score': 75, 'feedback': 'ok'}
+    return grade
+
+
+def test_every_answer_goes_to_grader(similarities):
+    similarities.update({'exactly right': 0.95, 'somewhat right': 0.5, 'unrelated': 0.05})
+    calls = []
+    items = [_item('exactly right'), _item('somewhat right'), _item('unrelated'), _item('')]
+
+    out = batch_eval.evaluate_batch(items, _llm_grade(calls), 'Hindi', timeout=5)
+
+    assert sorted(calls) == ['exactly right', 'somewhat right', 'unrelated']
+    assert [r['graded_by'] for r in out['results']] == ['llm', 'llm', 'llm', 'rule']
+    assert not any(r['pending'] for r in out['results'])
+    assert out['results'][3]['score'] == 0
+    assert out['llm_graded'] == 3 and not out['partial']
+
+
+def test_similarity_is_not_computed_when_everything_is_graded(monkeypatch):
+    def unused(*args):
+        raise AssertionError('embedded although every answer was graded')
+    monkeypatch.setattr('ai.nlp.embeddings.pairwise_similarity', unused)
+    out = batch_eval.evaluate_batch([_item('answer one')], _llm_grade([]), 'English', timeout=5)
+    assert out['results'][0]['score'] == 75
+
+
+def test_deadline_gives_pending_similarity_grade(similarities):
+    similarities.update({'slow one': 0.6})
+    release = threading.Event()
+
+    def slow_grade(*args):
+        release.wait(5)
+        return {'score': 90}
+
+    try:
+        out = batch_eval.evaluate_batch([_item('slow one')], slow_grade, 'English', timeout=0.2)
+    finally:
+        release.set()
+    result = out['results'][0]
+    assert out['partial'] and result['pending']
+    assert result['graded_by'] == 'embedding' and result['score'] == 60 and result['is_partial']
+    assert out['llm_graded'] == 0
+
+
+def test_llm_failure_falls_back_to_similarity(similarities):
+    similarities.update({'half right': 0.5})
+
+    def failing_grade(*args):
+        raise RuntimeError('ollama down')
+
+    out = batch_eval.evaluate_batch([_item('half right')], failing_grade, 'English', timeout=5)
+    assert out['results'][0]['pending'] and out['results'][0]['score'] == 50
+
+
+def test_grader_fallback_score_is_pending(similarities):
+    similarities.update({'bahut sahi jawab': 0.9})
+
+    def fallback_grade(*args):
+        return {'is_correct': False, 'is_partial': True, 'score': 50, 'feedback': 'x', 'graded': False}
+
+    out = batch_eval.evaluate_batch([_item('bahut sahi jawab')], fallback_grade, 'Hindi', timeout=5)
+    result = out['results'][0]
+    assert result['pending'] and result['graded_by'] == 'embedding' and result['score'] == 90
+    assert out['partial'] and out['llm_graded'] == 0
+
+
+def test_embedding_failure_leaves_ungraded_answers_at_zero(monkeypatch):
+    def broken(*args):
+        raise RuntimeError('no model')
+    monkeypatch.setattr('ai.nlp.embeddings.pairwise_similarity', broken)
+
+    def failing_grade(*args):
+        raise RuntimeError('ollama down')
+
+    out = batch_eval.evaluate_batch([_item('answer one')], failing_grade, 'English', timeout=5)
+    assert out['results'][0]['graded_by'] == 'none' and out['results'][0]['pending']
+    assert out['results'][0]['score'] == 0
+
+
+@pytest.mark.parametrize('body, message', [
+    ({'answers': ['x']}, 'answers[0] must be an object'),
+    ({'answers': [{'question': 'q'}]}, 'answers[0]: question and expected_answer are required'),
+    ({'answers': [_item('a')], 'timeout': '5'}, 'timeout must be a positive number of seconds'),
+    ({'answers': [_item('a')], 'timeout': -1}, 'timeout must be a positive number of seconds'),
+    ({'answers': []}, 'answers list is required'),
+])
+def test_evaluate_batch_rejects_bad_input(flask_client, body, message):
+    response = flask_client.post('/evaluate_batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json()['error'] == message
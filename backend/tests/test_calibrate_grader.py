@@ -0,0 +1,55 @@
+"""calibrate_grader.py: the calibration learns from real LLM grades only."""
+
+import json
+
+import pytest
+
+pytest.importorskip('whisper')  # load_history reads viva_records through app.db_config
+
+import calibrate_grader
+
+ANSWER = {'question': 'q', 'user_answer': 'EVA melts and bonds the glass', 'expected_answer': 'EVA bonds glass'}
+
+
+class FakeDB:
+    def __init__(self, answers):
+        self.rows = [{'answers_json': json.dumps(answers)}]
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql):
+        pass
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def answers(monkeypatch):
+    stored = [
+        dict(ANSWER, score=80, grader='llm', graded=True),
+        dict(ANSWER, score=30, grader='llm', graded=False),       # Fallback score
+        dict(ANSWER, score=70, grader='cross_encoder', graded=True),
+        dict(ANSWER, score=0, grader='rule', graded=True),
+        dict(ANSWER, score=55, grader='cross_encoder', graded=True, provisional=True),
+        dict(ANSWER, score=60),                                   # Saved before grader / graded were stored
+    ]
+    monkeypatch.setattr('app.db_config.get_db', lambda: FakeDB(stored))
+
+
+def test_only_graded_llm_answers_are_used(answers):
+    assert [score for _, _, score in calibrate_grader.load_history()] == [80]
+
+
+def test_unlabelled_answers_only_on_request(answers):
+    assert [score for _, _, score in calibrate_grader.load_history(include_unlabelled=True)] == [80, 60]
+
+
+def test_llm_grades_are_tagged(monkeypatch):
+    from ai.nlp import cross_encoder_grader
+    monkeypatch.setattr('ai.llm.router.routed', lambda call_type: lambda *args: {'score': 30, 'graded': False})
+    assert cross_encoder_grader.get_grader('llm')('t', 'q', 'a', 'e')['grader'] == 'llm'
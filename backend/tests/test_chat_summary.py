@@ -0,0 +1,72 @@
+"""app/services/chat_summary.py: the final evaluation sees every turn, also for a session rebuilt from history."""
+
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('whisper')  # Importing app.* builds the full app package
+
+from ai.llm.scheduler import INTERACTIVE
+from app.services import chat_summary
+from app.services.chat_sessions import ChatSessionStore
+
+HISTORY = [{'ai': f'Question {n}?', 'user': f'answer number {n}'} for n in range(1, 11)]
+
+
+def _rebuilt():
+    return ChatSessionStore().rebuild(1, 'Lamination', 'context', 'English', HISTORY)
+
+
+def test_final_transcript_folds_instead_of_dropping(monkeypatch):
+    calls = []
+
+    def summarize(prompt, schema, **kwargs):
+        calls.append(kwargs['priority'])
+        assert 'answer number 1' in prompt and 'answer number 7' in prompt
+        return SimpleNamespace(summary='Knew answers 1 to 7', coverage=[{'concept': 'EVA', 'note': 'good'}])
+
+    monkeypatch.setattr(chat_summary, 'ollama_structured', summarize)
+    transcript = chat_summary.final_transcript(_rebuilt())
+
+    assert calls == [INTERACTIVE]  # One fold, in the request path
+    assert 'Knew answers 1 to 7' in transcript and '- EVA: good' in transcript
+    assert all(f'answer number {n}' in transcript for n in (8, 9, 10))
+    assert 'omitted' not in transcript
+
+
+def test_final_transcript_extractive_fallback_keeps_early_answers(monkeypatch):
+    def down(*args, **kwargs):
+        raise ConnectionError('ollama down')
+
+    monkeypatch.setattr(chat_summary, 'ollama_structured', down)
+    transcript = chat_summary.final_transcript(_rebuilt())
+    assert all(f'answer number {n}' in transcript for n in range(1, 11))
+
+
+def test_short_conversation_is_not_folded(monkeypatch):
+    def unused(*args, **kwargs):
+        raise AssertionError('nothing to fold')
+
+    monkeypatch.setattr(chat_summary, 'ollama_structured', unused)
+    session = ChatSessionStore().rebuild(1, 'Lamination', 'context', 'English', HISTORY[:4])
+    assert 'answer number 1' in chat_summary.final_transcript(session)
+
+
+def test_evaluate_final_without_session_grades_whole_history(flask_client, monkeypatch):
+    from app.routes import chat_viva
+    prompts = []
+
+    def evaluate(prompt, schema, **kwargs):
+        prompts.append(prompt)
+        return SimpleNamespace(score=65, strong_areas='EVA', weak_areas='vacuum', summary='ok')
+
+    monkeypatch.setattr(chat_viva, 'get_topic_context', lambda topic_id: ('Lamination', 'context'))
+    monkeypatch.setattr(chat_summary, 'ollama_structured',
+                        lambda *args, **kwargs: SimpleNamespace(summary='Early answers were solid', coverage=[]))
+    monkeypatch.setattr(chat_viva, 'ollama_structured', evaluate)
+
+    response = flask_client.post('/chat-viva/evaluate-final', json={
+        'session_id': 'expired', 'topic_id': 1, 'history': HISTORY, 'language': 'English'})
+    assert response.status_code == 200
+    assert response.get_json()['evaluation']['score'] == 65
+    assert 'Early answers were solid' in prompts[0] and 'answer number 10' in prompts[0]
@@ -0,0 +1,59 @@
+"""ai/llm/gemini_client.py: missing API key, and 429 Retry-After handling."""
+
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from ai.llm import async_client, gemini_client
+from ai.llm.gemini_client import GeminiClient, RateLimiter, RateLimited, retry_after_seconds
+from ai.llm.health import BackendUnavailable
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, 60.0),
+    ('', 60.0),
+    ('17', 17.0),
+    ('2.5', 2.5),
+    ('-3', 0.0),
+    ('soon', 60.0),
+    ('Wed, 21 Oct 2015 07:28:00 GMT', 0.0),  # A date in the past: retry now
+])
+def test_retry_after_seconds(value, expected):
+    assert retry_after_seconds(value) == expected
+
+
+def test_retry_after_http_date_in_future():
+    assert 25 <= retry_after_seconds(formatdate(time.time() + 30, usegmt=True)) <= 30
+
+
+def test_unconfigured_client_is_unavailable(fake_llm):
+    client = GeminiClient(api_key='', endpoint=fake_llm.url, limiter=RateLimiter(rpm=10, tpm=10000))
+    assert not client.configured and client.status()['configured'] is False
+    with pytest.raises(BackendUnavailable):
+        client.generate('hello')
+    assert fake_llm.stats()['counts']['requests'] == 0
+
+
+def test_router_skips_gemini_without_key(monkeypatch):
+    from ai.llm.router import LLMRouter
+    monkeypatch.setenv('LLM_BACKENDS', 'ollama,gemini')
+    monkeypatch.setattr(gemini_client, '_client', GeminiClient(api_key=''))
+    assert LLMRouter().rank('grade') == ['ollama']
+
+
+def test_429_with_http_date_backs_off(monkeypatch):
+    limiter = RateLimiter(rpm=10, tpm=10000)
+    client = GeminiClient(api_key='test-key', endpoint='http://127.0.0.1:9', limiter=limiter)
+    response = requests.Response()
+    response.status_code = 429
+    response.headers['Retry-After'] = formatdate(time.time() + 30, usegmt=True)
+
+    async def quota_exhausted(*args, **kwargs):
+        raise requests.exceptions.HTTPError('429 Too Many Requests', response=response)
+
+    monkeypatch.setattr(async_client, 'post_json', quota_exhausted)
+    with pytest.raises(RateLimited):
+        client.generate('hello')
+    assert limiter.requests.wait_time(1) > 20  # Buckets drained for the Retry-After date
@@ -0,0 +1,78 @@
+"""ai/llm/health.py: circuit breaker transitions."""
+
+import threading
+
+import pytest
+
+from ai.llm.health import CircuitBreaker, BackendUnavailable, CLOSED, OPEN, HALF_OPEN
+
+
+def _open(breaker):
+    for _ in range(breaker.failure_threshold):
+        breaker.record_failure(RuntimeError('connection refused'))
+
+
+def test_opens_after_consecutive_failures_only():
+    breaker = CircuitBreaker('test', failure_threshold=3, cooldown=60)
+    breaker.record_failure(RuntimeError('x'))
+    breaker.record_failure(RuntimeError('x'))
+    breaker.record_success()  # Resets the streak
+    breaker.record_failure(RuntimeError('x'))
+    breaker.record_failure(RuntimeError('x'))
+    assert breaker.state == CLOSED and breaker.allow()
+    breaker.record_failure(RuntimeError('x'))
+    assert breaker.state == OPEN
+    assert not breaker.allow() and breaker.total_rejected == 1
+    with pytest.raises(BackendUnavailable):
+        breaker.check()
+
+
+def test_half_open_allows_exactly_one_trial(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('ai.llm.health.time.time', lambda: now[0])
+    breaker = CircuitBreaker('test', failure_threshold=1, cooldown=30)
+    _open(breaker)
+    now[0] += 29
+    assert not breaker.available() and not breaker.allow()
+    now[0] += 2
+    assert breaker.available()  # Peeking does not use the trial
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow() and not breaker.available()
+
+
+def test_failed_trial_reopens_and_successful_trial_closes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('ai.llm.health.time.time', lambda: now[0])
+    breaker = CircuitBreaker('test', failure_threshold=3, cooldown=30)
+    _open(breaker)
+    now[0] += 31
+    assert breaker.allow()
+    breaker.record_failure(RuntimeError('still down'))  # One failure is enough when half-open
+    assert breaker.state == OPEN and breaker.opened_at == now[0]
+    now[0] += 31
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.consecutive_failures == 0
+
+
+def test_abandoned_trial_frees_the_slot(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('ai.llm.health.time.time', lambda: now[0])
+    breaker = CircuitBreaker('test', failure_threshold=1, cooldown=30)
+    _open(breaker)
+    now[0] += 31
+    assert breaker.allow()
+    breaker.abandon()  # e.g. the worker was busy: no verdict on health
+    assert breaker.state == HALF_OPEN and breaker.allow()
+
+
+def test_probe_closes_circuit():
+    healthy = threading.Event()
+    breaker = CircuitBreaker('test', probe=healthy.is_set, failure_threshold=1, cooldown=0, probe_interval=0.01)
+    _open(breaker)
+    assert not breaker.allow()  # With a probe there is no half-open trial
+    healthy.set()
+    breaker._probe_thread.join(2)
+    assert breaker.state == CLOSED and breaker.allow()
+    assert breaker.status()['total_failures'] == 1
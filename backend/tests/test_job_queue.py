@@ -0,0 +1,179 @@
+"""app/services/job_queue.py: recovery of jobs left behind by an earlier process, the stale-job sweep, and job events."""
+
+import json
+import threading
+
+import pytest
+
+pytest.importorskip('whisper')  # Importing app.* builds the full app package
+
+from flask import Flask
+
+from app.services import job_queue
+
+
+class FakeJobTable:
+    """The llm_job statements job_queue issues, over a dict of rows (no MySQL)."""
+
+    def __init__(self, rows):
+        self.rows = {row['id']: dict({'params': '{}', 'stale': False, 'attempts': 1}, **row) for row in rows}
+        self.lock = threading.Lock()
+
+    def connect(self):
+        return FakeConnection(self)
+
+
+class FakeConnection:
+    def __init__(self, table):
+        self.table = table
+
+    def cursor(self):
+        return FakeCursor(self.table)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeCursor:
+    def __init__(self, table):
+        self.table = table
+        self.result = []
+        self.rowcount = 0
+
+    def execute(self, query, args=()):
+        query = ' '.join(query.split())
+        rows = self.table.rows
+        with self.table.lock:
+            if query.startswith("SELECT id, attempts FROM llm_job WHERE status = 'running'"):
+                if 'worker <> %s' in query:
+                    match = [r for r in rows.values() if r['status'] == 'running' and r.get('worker') != args[0]]
+                else:
+                    match = [r for r in rows.values() if r['status'] == 'running' and r['stale']]
+                self.result = [{'id': r['id'], 'attempts': r['attempts']} for r in match]
+            elif query.startswith("SELECT id, kind FROM llm_job WHERE status = 'queued'"):
+                self.result = [{'id': r['id'], 'kind': r['kind']} for r in rows.values() if r['status'] == 'queued']
+            elif query.startswith("SELECT * FROM llm_job WHERE id"):
+                self.result = [dict(rows[args[0]])]
+            elif query.startswith("UPDATE llm_job SET status = 'running'"):
+                row = rows[args[1]]
+                self.rowcount = int(row['status'] == 'queued')
+                if self.rowcount:
+                    row.update(status='running', worker=args[0], attempts=row['attempts'] + 1)
+            elif query.startswith("UPDATE llm_job SET status = 'queued' WHERE id"):
+                if rows[args[0]]['status'] == 'running':
+                    rows[args[0]]['status'] = 'queued'
+            elif query.startswith("UPDATE llm_job SET status = 'failed', error = 'Too many attempts'"):
+                if rows[args[0]]['status'] == 'running':
+                    rows[args[0]].update(status='failed', error='Too many attempts')
+            elif query.startswith("UPDATE llm_job SET"):  # update_job()
+                names = [part.split(' = ')[0] for part in query[len("UPDATE llm_job SET "):].split(' WHERE ')[0].split(', ')]
+                rows[args[-1]].update(zip(names, args[:-1]))
+            else:
+                raise AssertionError(f"Unexpected query: {query}")
+
+    def fetchall(self):
+        return self.result
+
+    def fetchone(self):
+        return self.result[0] if self.result else None
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    ran = []
+    done = threading.Event()
+
+    def handler(job_id, params):
+        ran.append(job_id)
+        done.set()
+        return {'total': 1}
+
+    monkeypatch.setitem(job_queue.JOB_HANDLERS, 'test_job', handler)
+    monkeypatch.setattr(job_queue, 'JOB_SINGLE_PROCESS', True)
+    q = job_queue.JobQueue(Flask('test'))
+    q.ran, q.done = ran, done
+
+    def use_table(rows):
+        table = FakeJobTable(rows)
+        monkeypatch.setattr(job_queue, 'get_db', table.connect)
+        return table
+
+    q.use_table = use_table
+    return q
+
+
+def _wait_idle(queue):
+    queue.executor.shutdown(wait=True)
+
+
+def test_startup_requeues_running_jobs_of_previous_process(queue):
+    table = queue.use_table([
+        {'id': 'fresh-running', 'kind': 'test_job', 'status': 'running', 'worker': 'host:111'},  # Updated seconds ago
+        {'id': 'queued', 'kind': 'test_job', 'status': 'queued'},
+        {'id': 'done', 'kind': 'test_job', 'status': 'completed', 'worker': 'host:111'},
+    ])
+    assert queue.recover(startup=True) == 2
+    _wait_idle(queue)
+    assert sorted(queue.ran) == ['fresh-running', 'queued']
+    assert table.rows['fresh-running']['status'] == 'completed'
+    assert table.rows['fresh-running']['worker'] == queue.worker_name
+    assert table.rows['done']['status'] == 'completed'
+
+
+def test_startup_fails_jobs_out_of_attempts(queue):
+    table = queue.use_table([
+        {'id': 'crashy', 'kind': 'test_job', 'status': 'running', 'worker': 'host:111',
+         'attempts': job_queue.JOB_MAX_ATTEMPTS},
+    ])
+    assert queue.recover(startup=True) == 0
+    assert table.rows['crashy']['status'] == 'failed'
+    assert queue.ran == []
+
+
+def test_sweep_requeues_only_stale_jobs_it_does_not_own(queue):
+    table = queue.use_table([
+        {'id': 'stale-elsewhere', 'kind': 'test_job', 'status': 'running', 'worker': 'host:222', 'stale': True},
+        {'id': 'busy-elsewhere', 'kind': 'test_job', 'status': 'running', 'worker': 'host:222'},
+        {'id': 'mine', 'kind': 'test_job', 'status': 'running', 'worker': queue.worker_name, 'stale': True},
+    ])
+    queue._submitted.add('mine')  # A long job still running in this process
+    assert queue.recover() == 1
+    _wait_idle(queue)
+    assert queue.ran == ['stale-elsewhere']
+    assert table.rows['busy-elsewhere']['status'] == 'running'
+    assert table.rows['mine']['status'] == 'running'
+
+
+def test_queued_job_is_not_started_twice(queue):
+    queue.use_table([{'id': 'queued', 'kind': 'test_job', 'status': 'queued'}])
+    queue._submitted.add('queued')  # Already waiting in the pool
+    assert queue.recover() == 0
+
+
+@pytest.mark.parametrize('failure, message', [
+    (None, 'Job not found'),
+    (RuntimeError('MySQL server has gone away'), 'Could not read job: MySQL server has gone away'),
+])
+def test_job_events_end_with_error_event(flask_client, monkeypatch, failure, message):
+    from app.routes import jobs
+    reads = iter([
+        {'id': 'j1', 'status': 'running', 'progress': 1, 'total': 5},  # Existence check
+        {'id': 'j1', 'status': 'running', 'progress': 1, 'total': 5},
+        failure,
+    ])
+
+    def get_job(job_id):
+        row = next(reads)
+        if isinstance(row, Exception):
+            raise row
+        return row
+
+    monkeypatch.setattr(jobs, 'get_job', get_job)
+    monkeypatch.setattr(jobs, 'SSE_POLL_SECONDS', 0)
+    body = flask_client.get('/jobs/j1/events').get_data(as_text=True)
+    events = [block.split('\n') for block in body.strip().split('\n\n')]
+    assert [lines[0] for lines in events] == ['event: progress', 'event: error']
+    assert json.loads(events[-1][1][len('data: '):]) == {'error': message}
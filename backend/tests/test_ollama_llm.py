@@ -0,0 +1,62 @@
+"""ai/llm/ollama_llm.py: answer relevance grading builds its prompts and parses the structured reply."""
+
+import pytest
+
+from ai.llm import ollama_llm
+from ai.llm.ollama_llm import OllamaLLM
+
+STUDY_MATERIAL = ("EVA lamination is done at 140-150 degree for 12-18 minutes depending on the EVA type. "
+                  "Bubbles come from a poor vacuum or wrong temperature.")
+
+
+@pytest.fixture
+def prompts(monkeypatch):
+    """Prompts sent by evaluate_answer (the call still goes to the server)."""
+    sent = []
+    structured = ollama_llm.ollama_structured
+
+    def spy(prompt, *args, **kwargs):
+        sent.append(prompt)
+        return structured(prompt, *args, **kwargs)
+
+    monkeypatch.setattr(ollama_llm, 'ollama_structured', spy)
+    return sent
+
+
+@pytest.mark.parametrize('study_context', [None, STUDY_MATERIAL])
+def test_evaluate_answer_prompt_variants(ollama_server, prompts, study_context):
+    result = OllamaLLM().evaluate_answer('Lamination', 'What is the lamination temperature?',
+                                         'it is around 145 degree', 'English', study_context=study_context)
+    assert result['graded'] is True
+    assert 0 <= result['score'] <= 100 and isinstance(result['is_relevant'], bool)
+    assert len(prompts) == 1
+    assert '{"relevant": true or false, "score": 0-100, "reason": "one line explanation' in prompts[0]
+    assert ('STUDY MATERIAL' in prompts[0]) == (study_context is not None)
+    assert ollama_server.stats()['counts']['requests'] == 1
+
+
+def test_evaluate_answer_short_answer_skips_llm(ollama_server):
+    result = OllamaLLM().evaluate_answer('Lamination', 'What is the lamination temperature?', 'hmm', 'English')
+    assert result['score'] == 0 and not result['is_relevant']
+    assert ollama_server.stats()['counts']['requests'] == 0
+
+
+def test_indexed_material_is_not_selected_twice(ollama_server, prompts, monkeypatch):
+    budgets = []
+
+    def retrieve(machine_id, query, max_chars=2000):
+        budgets.append(max_chars)
+        return STUDY_MATERIAL * 20  # Longer than the budget: select_relevant would re-chunk it
+
+    class NoAdhocIndex:
+        def select_relevant(self, *args, **kwargs):
+            raise AssertionError('index retrieval is already the prompt context')
+
+    monkeypatch.setattr(ollama_llm, 'get_relevant_study_material', retrieve)
+    monkeypatch.setattr(ollama_llm, 'get_context_index', NoAdhocIndex)
+
+    result = ollama_llm.evaluate_user_answer('Lamination', 'What is the lamination temperature?',
+                                             'it is around 145 degree', 'English', machine_id=7)
+    assert result['graded'] is True
+    assert budgets == [ollama_llm.EVALUATION_CONTEXT_CHARS]
+    assert 'STUDY MATERIAL' in prompts[0]
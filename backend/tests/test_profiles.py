@@ -0,0 +1,43 @@
+"""ai/llm/profiles.py: token budgets, options and the streamed cutoff."""
+
+import pytest
+
+from ai.llm.profiles import cut_text, get_profile
+from ai.llm.structured import QABank
+from fake_llm_server import apply_stop
+
+
+@pytest.mark.parametrize('text, terminators, expected', [
+    ('What is EVA', '?\n', None),                                        # Not complete yet
+    ('What is EVA?', '?\n', 'What is EVA?'),
+    ('What is EVA? It is used for', '?\n', 'What is EVA?'),
+    ('Tell me about EVA\nMore text', '?\n', 'Tell me about EVA'),        # Newline ends the line, not kept
+    ('\n\n  What is EVA?\nramble', '?\n', 'What is EVA?'),               # Leading blank lines skipped
+    ('\n\n', '?\n', None),
+    ('नमस्ते! EVA क्या है? और', '?', 'नमस्ते! EVA क्या है?'),
+])
+def test_cut_text(text, terminators, expected):
+    assert cut_text(text, terminators) == expected
+
+
+def test_followup_reply_starting_with_newline_is_not_lost():
+    profile = get_profile('followup')
+    reply = '\nLamination ke baad bubbles kyu aate hain?\n\nThis question checks...'
+    served, _ = apply_stop(reply, profile.options('Hindi').get('stop'))  # What Ollama returns
+    assert profile.cutoff()(served) == 'Lamination ke baad bubbles kyu aate hain?'
+
+
+def test_text_budget_depends_on_language():
+    profile = get_profile('followup')
+    assert profile.num_predict('Hindi') > profile.num_predict('English')
+    assert profile.options('English')['num_predict'] == profile.num_predict('English')
+
+
+def test_structured_budget_comes_from_the_model():
+    options = get_profile('bank_generation').options(model_cls=QABank, count=5)
+    assert options['num_predict'] == QABank.num_predict(5)
+    assert 'stop' not in options and get_profile('bank_generation').cutoff() is None
+
+
+def test_extra_options_pass_through():
+    assert get_profile('opening').options('English', num_ctx=4096)['num_ctx'] == 4096
@@ -0,0 +1,110 @@
+"""app/services/provisional_grading.py: when a provisional grade is given, and what counts as a correction."""
+
+import threading
+
+import pytest
+
+pytest.importorskip('whisper')  # Importing app.* builds the full app package
+
+from app.services import provisional_grading
+from app.services.provisional_grading import evaluate_provisionally, is_correction, provisional_enabled
+
+ARGS = ('Lamination', 'EVA temperature?', 'around 145 degree', '140-150 degree', 'English')
+
+
+class FakeGrader:
+    def __init__(self, calibrated=True, result=None, error=None):
+        self.calibrated = calibrated
+        self.result = result or {'score': 82, 'is_correct': True, 'is_partial': False, 'confidence': 0.7,
+                                 'grader': 'cross_encoder', 'calibrated': calibrated}
+        self.error = error
+        self.loaded = False
+
+    def calibration(self):
+        return object() if self.calibrated else None
+
+    def evaluate(self, *args):
+        if self.error:
+            raise self.error
+        return dict(self.result)
+
+    def warm_up(self):
+        self.loaded = True
+        return True
+
+
+class FakeQueue:
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, kind, params):
+        self.jobs.append((kind, params))
+        return f"grade-{len(self.jobs)}"
+
+
+@pytest.fixture
+def queue(monkeypatch):
+    q = FakeQueue()
+    monkeypatch.setattr(provisional_grading, 'get_job_queue', lambda: q)
+    monkeypatch.setenv('GRADER_BACKEND', 'llm')
+    return q
+
+
+def _use_grader(monkeypatch, grader):
+    monkeypatch.setattr('ai.nlp.cross_encoder_grader.get_cross_encoder_grader', lambda: grader)
+    return grader
+
+
+def test_off_by_default(monkeypatch):
+    monkeypatch.delenv('PROVISIONAL_GRADING', raising=False)
+    assert provisional_enabled() is False
+    monkeypatch.setenv('PROVISIONAL_GRADING', 'true')
+    assert provisional_enabled() is True
+
+
+def test_calibrated_grader_gives_provisional_grade_and_queues_final(monkeypatch, queue):
+    _use_grader(monkeypatch, FakeGrader())
+    result = evaluate_provisionally(*ARGS)
+    assert result['provisional'] is True and result['grade_id'] == 'grade-1' and result['score'] == 82
+    kind, params = queue.jobs[0]
+    assert kind == 'final_grade' and params['provisional']['score'] == 82
+
+
+@pytest.mark.parametrize('grader', [FakeGrader(calibrated=False), FakeGrader(error=OSError('model not downloaded'))])
+def test_uncalibrated_or_missing_model_grades_synchronously(monkeypatch, queue, grader):
+    _use_grader(monkeypatch, grader)
+    assert evaluate_provisionally(*ARGS) is None
+    assert queue.jobs == []
+
+
+def test_rule_grade_is_final(monkeypatch, queue):
+    _use_grader(monkeypatch, FakeGrader(result={'score': 0, 'is_correct': False, 'grader': 'rule', 'confidence': 1.0}))
+    result = evaluate_provisionally(*ARGS)
+    assert result['provisional'] is False and queue.jobs == []
+
+
+def test_preload_only_when_enabled_and_calibrated(monkeypatch):
+    grader = _use_grader(monkeypatch, FakeGrader(calibrated=False))
+    monkeypatch.setenv('PROVISIONAL_GRADING', 'true')
+    provisional_grading.preload_fast_grader()
+    assert not grader.loaded
+    grader = _use_grader(monkeypatch, FakeGrader())
+    monkeypatch.setenv('PROVISIONAL_GRADING', 'false')
+    provisional_grading.preload_fast_grader()
+    assert not grader.loaded
+    monkeypatch.setenv('PROVISIONAL_GRADING', 'true')
+    provisional_grading.preload_fast_grader()
+    for thread in threading.enumerate():
+        if thread.name == 'grader-preload':
+            thread.join(2)
+    assert grader.loaded
+
+
+@pytest.mark.parametrize('provisional, final, expected', [
+    ({'score': 75, 'is_correct': True}, {'score': 72, 'is_correct': True}, False),
+    ({'score': 75, 'is_correct': True}, {'score': 55, 'is_partial': True}, True),    # Decision changed
+    ({'score': 20}, {'score': 20 + provisional_grading.GRADE_CORRECTION_DELTA}, True),
+    ({'score': 20}, {'score': 19 + provisional_grading.GRADE_CORRECTION_DELTA}, False),
+])
+def test_is_correction(provisional, final, expected):
+    assert is_correction(provisional, final) is expected
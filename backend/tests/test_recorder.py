@@ -0,0 +1,67 @@
+"""ai/llm/recorder.py: record, replay and readthrough modes."""
+
+import json
+import os
+
+import pytest
+
+from ai.llm import ollama_client, recorder
+from ai.llm.recorder import LLMRecorder, ReplayMiss, request_key
+
+PAYLOAD = {"model": "gemma3:1b", "prompt": "What is EVA?", "options": {"temperature": 0.2}, "stream": False}
+RESPONSE = {"response": "Ethylene vinyl acetate", "eval_count": 5}
+
+
+def test_key_ignores_volatile_fields():
+    assert request_key(PAYLOAD) == request_key(dict(PAYLOAD, stream=True, keep_alive='60m'))
+    assert request_key(PAYLOAD) != request_key(dict(PAYLOAD, prompt='What is POE?'))
+
+
+def test_record_then_replay(tmp_path):
+    LLMRecorder('record', str(tmp_path)).store('ollama', PAYLOAD, RESPONSE, 0.5, call_type='grade')
+    assert LLMRecorder('replay', str(tmp_path)).lookup('ollama', dict(PAYLOAD, keep_alive='5m')) == RESPONSE
+
+    logs = [name for name in os.listdir(tmp_path) if name.startswith('traffic-')]
+    assert len(logs) == 1
+    with open(tmp_path / logs[0]) as f:
+        entry = json.loads(f.readline())
+    assert entry['key'] == request_key(PAYLOAD) and entry['call_type'] == 'grade'
+
+
+def test_replay_miss_raises(tmp_path):
+    with pytest.raises(ReplayMiss):
+        LLMRecorder('replay', str(tmp_path)).lookup('ollama', PAYLOAD)
+
+
+def test_record_and_off_never_serve(tmp_path):
+    LLMRecorder('record', str(tmp_path)).store('ollama', PAYLOAD, RESPONSE, 0.5)
+    assert LLMRecorder('record', str(tmp_path)).lookup('ollama', PAYLOAD) is None
+    assert LLMRecorder('off', str(tmp_path)).lookup('ollama', PAYLOAD) is None
+    LLMRecorder('off', str(tmp_path / 'off')).store('ollama', PAYLOAD, RESPONSE, 0.5)
+    assert not (tmp_path / 'off').exists()
+
+
+def test_readthrough_only_caches_low_temperature(tmp_path):
+    store = LLMRecorder('readthrough', str(tmp_path), max_temperature=0.3)
+    creative = dict(PAYLOAD, options={"temperature": 0.9})
+    no_temperature = {k: v for k, v in PAYLOAD.items() if k != 'options'}  # Ollama default 0.8
+    for payload in (PAYLOAD, creative, no_temperature):
+        store.store('ollama', payload, RESPONSE, 0.5)
+    assert store.lookup('ollama', PAYLOAD) == RESPONSE
+    assert store.lookup('ollama', creative) is None and store.load(request_key(creative)) is None
+    assert store.load(request_key(no_temperature)) is None
+
+
+def test_unknown_mode_is_off(tmp_path):
+    assert LLMRecorder('sometimes', str(tmp_path)).mode == 'off'
+
+
+def test_replay_serves_client_without_server(ollama_server, tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder, '_recorder', LLMRecorder('record', str(tmp_path)))
+    recorded = ollama_client.generate('Name one EVA defect', options={'temperature': 0, 'num_predict': 20})
+    assert ollama_server.stats()['counts']['requests'] == 1
+
+    monkeypatch.setattr(recorder, '_recorder', LLMRecorder('replay', str(tmp_path)))
+    replayed = ollama_client.generate('Name one EVA defect', options={'temperature': 0, 'num_predict': 20})
+    assert replayed['response'] == recorded['response']
+    assert ollama_server.stats()['counts']['requests'] == 1
@@ -0,0 +1,33 @@
+"""ai/llm/residency.py: shift hours and when the pin thread runs."""
+
+from datetime import datetime
+
+import pytest
+
+from ai.llm import residency
+
+
+@pytest.mark.parametrize('shift_hours, backends, expected', [
+    ('', 'ollama,gemini', False),          # Default: no pinning
+    ('06-22', 'gemini', False),            # Gemini-only deployment
+    ('06-22', 'ollama,gemini', True),
+    ('not-hours', 'ollama', False),
+])
+def test_pinning_enabled(monkeypatch, shift_hours, backends, expected):
+    monkeypatch.setattr(residency, 'SHIFT_HOURS', shift_hours)
+    monkeypatch.setenv('LLM_BACKENDS', backends)
+    assert residency.pinning_enabled() is expected
+
+
+def test_no_pin_thread_by_default(monkeypatch):
+    monkeypatch.setattr(residency, 'SHIFT_HOURS', '')
+    monkeypatch.setattr(residency, '_residency_instance', None)
+    manager = residency.get_residency_manager()
+    assert manager._pin_thread is None
+    assert manager.keep_alive() == residency.IDLE_KEEP_ALIVE
+
+
+@pytest.mark.parametrize('hour, expected', [(21, False), (22, True), (3, True), (6, False)])
+def test_night_shift_crosses_midnight(monkeypatch, hour, expected):
+    monkeypatch.setattr(residency, 'SHIFT_HOURS', '22-06')
+    assert residency.in_shift(datetime(2026, 1, 1, hour)) is expected
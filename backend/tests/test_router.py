@@ -0,0 +1,140 @@
+"""ai/llm/router.py: backend ranking, failover and hedging."""
+
+import threading
+import time
+
+import pytest
+
+from ai.llm import gemini_client, router as router_module
+from ai.llm.gemini_client import GeminiClient
+from ai.llm.health import CircuitBreaker
+from ai.llm.router import LLMRouter, MIN_SAMPLES
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    created = {}
+    monkeypatch.setattr(router_module, 'get_breaker',
+                        lambda name: created.setdefault(name, CircuitBreaker(name, cooldown=60)))
+    monkeypatch.setenv('LLM_BACKENDS', 'ollama,gemini')
+    monkeypatch.setenv('USE_GEMINI', 'false')
+    monkeypatch.setattr(gemini_client, '_client', GeminiClient(api_key='test-key'))
+    return created
+
+
+@pytest.fixture
+def router(breakers):
+    r = LLMRouter()
+    yield r
+    r._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _backend(router, backend, fn, call_type='grade'):
+    router._functions[(call_type, backend)] = fn
+
+
+def _history(router, backend, latency, ok=True, n=MIN_SAMPLES):
+    for _ in range(n):
+        router._stats(backend).record(latency, ok)
+
+
+def test_rank_uses_measured_latency_over_preference(router):
+    assert router.rank('grade') == ['gemini', 'ollama']  # Priors: 2.0s beats 3.0s even with the ollama preference
+    _history(router, 'ollama', 1.0)
+    _history(router, 'gemini', 4.0)
+    assert router.rank('grade') == ['ollama', 'gemini']
+
+
+def test_rank_penalises_errors_and_skips_open_circuits(router, breakers):
+    _history(router, 'ollama', 1.0, ok=False)
+    _history(router, 'gemini', 2.0)
+    assert router.rank('grade') == ['gemini', 'ollama']
+    for _ in range(3):
+        breakers['gemini'].record_failure(RuntimeError('quota'))
+    assert router.rank('grade') == ['ollama']
+
+
+def test_rank_respects_enabled_backends(router, monkeypatch):
+    monkeypatch.setenv('LLM_BACKENDS', 'gemini')
+    assert router.rank('grade') == ['gemini']
+    monkeypatch.setenv('LLM_BACKENDS', '')
+    assert router.rank('grade') == ['ollama']  # Nothing enabled: first backend's own fallback
+
+
+def test_failover_on_exception_and_fallback_result(router):
+    calls = []
+
+    def ollama(*args):
+        calls.append('ollama')
+        return {'graded': False, 'score': 0}  # Grader fallback, not a real grade
+
+    def gemini(*args):
+        calls.append('gemini')
+        return {'graded': True, 'score': 80}
+
+    _backend(router, 'ollama', ollama)
+    _backend(router, 'gemini', gemini)
+    assert router.call('grade', 't', 'q', 'a', 'e', 'English', hedge=False)['score'] == 80
+    assert calls == ['gemini']  # Gemini ranks first on priors
+    _history(router, 'ollama', 0.1)
+    calls.clear()
+    assert router.call('grade', 't', 'q', 'a', 'e', 'English', hedge=False)['score'] == 80
+    assert calls == ['ollama', 'gemini']
+    assert router._stats('ollama').error_rate() > 0
+
+
+def test_all_backends_raise(router):
+    def down(*args):
+        raise ConnectionError('down')
+
+    _backend(router, 'ollama', down)
+    _backend(router, 'gemini', down)
+    with pytest.raises(ConnectionError):
+        router.call('grade', 't', 'q', 'a', 'e', 'English')
+
+
+def test_hedges_to_secondary_when_primary_is_slower_than_p90(router, monkeypatch):
+    monkeypatch.setattr(router_module, 'MIN_HEDGE_DELAY', 0.05)
+    _history(router, 'gemini', 0.05)
+    _history(router, 'ollama', 0.5)
+    release = threading.Event()
+
+    def slow_gemini(*args):
+        release.wait(5)
+        return {'score': 10}
+
+    _backend(router, 'gemini', slow_gemini)
+    _backend(router, 'ollama', lambda *args: {'score': 90})
+    start = time.time()
+    try:
+        assert router.call('grade', 't', 'q', 'a', 'e', 'English')['score'] == 90
+    finally:
+        release.set()
+    assert time.time() - start < 2
+
+
+def test_slow_ollama_grade_is_not_hedged_onto_gemini(router, monkeypatch):
+    monkeypatch.setattr(router_module, 'MIN_HEDGE_DELAY', 0.01)
+    _history(router, 'ollama', 0.01)
+    _history(router, 'gemini', 0.5)
+    calls = []
+
+    def slow_ollama(*args):
+        calls.append('ollama')
+        time.sleep(0.2)  # 20x its p90
+        return {'graded': True, 'score': 70}
+
+    _backend(router, 'ollama', slow_ollama)
+    _backend(router, 'gemini', lambda *args: calls.append('gemini') or {'graded': True, 'score': 90})
+    assert router.rank('grade') == ['ollama', 'gemini']
+    assert router.call('grade', 't', 'q', 'a', 'e', 'English')['score'] == 70
+    assert calls == ['ollama']
+
+
+def test_no_hedge_for_unhedged_call_types(router, monkeypatch):
+    monkeypatch.setattr(router_module, 'MIN_HEDGE_DELAY', 0.01)
+    _history(router, 'ollama', 0.01)
+    calls = []
+    _backend(router, 'ollama', lambda *args: calls.append('ollama') or time.sleep(0.1) or {'score': 50}, 'evaluate')
+    assert router.call('evaluate', 't', 'q', 'a', 'English', 1)['score'] == 50
+    assert calls == ['ollama']
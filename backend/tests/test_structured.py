@@ -0,0 +1,65 @@
+"""ai/llm/structured.py: parsing and salvage of schema-constrained LLM output."""
+
+import json
+
+import pytest
+
+from ai.llm.structured import (
+    AnswerEvaluation, AnswerMatch, AnswerMatchBatch, QABank, StructuredOutputError, parse, to_gemini_schema
+)
+
+
+def test_parse_strips_code_fences_and_clamps_score():
+    result = parse(AnswerEvaluation, '```json\n{"relevant": true, "score": 130.4, "reason": " ok "}\n```')
+    assert result == AnswerEvaluation(relevant=True, score=100, reason='ok')
+
+
+@pytest.mark.parametrize('text', ['not json', '[1, 2]', '{"relevant": true}', '{"relevant": true, "score": "high"}'])
+def test_parse_rejects_invalid_output(text):
+    with pytest.raises(StructuredOutputError):
+        parse(AnswerEvaluation, text)
+
+
+def test_answer_match_normalises_and_validates_match():
+    assert parse(AnswerMatch, '{"match": "partial", "score": 55, "feedback": "f"}').match == 'PARTIAL'
+    with pytest.raises(StructuredOutputError):
+        parse(AnswerMatch, '{"match": "MAYBE", "score": 55, "feedback": "f"}')
+
+
+def test_answer_match_batch_keeps_valid_items_only():
+    text = json.dumps({'results': [
+        {'index': 1, 'match': 'YES', 'score': 90, 'feedback': 'good'},
+        {'index': 2, 'match': '??', 'score': 10, 'feedback': 'bad item'},
+        {'match': 'NO', 'score': 0, 'feedback': 'no index'},
+    ]})
+    result = parse(AnswerMatchBatch, text)
+    assert list(result.results) == [1]
+    assert result.results[1].score == 90
+
+
+def test_qabank_drops_incomplete_pairs():
+    text = json.dumps({'questions': [{'question': ' Q1 ', 'answer': ' A1 '}, {'question': 'Q2', 'answer': ''}, 'junk']})
+    assert parse(QABank, text).questions == [{'question': 'Q1', 'answer': 'A1'}]
+
+
+def test_qabank_salvages_items_from_truncated_output():
+    # num_predict cut the reply inside the third item
+    text = '{"questions": [{"question": "Q1", "answer": "A1"}, {"question": "Q2", "answer": "A2"}, {"question": "Q3", "ans'
+    assert parse(QABank, text).questions == [{'question': 'Q1', 'answer': 'A1'}, {'question': 'Q2', 'answer': 'A2'}]
+
+
+def test_qabank_salvage_with_nothing_complete_raises():
+    with pytest.raises(StructuredOutputError):
+        parse(QABank, '{"questions": [{"question": "Q1", "ans')
+
+
+def test_num_predict_scales_with_count():
+    assert QABank.num_predict(10) - QABank.num_predict(5) == 5 * QABank.TOKENS_PER_ITEM
+
+
+def test_gemini_schema_drops_unsupported_keys():
+    schema = to_gemini_schema(AnswerMatchBatch.SCHEMA)
+    item = schema['properties']['results']['items']
+    assert 'minimum' not in item['properties']['score'] and 'maximum' not in item['properties']['score']
+    assert item['properties']['match']['enum'] == ['YES', 'PARTIAL', 'NO']
+    assert item['required'] == ['index', 'match', 'score', 'feedback']
@@ -0,0 +1,48 @@
+"""Per-request LLM traces: Server-Timing header and GET /llm/traces, in both app entry points."""
+
+import pytest
+
+pytest.importorskip('whisper')  # Importing app.* builds the full app package
+
+from flask import Flask, jsonify
+
+from ai.llm import ollama_client, tracing
+from app.routes.llm import init_llm_tracing
+
+
+@pytest.fixture
+def traced_client(ollama_server):
+    app = Flask('test')
+    init_llm_tracing(app)
+
+    @app.route('/ask')
+    def ask():
+        result = ollama_client.generate('What is the EVA lamination temperature?', options={'num_predict': 20})
+        return jsonify({'text': result['response']})
+
+    @app.route('/plain')
+    def plain():
+        return jsonify({})
+
+    return app.test_client()
+
+
+def test_request_with_llm_call_gets_server_timing(traced_client):
+    response = traced_client.get('/ask')
+    assert response.status_code == 200
+    assert response.headers['Server-Timing'].startswith('llm;dur=')
+    assert 'desc="1 LLM calls"' in response.headers['Server-Timing']
+    assert tracing.recent_traces()[0]['request'] == 'GET /ask'
+    assert len(tracing.recent_traces()[0]['calls']) == 1
+
+
+def test_request_without_llm_call_has_no_header(traced_client):
+    assert 'Server-Timing' not in traced_client.get('/plain').headers
+    assert tracing.current_trace() is None
+
+
+def test_production_app_registers_trace_hooks():
+    import app_production
+    hooks = [f.__name__ for f in app_production.app.before_request_funcs.get(None, [])]
+    assert '_start_llm_trace' in hooks
+    assert '_end_llm_trace' in [f.__name__ for f in app_production.app.teardown_request_funcs.get(None, [])]
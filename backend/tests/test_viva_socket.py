@@ -0,0 +1,117 @@
+"""app/routes/viva_socket.py: the socket stays alive during a slow turn, and frame and value checks."""
+
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip('flask_sock')
+pytest.importorskip('whisper')  # Importing app.* builds the full app package
+
+from simple_websocket import Client
+from werkzeug.serving import make_server
+
+from app.routes import viva_socket
+from app.services import viva_channels
+
+TURN_SECONDS = 1.2
+
+
+@pytest.fixture
+def ws_url(monkeypatch):
+    """A real server (flask-sock needs one) with 0.2s heartbeats and a slow fake turn."""
+    monkeypatch.setattr(viva_socket, 'HEARTBEAT_SECONDS', 0.2)
+    monkeypatch.setattr(viva_socket, 'IDLE_TIMEOUT', 0.6)
+    monkeypatch.setattr(viva_channels, '_channels_instance', viva_channels.VivaChannels())
+
+    def slow_turn(mode, audio, filename, context, on_event):
+        on_event('transcript', {'text': audio.decode()})
+        time.sleep(TURN_SECONDS)
+        return {'result': {}, 'grade': {'score': 80}}
+
+    monkeypatch.setattr(viva_socket, 'run_turn', slow_turn)
+    from app import create_app
+    server = make_server('127.0.0.1', 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"ws://127.0.0.1:{server.server_port}/viva/ws"
+    server.shutdown()
+
+
+def _receive(ws, until, timeout=5):
+    """Events up to and including the first of type `until`."""
+    events = []
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        message = ws.receive(timeout=deadline - time.time())
+        if message is None:
+            break
+        events.append(json.loads(message))
+        if events[-1]['type'] == until:
+            return events
+    raise AssertionError(f"No {until} event, got {[e['type'] for e in events]}")
+
+
+def _send(ws, **msg):
+    ws.send(json.dumps(msg))
+
+
+def test_heartbeats_continue_during_slow_turn(ws_url):
+    ws = Client.connect(ws_url)
+    try:
+        _send(ws, type='hello', mode='kbc')
+        _receive(ws, 'ready')
+        _send(ws, type='start_answer', context={'question': 'q', 'expected_answer': 'a'})
+        ws.send(b'my answer')
+        _send(ws, type='end_answer')
+        _send(ws, type='start_answer', context={'question': 'q2', 'expected_answer': 'a2'})
+        _send(ws, type='end_answer')
+
+        # The client stays silent for longer than IDLE_TIMEOUT while the turn runs
+        events = _receive(ws, 'turn')
+        kinds = [e['type'] for e in events]
+        assert kinds.index('transcript') < kinds.index('heartbeat') < kinds.index('turn')
+        busy = [e for e in events if e['type'] == 'error']
+        assert busy and busy[0]['data']['status'] == 409
+        assert events[-1]['data']['grade'] == {'score': 80}
+
+        _send(ws, type='ping')
+        assert _receive(ws, 'pong')[-1]['type'] == 'pong'
+    finally:
+        ws.close()
+
+
+@pytest.mark.parametrize('frame', ['[]', '"hello"', '42'])
+def test_non_object_frames_get_error(ws_url, frame):
+    ws = Client.connect(ws_url)
+    try:
+        ws.send(frame)
+        event = _receive(ws, 'error')[-1]
+        assert event['data']['message'] == 'Frames must be JSON objects'
+        _send(ws, type='ping')
+        _receive(ws, 'pong')
+    finally:
+        ws.close()
+
+
+@pytest.mark.parametrize('frame, message', [
+    ({'type': 'hello', 'mode': 'kbc', 'context': [1]}, 'context must be a JSON object'),
+    ({'type': 'hello', 'channel_id': 'CHANNEL', 'last_seq': 'abc'}, 'last_seq must be a number'),
+    ({'type': 'hello', 'channel_id': 'CHANNEL', 'last_seq': [3]}, 'last_seq must be a number'),
+    ({'type': 'start_answer', 'context': ['q']}, 'context must be a JSON object'),
+    ({'type': 'partial', 'text': {'words': 3}}, 'text must be a string'),
+])
+def test_bad_values_get_error_and_keep_socket(ws_url, frame, message):
+    ws = Client.connect(ws_url)
+    try:
+        _send(ws, type='hello', mode='kbc')
+        channel_id = _receive(ws, 'ready')[-1]['data']['channel_id']
+        if frame.get('channel_id'):
+            frame = dict(frame, channel_id=channel_id)
+        ws.send(json.dumps(frame))
+        assert _receive(ws, 'error')[-1]['data']['message'] == message
+        _send(ws, type='end_answer')  # A rejected context opens no answer
+        _send(ws, type='ping')
+        _receive(ws, 'pong')
+    finally:
+        ws.close()
@@ -0,0 +1,20 @@
+"""app/routes/viva_turn.py: request checks before any audio is processed."""
+
+import io
+
+import pytest
+
+pytest.importorskip('whisper')  # Importing app.* builds the full app package
+
+
+@pytest.mark.parametrize('context, error', [
+    ('{not json', 'context must be JSON'),
+    ('[1]', 'context must be a JSON object'),
+    ('"x"', 'context must be a JSON object'),
+    ('42', 'context must be a JSON object'),
+])
+def test_bad_context_is_rejected(flask_client, context, error):
+    response = flask_client.post('/viva/turn', content_type='multipart/form-data', data={
+        'audio': (io.BytesIO(b'audio'), 'answer.wav'), 'mode': 'kbc', 'context': context})
+    assert response.status_code == 400
+    assert response.get_json()['error'] == error
@@ -0,0 +1,163 @@
+"""app/services/workers.py: registration, least-loaded dispatch, failover, and the worker token."""
+
+import pytest
+
+pytest.importorskip('whisper')  # Importing app.* builds the full app package
+
+from app.services import workers
+from app.services.workers import WorkerRegistry, WorkerBusy, WorkerRejected
+
+TOKEN = 'lan-secret'
+
+
+@pytest.fixture
+def registry():
+    return WorkerRegistry(local_capacity={'stt': 1, 'grade': 2})
+
+
+def _register(registry, worker_id, roles=('grade',), capacity=None):
+    return registry.register(worker_id, f"http://{worker_id}:9100", list(roles), capacity or {'grade': 4})
+
+
+def test_register_heartbeat_and_expiry(registry, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('app.services.workers.time.time', lambda: now[0])
+    _register(registry, 'box1')
+    assert registry.has_workers('grade') and not registry.has_workers('stt')
+    assert registry.heartbeat('box1', {'grade': 3, 'bogus': 9})
+    assert registry._workers['box1'].reported_load == {'grade': 3}
+
+    now[0] += workers.WORKER_TTL + 1
+    assert not registry.has_workers('grade')
+    assert not registry.heartbeat('box1', {})  # Expired: must register again
+    assert 'box1' not in registry._workers
+    assert not registry.heartbeat('never-registered', {})
+
+
+@pytest.mark.parametrize('worker_id, url, roles', [
+    ('', 'http://box:9100', ['grade']),
+    ('local', 'http://box:9100', ['grade']),
+    ('box', '', ['grade']),
+    ('box', 'http://box:9100', ['tts']),
+])
+def test_register_rejects_incomplete_workers(registry, worker_id, url, roles):
+    with pytest.raises(ValueError):
+        registry.register(worker_id, url, roles, {'grade': 1})
+
+
+def test_single_box_runs_locally_without_bookkeeping(registry):
+    assert registry.dispatch('grade', remote=None, local=lambda: 'local grade') == 'local grade'
+    assert registry._local.completed == 0
+
+
+def test_dispatch_prefers_least_loaded_node(registry):
+    _register(registry, 'busy')
+    _register(registry, 'idle')
+    registry.heartbeat('busy', {'grade': 3})
+    registry.heartbeat('idle', {'grade': 1})
+    registry._local.in_flight['grade'] = 2  # Local capacity 2: full
+
+    sent = []
+    assert registry.dispatch('grade', lambda node: sent.append(node.id) or node.id, lambda: 'local') == 'idle'
+    assert sent == ['idle']
+    assert registry._workers['idle'].completed == 1
+
+
+def test_local_node_wins_ties(registry):
+    _register(registry, 'box1')
+    assert registry.dispatch('grade', lambda node: node.id, lambda: 'local') == 'local'
+    assert registry._local.completed == 1
+
+
+def test_failed_worker_is_retried_elsewhere_and_breaker_opens(registry):
+    _register(registry, 'broken')
+    _register(registry, 'good')
+    registry.heartbeat('good', {'grade': 1})  # 'broken' is tried first
+    registry._local.in_flight['grade'] = 2
+
+    def remote(node):
+        if node.id == 'broken':
+            raise ConnectionError('connection refused')
+        return node.id
+
+    broken = registry._workers['broken']
+    for _ in range(broken.breaker.failure_threshold):
+        assert registry.dispatch('grade', remote, lambda: 'local') == 'good'
+    assert broken.failed == broken.breaker.failure_threshold
+    assert broken.breaker.state == 'open'
+    assert broken not in registry._candidates('grade', with_local=True)
+    assert broken.in_flight['grade'] == 0
+
+
+def test_busy_worker_is_skipped_without_a_breaker_failure(registry):
+    _register(registry, 'full')
+    registry._local.in_flight['grade'] = 2
+
+    def remote(node):
+        raise WorkerBusy('capacity reached')
+
+    assert registry.dispatch('grade', remote, lambda: 'local') == 'local'
+    full = registry._workers['full']
+    assert full.breaker.consecutive_failures == 0 and full.failed == 0
+
+
+def test_rejected_job_is_not_retried(registry):
+    _register(registry, 'box1')
+    _register(registry, 'box2')
+    registry._local.in_flight['grade'] = 2
+    sent = []
+
+    def remote(node):
+        sent.append(node.id)
+        raise WorkerRejected('HTTP 400: expected_answer is required')
+
+    with pytest.raises(WorkerRejected):
+        registry.dispatch('grade', remote, lambda: 'local')
+    assert len(sent) == 1
+
+
+def test_no_local_fallback_raises_last_error(registry):
+    _register(registry, 'stt1', roles=['stt'], capacity={'stt': 1})
+
+    def remote(node):
+        raise ConnectionError('timed out')
+
+    with pytest.raises(ConnectionError):
+        registry.dispatch('stt', remote)
+
+
+def test_check_token(monkeypatch):
+    monkeypatch.setattr(workers, 'WORKER_TOKEN', '')
+    assert not workers.workers_enabled()
+    assert not workers.check_token('') and not workers.check_token('anything')
+
+    monkeypatch.setattr(workers, 'WORKER_TOKEN', TOKEN)
+    assert workers.check_token(TOKEN)
+    assert not workers.check_token('') and not workers.check_token(None) and not workers.check_token(TOKEN + 'x')
+
+
+REGISTRATION = {'worker_id': 'box1', 'url': 'http://10.0.0.12:9100', 'roles': ['grade'], 'capacity': {'grade': 2}}
+
+
+@pytest.fixture
+def fresh_registry(monkeypatch):
+    monkeypatch.setattr(workers, '_registry_instance', WorkerRegistry(local_capacity={'grade': 1}))
+
+
+def test_register_route_is_closed_without_token(flask_client, fresh_registry, monkeypatch):
+    monkeypatch.setattr(workers, 'WORKER_TOKEN', '')
+    response = flask_client.post('/workers/register', json=REGISTRATION, headers={'X-Worker-Token': ''})
+    assert response.status_code == 503
+    assert 'WORKER_TOKEN' in response.get_json()['error']
+    assert not workers.get_worker_registry().has_workers('grade')
+
+
+def test_register_route_checks_token(flask_client, fresh_registry, monkeypatch):
+    monkeypatch.setattr(workers, 'WORKER_TOKEN', TOKEN)
+    response = flask_client.post('/workers/register', json=REGISTRATION, headers={'X-Worker-Token': 'guess'})
+    assert response.status_code == 401
+    assert flask_client.post('/workers/box1/heartbeat', json={}).status_code == 401
+
+    response = flask_client.post('/workers/register', json=REGISTRATION, headers={'X-Worker-Token': TOKEN})
+    assert response.status_code == 200 and response.get_json()['registered']
+    assert workers.get_worker_registry().has_workers('grade')
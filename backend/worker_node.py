@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Worker Node - speech-to-text and / or answer grading for the API server, on another machine
+- Registers with the API (POST /workers/register) with its roles and capacity, then
+  heartbeats its current load; registers again if the API restarted
+- POST /work/stt     multipart "audio" + "language" -> {"text": ...}     (same as /stt)
+- POST /work/grade   JSON like /evaluate_with_answer -> grade            (this node's GRADER_BACKEND / Ollama)
+- GET  /work/health  roles, capacity and current load
+- Jobs beyond capacity get HTTP 503, so the API sends them to another node
+- WORKER_TOKEN is required and must be the same as on the API server
+
+Examples:
+    python worker_node.py --api-url http://10.0.0.5:9000 --roles stt --stt-capacity 2
+    python worker_node.py --api-url http://10.0.0.5:9000 --roles stt,grade --port 9100 \\
+        --advertise-url http://10.0.0.12:9100
+"""
+
+import argparse
+import hmac
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import requests
+from flask import Flask, request, jsonify
+
+WORKER_TOKEN = os.environ.get('WORKER_TOKEN', '')
+
+
+def _lan_ip() -> str:
+    """Address other machines reach us on (no packet is sent)."""
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+        try:
+            s.connect(('10.255.255.255', 1))
+            return s.getsockname()[0]
+        except OSError:
+            return '127.0.0.1'
+
+
+class WorkerNode:
+    def __init__(self, roles: list, capacity: dict, whisper_model: str):
+        self.roles = roles
+        self.capacity = capacity
+        self.whisper_model = whisper_model
+        self.slots = {role: threading.BoundedSemaphore(capacity[role]) for role in roles}
+        self.load = {role: 0 for role in roles}
+        self._stt = None
+        self._stt_lock = threading.Lock()
+        self._lock = threading.Lock()
+
+    def stt_model(self):
+        if self._stt is None:
+            with self._stt_lock:
+                if self._stt is None:
+                    from ai.stt.whisper_stt import WhisperSTT
+                    self._stt = WhisperSTT(model_size=self.whisper_model)
+        return self._stt
+
+    def run(self, role: str, job):
+        """Run job() in one of the role's slots; None if the node is full."""
+        if not self.slots[role].acquire(blocking=False):
+            return None
+        with self._lock:
+            self.load[role] += 1
+        try:
+            return job()
+        finally:
+            with self._lock:
+                self.load[role] -= 1
+            self.slots[role].release()
+
+    def current_load(self) -> dict:
+        with self._lock:
+            return dict(self.load)
+
+
+def create_worker_app(node: WorkerNode) -> Flask:
+    app = Flask(__name__)
+
+    @app.before_request
+    def _check_token():
+        if request.path == '/work/health':
+            return None
+        token = request.headers.get('X-Worker-Token', '')
+        if not WORKER_TOKEN or not hmac.compare_digest(token.encode(), WORKER_TOKEN.encode()):
+            return jsonify({'error': 'Invalid worker token'}), 401
+
+    @app.route('/work/health', methods=['GET'])
+    def health():
+        return jsonify({'roles': node.roles, 'capacity': node.capacity, 'load': node.current_load()})
+
+    @app.route('/work/stt', methods=['POST'])
+    def stt():
+        if 'stt' not in node.roles:
+            return jsonify({'error': 'This node does not run STT'}), 404
+        if 'audio' not in request.files:
+            return jsonify({'error': 'No audio file provided'}), 400
+        language = request.form.get('language', 'hi')
+        suffix = os.path.splitext(request.files['audio'].filename or '')[1] or '.wav'
+        fd, path = tempfile.mkstemp(suffix=suffix, prefix='worker_stt_')
+        os.close(fd)
+        request.files['audio'].save(path)
+        try:
+            start = time.time()
+            text = node.run('stt', lambda: node.stt_model().transcribe(path, language=language))
+        finally:
+            os.remove(path)
+        if text is None:
+            return jsonify({'error': 'STT capacity reached'}), 503
+        print(f"[WORKER] STT in {time.time() - start:.2f}s: '{text[:60]}'")
+        return jsonify({'text': text, 'language': language})
+
+    @app.route('/work/grade', methods=['POST'])
+    def grade():
+        if 'grade' not in node.roles:
+            return jsonify({'error': 'This node does not grade'}), 404
+        data = request.json or {}
+        if not data.get('expected_answer'):
+            return jsonify({'error': 'expected_answer is required'}), 400
+        from ai.nlp.cross_encoder_grader import get_grader
+        result = node.run('grade', lambda: get_grader()(
+            data.get('topic', 'General'), data.get('question', ''), data.get('user_answer', ''),
+            data['expected_answer'], data.get('language', 'Hindi')
+        ))
+        if result is None:
+            return jsonify({'error': 'Grading capacity reached'}), 503
+        return jsonify(result)
+
+    return app
+
+
+class Registration:
+    """Register with the API server and keep heartbeating until stopped."""
+
+    def __init__(self, api_url: str, payload: dict):
+        self.api_url = api_url.rstrip('/')
+        self.payload = payload
+        self.interval = 10
+        self.headers = {'X-Worker-Token': WORKER_TOKEN}
+
+    def register(self):
+        response = requests.post(f"{self.api_url}/workers/register", json=self.payload, headers=self.headers, timeout=5)
+        response.raise_for_status()
+        self.interval = response.json().get('heartbeat_seconds', self.interval)
+        print(f"[WORKER] Registered with {self.api_url} as {self.payload['worker_id']} (heartbeat {self.interval}s)")
+
+    def run(self, load_fn, stop: threading.Event):
+        registered = False
+        while not stop.is_set():
+            try:
+                if not registered:
+                    self.register()
+                    registered = True
+                else:
+                    response = requests.post(
+                        f"{self.api_url}/workers/{self.payload['worker_id']}/heartbeat",
+                        json={'load': load_fn()}, headers=self.headers, timeout=5
+                    )
+                    if response.status_code == 404:
+                        registered = False  # API restarted or dropped us
+                        continue
+                    response.raise_for_status()
+            except requests.RequestException as e:
+                print(f"[WORKER] API unreachable, retrying: {e}")
+                registered = False
+            stop.wait(self.interval)
+
+    def leave(self):
+        try:
+            requests.delete(f"{self.api_url}/workers/{self.payload['worker_id']}", headers=self.headers, timeout=3)
+        except requests.RequestException:
+            pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="STT / grading worker node for the viva API server")
+    parser.add_argument("--api-url", required=True, help="API server, e.g. http://10.0.0.5:9000")
+    parser.add_argument("--roles", default="stt,grade", help="Comma-separated: stt, grade")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--advertise-url", help="URL the API reaches this node on (default: LAN IP + port)")
+    parser.add_argument("--worker-id", help="Default: hostname:port")
+    parser.add_argument("--stt-capacity", type=int, default=1, help="Concurrent transcriptions")
+    parser.add_argument("--grade-capacity", type=int, default=4, help="Concurrent grades")
+    parser.add_argument("--whisper-model", default=os.environ.get('WHISPER_MODEL_SIZE', 'small'))
+    args = parser.parse_args()
+
+    if not WORKER_TOKEN:
+        print("❌ WORKER_TOKEN is not set (use the same value as on the API server)")
+        return 1
+    roles = [r.strip() for r in args.roles.split(',') if r.strip() in ('stt', 'grade')]
+    if not roles:
+        print("❌ --roles must include stt and / or grade")
+        return 1
+    capacity = {role: getattr(args, f"{role}_capacity") for role in roles}
+    node = WorkerNode(roles, capacity, args.whisper_model)
+
+    if 'stt' in roles:
+        # Load Whisper before taking jobs from the API
+        print(f"[WORKER] Loading Whisper ({args.whisper_model})...")
+        node.stt_model()
+
+    registration = Registration(args.api_url, {
+        'worker_id': args.worker_id or f"{socket.gethostname()}:{args.port}",
+        'url': args.advertise_url or f"http://{_lan_ip()}:{args.port}",
+        'roles': roles,
+        'capacity': capacity,
+        'info': {'whisper_model': args.whisper_model if 'stt' in roles else None,
+                 'grader_backend': os.environ.get('GRADER_BACKEND', 'llm'),
+                 'ollama_host': os.environ.get('OLLAMA_HOST')},
+    })
+    stop = threading.Event()
+    threading.Thread(target=registration.run, args=(node.current_load, stop), daemon=True).start()
+
+    print(f"[WORKER] Serving {', '.join(roles)} on {args.host}:{args.port}")
+    try:
+        create_worker_app(node).run(host=args.host, port=args.port, threaded=True)
+    finally:
+        stop.set()
+        registration.leave()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,7 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { Button, Card, Container, Row, Col, Spinner, Badge, ProgressBar } from 'react-bootstrap';
 import axios from 'axios';
+import { VivaAPIService } from '../services/apiService';
 
 // Production: empty string (relative URLs), Development: localhost:5000
 const API_BASE = process.env.NODE_ENV === 'production' ? '' : 'http://localhost:5000';
@@ -38,6 +39,11 @@ interface EmployeeInfo {
 
 type Screen = 'setup' | 'interview' | 'result';
 
+// Interim browser transcripts go to /chat-viva/partial at most this often, so the
+// server can draft the next question while the candidate is still speaking
+const PARTIAL_INTERVAL_MS = 1500;
+const MIN_PARTIAL_WORDS = 4;
+
 const ChatViva: React.FC = () => {
   const [screen, setScreen] = useState<Screen>('setup');
   const [topics, setTopics] = useState<Topic[]>([]);
@@ -52,9 +58,12 @@ const ChatViva: React.FC = () => {
   const [isProcessing, setIsProcessing] = useState(false);
   const [isSpeaking, setIsSpeaking] = useState(false);
   const [evaluation, setEvaluation] = useState<Evaluation | null>(null);
+  const [sessionId, setSessionId] = useState<string | null>(null);
   
   const mediaRecorderRef = useRef<MediaRecorder | null>(null);
   const audioChunksRef = useRef<Blob[]>([]);
+  const recognitionRef = useRef<any>(null);
+  const lastPartialRef = useRef({ text: '', sentAt: 0 });
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   const maxTurns = 8;
@@ -159,6 +168,7 @@ const ChatViva: React.FC = () => {
       const aiMessage = res.data.message;
       setMessages([{ role: 'ai', text: aiMessage, timestamp: new Date() }]);
       setTurn(res.data.turn || 1);
+      setSessionId(res.data.session_id || null);
       
       await speak(aiMessage);
     } catch (err) {
@@ -190,42 +200,72 @@ const ChatViva: React.FC = () => {
 
       mediaRecorder.start();
       setIsRecording(true);
+      startPartialTranscripts();
     } catch (err) {
       console.error('Mic error:', err);
       alert('Microphone access denied!');
     }
   };
 
+  // Partial transcripts while recording (browser speech recognition, where available).
+  // The answer itself is still transcribed by the server from the recording.
+  const startPartialTranscripts = () => {
+    const Recognition = (window as any).SpeechRecognition || (window as any).webkitSpeechRecognition;
+    if (!Recognition || !sessionId) return;
+
+    const recognition = new Recognition();
+    recognition.lang = 'hi-IN';
+    recognition.continuous = true;
+    recognition.interimResults = true;
+    lastPartialRef.current = { text: '', sentAt: 0 };
+
+    recognition.onresult = (event: any) => {
+      const text = Array.from(event.results as ArrayLike<any>)
+        .map((result: any) => result[0].transcript)
+        .join(' ')
+        .trim();
+      const now = Date.now();
+      const last = lastPartialRef.current;
+      if (text === last.text || now - last.sentAt < PARTIAL_INTERVAL_MS) return;
+      if (text.split(/\s+/).length < MIN_PARTIAL_WORDS) return;
+      lastPartialRef.current = { text, sentAt: now };
+      axios.post(`${API_BASE}/chat-viva/partial`, { session_id: sessionId, partial_text: text })
+        .catch(() => undefined);  // Only a speed-up: the turn works without it
+    };
+    recognition.onerror = () => undefined;
+
+    try {
+      recognition.start();
+      recognitionRef.current = recognition;
+    } catch (err) {
+      console.warn('Speech recognition unavailable:', err);
+    }
+  };
+
+  const stopPartialTranscripts = () => {
+    if (recognitionRef.current) {
+      recognitionRef.current.onresult = null;
+      recognitionRef.current.stop();
+      recognitionRef.current = null;
+    }
+  };
+
   // Stop Recording
   const stopRecording = () => {
     if (mediaRecorderRef.current && isRecording) {
+      stopPartialTranscripts();
       mediaRecorderRef.current.stop();
       setIsRecording(false);
     }
   };
 
-  // Process Recording - STT then get AI response
+  // Process Recording - STT and AI response in one request (/viva/turn)
   const processRecording = async () => {
     setIsProcessing(true);
 
     try {
       const audioBlob = new Blob(audioChunksRef.current, { type: 'audio/webm' });
-      const formData = new FormData();
-      formData.append('audio', audioBlob, 'recording.webm');
-
-      // STT
-      const sttRes = await axios.post(`${API_BASE}/stt`, formData);
-      const userText = sttRes.data.text || '';
-
-      if (!userText.trim()) {
-        await speak('माफ कीजिए, आवाज़ सुनाई नहीं दी। फिर से बोलिए।');
-        setIsProcessing(false);
-        return;
-      }
-
-      // Add user message
-      const userMsg: Message = { role: 'user', text: userText, timestamp: new Date() };
-      setMessages(prev => [...prev, userMsg]);
+      const audioFile = new File([audioBlob], 'recording.webm', { type: 'audio/webm' });
 
       // Build history for API
       const history = messages.map(m => ({
@@ -233,26 +273,38 @@ const ChatViva: React.FC = () => {
         user: m.role === 'user' ? m.text : ''
       })).filter(h => h.ai || h.user);
 
-      // Get AI response
-      const chatRes = await axios.post(`${API_BASE}/chat-viva/respond`, {
+      const chatTurn = await VivaAPIService.vivaTurn(audioFile, 'chat', {
         topic_id: selectedTopic?.id,
-        user_answer: userText,
+        session_id: sessionId,
         history: history,
         turn: turn,
         max_turns: maxTurns,
         language: 'Hindi'
       });
+      const userText = chatTurn.transcript || '';
+
+      if (chatTurn.retry) {
+        await speak('माफ कीजिए, आवाज़ सुनाई नहीं दी। फिर से बोलिए।');
+        setIsProcessing(false);
+        return;
+      }
+
+      // Add user message
+      const userMsg: Message = { role: 'user', text: userText, timestamp: new Date() };
+      setMessages(prev => [...prev, userMsg]);
 
-      const aiText = chatRes.data.message;
+      const result = chatTurn.result;
+      const aiText = result.message;
       const aiMsg: Message = { role: 'ai', text: aiText, timestamp: new Date() };
       setMessages(prev => [...prev, aiMsg]);
-      setTurn(chatRes.data.turn || turn + 1);
+      setTurn(result.turn || turn + 1);
+      if (result.session_id) setSessionId(result.session_id);
 
       await speak(aiText);
 
       // Check if interview ended
-      if (!chatRes.data.continue || chatRes.data.evaluation) {
-        setEvaluation(chatRes.data.evaluation);
+      if (!result.continue || result.evaluation) {
+        setEvaluation(result.evaluation);
         setTimeout(() => setScreen('result'), 2000);
       }
 
@@ -277,6 +329,7 @@ const ChatViva: React.FC = () => {
 
       const res = await axios.post(`${API_BASE}/chat-viva/evaluate-final`, {
         topic_id: selectedTopic?.id,
+        session_id: sessionId,
         history: history,
         language: 'Hindi'
       });
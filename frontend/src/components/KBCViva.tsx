@@ -21,6 +21,10 @@ interface AnswerRecord {
   is_correct: boolean;
   is_partial?: boolean;
   feedback: string;
+  grade_id?: string;      // Provisional grade: final grade is written back to the saved record
+  provisional?: boolean;
+  graded?: boolean;       // false: the grader's fallback score, graded again at the end of the viva
+  grader?: string;        // 'llm', 'cross_encoder' or 'rule': calibrate_grader.py learns from LLM grades only
 }
 
 type VivaState = 'setup' | 'welcome' | 'playing' | 'waiting' | 'summary';
@@ -251,7 +255,7 @@ const KBCViva: React.FC = () => {
   };
 
   // Save viva record with video
-  const saveVivaRecord = async (videoBlob: Blob | null, summaryData: any) => {
+  const saveVivaRecord = async (videoBlob: Blob | null, summaryData: any, records: AnswerRecord[]) => {
     try {
       const formData = new FormData();
       
@@ -281,7 +285,7 @@ const KBCViva: React.FC = () => {
       formData.append('started_at', vivaStartTime.current?.toISOString() || '');
       
       // Answers JSON
-      formData.append('answers_json', JSON.stringify(answers));
+      formData.append('answers_json', JSON.stringify(records));
       
       // Video file
       if (videoBlob && videoBlob.size > 0) {
@@ -353,15 +357,26 @@ const KBCViva: React.FC = () => {
           setQuestions(prev => [...prev, ...formattedQuestions]);
         }
       } else if (selectedMachine) {
-        // OLD: Machine-based questions
-        const result = await VivaAPIService.generateVivaQuestions(
+        // Machine-based questions: background job, questions are asked as soon as a section is done
+        const { job_id } = await VivaAPIService.submitGenerateQuestionsJob(
           selectedMachine,
           numQuestions,
           language
         );
-        
-        if (result.questions && result.questions.length > 0) {
-          setQuestions(prev => [...prev, ...result.questions]);
+        const seen = new Set<string>();
+        while (true) {
+          const job = await VivaAPIService.getJob(job_id);
+          // Partial results grow per section; the final list is re-balanced, so only add new questions
+          const fresh = (job.result?.questions || []).filter(q => !seen.has(q.question));
+          fresh.forEach(q => seen.add(q.question));
+          if (fresh.length > 0) {
+            setQuestions(prev => [...prev, ...fresh]);
+          }
+          if (job.status === 'completed') break;
+          if (job.status === 'failed') {
+            throw new Error(job.error || 'Question generation failed');
+          }
+          await new Promise(resolve => setTimeout(resolve, 2000));
         }
       }
     } catch (err) {
@@ -503,27 +518,25 @@ const KBCViva: React.FC = () => {
     setIsProcessing(true);
     
     try {
-      // Speech to Text
+      // Speech to Text + evaluation in one request
       const audioFile = new File([audioBlob], 'answer.wav', { type: 'audio/wav' });
-      const sttResult = await VivaAPIService.speechToText(audioFile);
-      const transcribedText = sttResult.text;
+      const currentQ = questions[currentIndex];
+      const turn = await VivaAPIService.vivaTurn(audioFile, 'kbc', {
+        question: currentQ.question,
+        expected_answer: currentQ.expected_answer,
+        language,
+      });
+      const transcribedText = turn.transcript;
       
       setCurrentAnswer(transcribedText);
       
-      if (!transcribedText || transcribedText.trim().length < 3) {
+      if (turn.retry) {
         speakText('आपकी आवाज़ सुनाई नहीं दी। कृपया फिर से बोलें।', 'encouraging');
         setIsProcessing(false);
         return;
       }
       
-      // Evaluate answer
-      const currentQ = questions[currentIndex];
-      const evalResult = await VivaAPIService.evaluateWithAnswer(
-        currentQ.question,
-        transcribedText,
-        currentQ.expected_answer,
-        language
-      );
+      const evalResult = turn.grade;
       
       // Record answer
       const answerRecord: AnswerRecord = {
@@ -534,6 +547,10 @@ const KBCViva: React.FC = () => {
         is_correct: evalResult.is_correct,
         is_partial: evalResult.is_partial,
         feedback: evalResult.feedback,
+        grade_id: evalResult.grade_id,
+        provisional: evalResult.provisional,
+        graded: evalResult.graded,
+        grader: evalResult.grader,
       };
       setAnswers(prev => [...prev, answerRecord]);
       
@@ -590,6 +607,10 @@ const KBCViva: React.FC = () => {
         is_correct: evalResult.is_correct,
         is_partial: evalResult.is_partial,
         feedback: evalResult.feedback,
+        grade_id: evalResult.grade_id,
+        provisional: evalResult.provisional,
+        graded: evalResult.graded,
+        grader: evalResult.grader,
       };
       setAnswers(prev => [...prev, answerRecord]);
       
@@ -663,13 +684,49 @@ const KBCViva: React.FC = () => {
     }
   };
 
+  // End of viva: answers the grader could not grade live are graded again, all in one request
+  const finalizeAnswers = async (records: AnswerRecord[]): Promise<AnswerRecord[]> => {
+    const ungraded = records.filter(a => a.graded === false);
+    if (ungraded.length === 0) return records;
+    try {
+      const batch = await VivaAPIService.evaluateBatch(
+        ungraded.map(a => ({
+          question: a.question,
+          user_answer: a.user_answer,
+          expected_answer: a.expected_answer,
+        })),
+        language
+      );
+      const regraded = new Map(ungraded.map((a, i) => [a, batch.results[i]] as const));
+      return records.map(a => {
+        const result = regraded.get(a);
+        if (!result || result.pending) return a;
+        return {
+          ...a,
+          score: result.score,
+          is_correct: result.is_correct,
+          is_partial: result.is_partial,
+          feedback: result.feedback,
+          graded: true,
+          grader: result.graded_by,
+        };
+      });
+    } catch (err) {
+      console.error('Batch grading failed, keeping the live grades:', err);
+      return records;
+    }
+  };
+
   const showSummary = async () => {
     setVivaState('summary');
     
-    const correct = answers.filter(a => a.is_correct).length;
-    const partial = answers.filter(a => a.is_partial && !a.is_correct).length;
-    const wrong = answers.filter(a => !a.is_correct && !a.is_partial).length;
-    const total = answers.length;
+    const finalAnswers = await finalizeAnswers(answers);
+    setAnswers(finalAnswers);
+    
+    const correct = finalAnswers.filter(a => a.is_correct).length;
+    const partial = finalAnswers.filter(a => a.is_partial && !a.is_correct).length;
+    const wrong = finalAnswers.filter(a => !a.is_correct && !a.is_partial).length;
+    const total = finalAnswers.length;
     const percent = Math.round((correct / total) * 100);
     
     // Stop video recording and save
@@ -677,7 +734,7 @@ const KBCViva: React.FC = () => {
     
     // Save viva record to database
     const summaryData = { total, correct, partial, wrong, percent };
-    await saveVivaRecord(videoBlob, summaryData);
+    await saveVivaRecord(videoBlob, summaryData, finalAnswers);
     
     let summaryMsg = '';
     const empName = employee?.name || 'Candidate';
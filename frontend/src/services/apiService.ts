@@ -184,6 +184,32 @@ export class VivaAPIService {
     return response.data;
   }
 
+  // Spoken answer in one round trip: transcription + grade + next prompt (POST /viva/turn)
+  static async vivaTurn(
+    audioFile: File,
+    mode: 'kbc' | 'session' | 'chat',
+    context: Record<string, unknown>
+  ): Promise<{
+    transcript: string;
+    retry: boolean;
+    grade: any;
+    next_prompt: string | null;
+    result: any;
+    timings: Record<string, number>;
+  }> {
+    const formData = new FormData();
+    formData.append('audio', audioFile);
+    formData.append('mode', mode);
+    formData.append('context', JSON.stringify(context));
+
+    const response = await apiClient.post('/viva/turn', formData, {
+      headers: {
+        'Content-Type': 'multipart/form-data',
+      },
+    });
+    return response.data;
+  }
+
   static async evaluateAnswer(
     answer: string,
     expectedAnswer: string,
@@ -312,6 +338,42 @@ export class VivaAPIService {
     return response.data;
   }
 
+  // NEW: Queue question generation as a background job
+  static async submitGenerateQuestionsJob(
+    machineId: number,
+    numQuestions: number = 15,
+    language: string = 'Hindi'
+  ): Promise<{ job_id: string; status: string }> {
+    const response = await apiClient.post('/generate_viva_questions/jobs', {
+      machine_id: machineId,
+      num_questions: numQuestions,
+      language,
+    });
+    return response.data;
+  }
+
+  // NEW: Poll a background job (progress + partial results)
+  static async getJob(jobId: string): Promise<{
+    id: string;
+    kind: string;
+    status: 'queued' | 'running' | 'completed' | 'failed';
+    progress: number;
+    total: number;
+    result?: {
+      questions: Array<{
+        level: number;
+        question: string;
+        expected_answer: string;
+      }>;
+      total?: number;
+      partial?: boolean;
+    };
+    error?: string;
+  }> {
+    const response = await apiClient.get(`/jobs/${jobId}`);
+    return response.data;
+  }
+
   // NEW: Evaluate answer with expected answer
   static async evaluateWithAnswer(
     question: string,
@@ -325,6 +387,10 @@ export class VivaAPIService {
     feedback: string;
     correct_answer: string | null;
     user_said: string;
+    graded?: boolean;
+    grader?: string;
+    provisional?: boolean;
+    grade_id?: string;
   }> {
     const response = await apiClient.post('/evaluate_with_answer', {
       question,
@@ -335,6 +401,39 @@ export class VivaAPIService {
     return response.data;
   }
 
+  // NEW: Evaluate a whole viva's answers in one call
+  static async evaluateBatch(
+    answers: Array<{
+      question: string;
+      user_answer: string;
+      expected_answer: string;
+      topic?: string;
+    }>,
+    language: string = 'Hindi',
+    timeout?: number
+  ): Promise<{
+    results: Array<{
+      is_correct: boolean;
+      is_partial?: boolean;
+      score: number;
+      feedback: string;
+      correct_answer: string | null;
+      user_said: string;
+      graded_by: string;
+      pending: boolean;
+    }>;
+    partial: boolean;
+    llm_graded: number;
+    elapsed: number;
+  }> {
+    const response = await apiClient.post('/evaluate_batch', {
+      answers,
+      language,
+      timeout,
+    });
+    return response.data;
+  }
+
   // NEW: Get welcome message
   static async getWelcomeMessage(
     candidateName: string,